@@ -3,6 +3,7 @@ package com.example.mainactivity.network
 import okhttp3.MultipartBody
 import okhttp3.RequestBody
 import retrofit2.Response
+import retrofit2.http.Header
 import retrofit2.http.Multipart
 import retrofit2.http.POST
 import retrofit2.http.Part
@@ -14,6 +15,8 @@ interface ApiService {
         @Part audio: MultipartBody.Part,
         // ✅ 둘 다 옵션으로 둠: 기존 AnalyzeFragment 컴파일 에러 사라짐
         @Part("confirm") confirm: RequestBody? = null,
-        @Part("phone_number") phoneNumber: RequestBody? = null
+        @Part("phone_number") phoneNumber: RequestBody? = null,
+        // 서버 수락 제어는 본문을 읽기 전에 우선순위를 정하므로 confirm 을 헤더로도 보냄
+        @Header("X-Confirm") confirmHeader: String? = null
     ): Response<PredictionResponse>
 }
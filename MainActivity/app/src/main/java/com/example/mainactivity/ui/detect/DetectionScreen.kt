@@ -491,7 +491,7 @@ private suspend fun requestDetect(
     val phoneRb: RequestBody? = phoneNumber?.toRequestBody("text/plain".toMediaType())
 
     val resp: Response<PredictionResponse> =
-        ApiClient.api.uploadAudio(partAudio, confirmRb, phoneRb)
+        ApiClient.api.uploadAudio(partAudio, confirmRb, phoneRb, confirm.toString())
 
     if (!resp.isSuccessful) return@withContext null
     resp.body()
@@ -0,0 +1,166 @@
+# admission.py
+import itertools, math, os, threading, time
+from collections import deque
+from contextlib import contextmanager
+
+import metrics
+
+# ======================
+# 설정 (요청 수락 제어 / 부하 차단)
+# ======================
+ADMIT_MAX_CONCURRENT  = int(os.environ.get("ADMIT_MAX_CONCURRENT", str(2 * (os.cpu_count() or 2))))  # 동시 디코딩 요청 수 (0=끔)
+ADMIT_MAX_BYTES       = int(os.environ.get("ADMIT_MAX_BYTES", str(256 * 1024 * 1024)))  # 처리 중 업로드 바이트 합 상한
+ADMIT_QUEUE_DEPTH     = int(os.environ.get("ADMIT_QUEUE_DEPTH", "16"))      # 자리를 기다릴 수 있는 요청 수
+ADMIT_QUEUE_TIMEOUT_S = float(os.environ.get("ADMIT_QUEUE_TIMEOUT_S", "2")) # 대기 최대 시간 (넘으면 503)
+ADMIT_LOW_QUEUE_SHARE = float(os.environ.get("ADMIT_LOW_QUEUE_SHARE", "0.5"))  # 대기열 중 dry-run(confirm=0) 몫
+ADMIT_HIGH_RESERVE    = int(os.environ.get("ADMIT_HIGH_RESERVE", "1"))      # 확정 저장만 쓸 수 있는 슬롯 수
+
+HIGH, LOW = "confirmed", "dry_run"
+
+WAIT_SECONDS = metrics.histogram("dvd_admission_wait_seconds", "Time spent waiting for an admission slot", ("priority",))
+ADMITTED     = metrics.counter("dvd_admission_admitted_total", "Requests admitted", ("priority",))
+SHED         = metrics.counter("dvd_admission_shed_total", "Requests rejected with 503", ("priority", "reason"))
+
+
+class Overloaded(RuntimeError):
+    """자리가 나지 않음 → 503 + Retry-After(retry_after 초)"""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Admission:
+    """
+    동시 처리 수와 처리 중 업로드 바이트를 제한하고, 넘치면 짧은 대기열에서 기다리다 실패한다.
+      - 확정 저장(confirm=1)이 우선: 예약 슬롯(high_reserve), 대기 중이면 dry-run 보다 먼저 입장
+      - 대기열이 꽉 찼을 때 확정 요청이 오면 기다리던 dry-run 을 하나 밀어낸다
+      - dry-run 은 대기열의 low_queue_share 까지만 기다릴 수 있다
+    처리 중인 요청이 없으면 바이트 상한보다 큰 업로드도 하나는 받는다 (영원히 거부되지 않게).
+    """
+
+    def __init__(self, max_concurrent: int = ADMIT_MAX_CONCURRENT, max_bytes: int = ADMIT_MAX_BYTES,
+                 queue_depth: int = ADMIT_QUEUE_DEPTH, queue_timeout: float = ADMIT_QUEUE_TIMEOUT_S,
+                 low_queue_share: float = ADMIT_LOW_QUEUE_SHARE, high_reserve: int = ADMIT_HIGH_RESERVE):
+        self.max_concurrent = max(0, int(max_concurrent))
+        self.max_bytes = max(1, int(max_bytes))
+        self.queue_depth = max(0, int(queue_depth))
+        self.queue_timeout = float(queue_timeout)
+        self.low_queue_depth = int(self.queue_depth * min(1.0, max(0.0, low_queue_share)))
+        self.high_reserve = min(max(0, int(high_reserve)), max(0, self.max_concurrent - 1))
+        self._cond = threading.Condition()
+        self._active = 0
+        self._bytes = 0
+        self._queues = {HIGH: deque(), LOW: deque()}   # 우선순위별 대기 티켓 (FIFO)
+        self._evicted = set()          # 확정 요청에 밀려난 dry-run 티켓
+        self._tickets = itertools.count()
+        self._service_s = 0.05         # 처리 시간 EMA (Retry-After 추정용)
+        self.admitted = {HIGH: 0, LOW: 0}
+        self.shed = {HIGH: 0, LOW: 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_concurrent > 0
+
+    def _fits(self, nbytes: int, high: bool) -> bool:
+        if self._active >= self.max_concurrent:
+            return False
+        if self._active and self._bytes + nbytes > self.max_bytes:
+            return False
+        if not high:
+            if self._queues[HIGH] or self._active >= self.max_concurrent - self.high_reserve:
+                return False
+        return True
+
+    def _waiting(self) -> int:
+        return len(self._queues[HIGH]) + len(self._queues[LOW])
+
+    def _retry_after(self) -> int:
+        """대기열이 다 빠지는 데 걸릴 시간 추정 (초, 1~30)"""
+        backlog = self._active + self._waiting()
+        return int(min(30, max(1, math.ceil(self._service_s * backlog / max(1, self.max_concurrent)))))
+
+    def _shed(self, prio: str, reason: str):
+        self.shed[prio] += 1
+        SHED.labels(prio, reason).inc()
+        raise Overloaded(f"Server busy ({reason}), retry later", self._retry_after())
+
+    def acquire(self, nbytes: int = 0, high: bool = False) -> float:
+        """자리를 얻으면 입장 시각(monotonic) 반환, 못 얻으면 Overloaded. release 와 짝으로 호출"""
+        t0 = time.monotonic()
+        if not self.enabled:
+            return t0
+        prio = HIGH if high else LOW
+        nbytes = max(0, int(nbytes or 0))
+        with self._cond:
+            if self._queues[prio] or not self._fits(nbytes, high):
+                low_q = self._queues[LOW]
+                if high and self._waiting() >= self.queue_depth and low_q:
+                    self._evicted.add(low_q.pop())     # 가장 최근 dry-run 을 밀어내고 그 자리에서 기다림
+                    self._cond.notify_all()
+                elif self._waiting() >= self.queue_depth:
+                    self._shed(prio, "queue_full")
+                elif not high and len(low_q) >= self.low_queue_depth:
+                    self._shed(prio, "queue_full")
+
+                ticket = next(self._tickets)
+                queue = self._queues[prio]
+                queue.append(ticket)
+                deadline = t0 + self.queue_timeout
+                try:
+                    while True:
+                        if ticket in self._evicted:
+                            self._evicted.discard(ticket)
+                            self._shed(prio, "preempted")
+                        if queue[0] == ticket and self._fits(nbytes, high):
+                            break
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._shed(prio, "timeout")
+                        self._cond.wait(remaining)
+                finally:
+                    if ticket in queue:
+                        queue.remove(ticket)
+                    self._cond.notify_all()          # 다음 순서 대기자가 다시 확인하도록
+            self._active += 1
+            self._bytes += nbytes
+            self.admitted[prio] += 1
+        now = time.monotonic()
+        ADMITTED.labels(prio).inc()
+        WAIT_SECONDS.labels(prio).observe(now - t0)
+        return now
+
+    def release(self, nbytes: int = 0, admitted_at: float | None = None):
+        if not self.enabled:
+            return
+        with self._cond:
+            self._active = max(0, self._active - 1)
+            self._bytes = max(0, self._bytes - max(0, int(nbytes or 0)))
+            if admitted_at is not None:
+                self._service_s = 0.9 * self._service_s + 0.1 * (time.monotonic() - admitted_at)
+            self._cond.notify_all()
+
+    @contextmanager
+    def admit(self, nbytes: int = 0, high: bool = False):
+        admitted_at = self.acquire(nbytes, high)
+        try:
+            yield
+        finally:
+            self.release(nbytes, admitted_at)
+
+    def stats(self) -> dict:
+        with self._cond:
+            return {
+                "enabled": self.enabled,
+                "max_concurrent": self.max_concurrent,
+                "max_bytes": self.max_bytes,
+                "queue_depth": self.queue_depth,
+                "queue_timeout_s": self.queue_timeout,
+                "high_reserve": self.high_reserve,
+                "active": self._active,
+                "active_bytes": self._bytes,
+                "waiting": {p: len(q) for p, q in self._queues.items()},
+                "admitted": dict(self.admitted),
+                "shed": dict(self.shed),
+                "retry_after_s": self._retry_after(),
+            }
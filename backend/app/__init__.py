@@ -0,0 +1 @@
+# app/__init__.py
@@ -0,0 +1,326 @@
+# app/main.py
+import asyncio, contextvars, functools, os, traceback
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+import numpy as np
+from fastapi import FastAPI, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import UploadFile
+from starlette.exceptions import HTTPException
+
+# 모델/배처/캐시/DB/번호 풀은 server.py 의 것을 그대로 사용 (uvicorn 은 backend/ 를 sys.path 에 둔다)
+import jobs
+import metrics
+import server
+from audio_io import read_upload_prefix
+from db import init_db, submit_confirmed_result
+from admission import Overloaded
+from extract_pool import ExtractQueueFull
+
+# ======================
+# 설정
+# ======================
+# MFCC 추출(요청 스레드 경로) / 프로세스 풀 대기용 스레드 수
+ASGI_CPU_WORKERS = int(os.environ.get("ASGI_CPU_WORKERS", str(os.cpu_count() or 4)))
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class BodyLimitMiddleware:
+    """
+    요청 본문을 받는 중에 크기를 센다 (Content-Length 가 없거나 거짓이어도 max_bytes 에서 중단).
+    초과하면 receive() 가 UploadTooLarge 를 던지고, 엔드포인트가 413 으로 바꾼다.
+    """
+
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        for name, value in scope.get("headers", []):
+            if name == b"content-length" and value.isdigit() and int(value) > self.max_bytes:
+                resp = JSONResponse({"error": f"Upload too large (max {self.max_bytes} bytes)"}, status_code=413)
+                return await resp(scope, receive, send)
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > self.max_bytes:
+                    raise UploadTooLarge()
+            return message
+
+        return await self.app(scope, limited_receive, send)
+
+
+cpu_pool = ThreadPoolExecutor(max_workers=max(1, ASGI_CPU_WORKERS), thread_name_prefix="asgi-cpu")
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    init_db()
+    await run_in_threadpool(server.phone_index.start)
+    if server.extract_pool.enabled:
+        await run_in_threadpool(server.extract_pool.start)    # 워커 예열
+    server.job_workers.start()
+    yield
+    server.job_workers.stop()
+    cpu_pool.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(title="deepfake-voice-detector", lifespan=lifespan)
+app.add_middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"])
+app.add_middleware(BodyLimitMiddleware, max_bytes=server.MAX_UPLOAD_BYTES)
+
+
+@app.exception_handler(UploadTooLarge)
+async def upload_too_large(_request: Request, _exc: UploadTooLarge):
+    """엔드포인트가 잡지 못한 본문 크기 초과도 Flask 와 같은 413 으로"""
+    return JSONResponse({"error": f"Upload too large (max {server.MAX_UPLOAD_BYTES} bytes)"}, status_code=413)
+
+
+# ======================
+# 엔드포인트 (server.py 와 같은 계약)
+# ======================
+async def _read_form(request: Request):
+    """multipart 본문 → form, 형식이 깨졌으면 None (크기 초과 UploadTooLarge 는 그대로 올림)"""
+    try:
+        return await request.form()
+    except (ValueError, HTTPException):     # python-multipart 파싱 오류 / boundary 없음
+        return None
+
+def _form_value(form, request: Request, name: str):
+    v = form.get(name)
+    if v is None or isinstance(v, UploadFile):
+        v = request.query_params.get(name)
+    return v
+
+@asynccontextmanager
+async def _admission(request: Request):
+    """
+    server.admission 자리 확보 (Flask _admitted 와 같은 규칙: 본문 파싱 전, ?confirm=/X-Confirm 우선순위).
+    자리가 없으면 503 응답을, 수락되면 None 을 내주고 빠져나올 때 자리를 돌려준다.
+    """
+    length = request.headers.get("content-length")
+    nbytes = int(length) if length and length.isdigit() else 0
+    high = server.admission_priority(request.query_params, request.headers)
+    try:
+        admitted_at = await run_in_threadpool(server.admission.acquire, nbytes, high)
+    except Overloaded as e:
+        yield JSONResponse({"error": str(e)}, status_code=503, headers={"Retry-After": str(e.retry_after)})
+        return
+    try:
+        yield None
+    finally:
+        server.admission.release(nbytes, admitted_at)
+
+def _run_cpu(fn, *args):
+    """cpu_pool 에서 실행 (contextvars 를 넘겨 단계 타이밍이 이 요청에 기록되게 함)"""
+    ctx = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(cpu_pool, functools.partial(ctx.run, fn, *args))
+
+@app.get("/health")
+async def health():
+    return await run_in_threadpool(server.health_stats)
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/stats")
+async def stats(request: Request):
+    with metrics.request_scope("/stats") as scope:
+        scope.status, out = await run_in_threadpool(
+            server.stats_summary, request.query_params.get("top"), request.query_params.get("by"))
+    return JSONResponse(out, status_code=scope.status)
+
+@app.get("/detections")
+async def detections(request: Request):
+    with metrics.request_scope("/detections") as scope:
+        scope.status, out = await run_in_threadpool(server.detections_query, request.query_params)
+    return JSONResponse(out, status_code=scope.status)
+
+@app.get("/phone/{number:path}")
+async def phone_lookup(number: str):
+    """메모리 인덱스 조회만 하므로 이벤트 루프에서 바로 처리"""
+    with metrics.request_scope("/phone") as scope:
+        out = server.phone_index.get(number)
+        scope.status = 200 if out["found"] else (404 if out["valid"] else 400)
+    return JSONResponse(out, status_code=scope.status)
+
+@app.post("/phone/lookup")
+async def phone_lookup_bulk(request: Request):
+    with metrics.request_scope("/phone/lookup") as scope:
+        try:
+            body = await request.json()
+        except ValueError:
+            body = None
+        except UploadTooLarge:
+            scope.status = 413
+            return JSONResponse({"error": f"Upload too large (max {server.MAX_UPLOAD_BYTES} bytes)"}, status_code=413)
+        numbers = body.get("numbers") if isinstance(body, dict) else body
+        scope.status, out = server.phone_lookup_many(numbers)
+    return JSONResponse(out, status_code=scope.status)
+
+@app.post("/jobs")
+async def submit_job(request: Request):
+    """긴 녹음 비동기 판별: 202 + job id (처리는 server.job_workers 스레드)"""
+    with metrics.request_scope("/jobs") as scope:
+        async with _admission(request) as shed:
+            if shed is not None:
+                scope.status = shed.status_code
+                return shed
+            return await _submit_job_admitted(request, scope)
+
+async def _submit_job_admitted(request: Request, scope) -> JSONResponse:
+    """수락된 /jobs 요청: 업로드 앞부분 저장 → 202"""
+    try:
+        form = await _read_form(request)
+        file = form.get("audio") if form is not None else None
+        mismatch = server.confirm_mismatch(
+            form.get("confirm"), server.admission_priority(request.query_params, request.headers)) if form else None
+        if not isinstance(file, UploadFile):
+            scope.status, out = 400, {"error": 'No audio (field "audio" required)'}
+        elif mismatch:
+            scope.status, out = 400, {"error": mismatch}
+        else:
+            filename = file.filename or "unknown"
+            scope.ext = server.ext_label(filename)
+            audio_bytes = None
+            if scope.ext in server.ALLOWED_EXT:
+                audio_bytes = await run_in_threadpool(read_upload_prefix, file.file, filename, server.MAX_SECONDS)
+            if audio_bytes is None:
+                scope.status, out = 415, {"error": "Only WAV/MP3 allowed"}
+            elif not audio_bytes:
+                scope.status, out = 400, {"error": "Empty file"}
+            else:
+                confirm_flag = _form_value(form, request, "confirm") or "0"
+                vad_flag = _form_value(form, request, "vad")
+                use_vad = server.VAD_DEFAULT if not vad_flag else str(vad_flag).lower() in ("1", "true", "yes")
+                job_id = await run_in_threadpool(
+                    jobs.submit, filename, audio_bytes, str(confirm_flag).lower() in ("1", "true", "yes"),
+                    _form_value(form, request, "phone_number") or None, use_vad)
+                server.job_workers.start().notify()
+                scope.status, out = 202, {"job_id": job_id, "status": "queued", "poll": f"/jobs/{job_id}"}
+    except UploadTooLarge:
+        scope.status, out = 413, {"error": f"Upload too large (max {server.MAX_UPLOAD_BYTES} bytes)"}
+    except Exception as e:
+        print("=== /jobs ERROR ===")
+        print(traceback.format_exc())
+        scope.status, out = (415 if "Only WAV/MP3 allowed" in str(e) else 500), {"error": str(e)}
+    return JSONResponse(out, status_code=scope.status)
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    with metrics.request_scope("/jobs/<id>") as scope:
+        out = await run_in_threadpool(jobs.get, job_id)
+        scope.status = 200 if out is not None else 404
+    return JSONResponse(out if out is not None else {"error": "Unknown job"}, status_code=scope.status)
+
+@app.post("/predict")
+async def predict(request: Request):
+    with metrics.request_scope("/predict") as scope:
+        resp, scope.ext = await _predict(request)
+        scope.status = resp.status_code
+        length = request.headers.get("content-length")
+        if length and length.isdigit():
+            metrics.UPLOAD_BYTES.labels(scope.ext or "none").observe(int(length))
+        if metrics.SERVER_TIMING or request.query_params.get("timing") == "1":
+            resp.headers["Server-Timing"] = scope.server_timing()
+    return resp
+
+async def _predict(request: Request):
+    """
+    multipart: audio(파일), confirm(0/1), phone_number(선택) — Android ApiService.uploadAudio 와 동일.
+    본문 수신은 이벤트 루프에서 비동기로, 디코딩/MFCC 는 스레드(또는 프로세스 풀), forward 는 마이크로 배처,
+    SQLite 쓰기는 writer 스레드의 Future 를 await 한다 (루프를 막지 않음).
+    """
+    ext = ""
+    try:
+        # 수락 제어: 자리가 없으면 본문을 받기 전에 503 + Retry-After (대기는 스레드에서, 루프는 막지 않음)
+        async with _admission(request) as shed:
+            if shed is not None:
+                return shed, ext
+            with metrics.stage("receive"):
+                form = await _read_form(request)
+            file = form.get("audio") if form is not None else None
+            if not isinstance(file, UploadFile):
+                return JSONResponse({"error": 'No audio (field "audio" required)'}, status_code=400), ext
+            mismatch = server.confirm_mismatch(
+                form.get("confirm"), server.admission_priority(request.query_params, request.headers))
+            if mismatch:
+                return JSONResponse({"error": mismatch}, status_code=400), ext
+
+            filename = file.filename or "unknown"
+            ext = server.ext_label(filename)
+            rejected = server.upload_rejection(filename)      # 캐시 적중이어도 같은 거부
+            if rejected:
+                return JSONResponse({"error": rejected}, status_code=415), ext
+            confirm_flag = _form_value(form, request, "confirm") or "0"
+            is_confirmed = str(confirm_flag).lower() in ("1", "true", "yes")
+            return await _predict_admitted(request, form, file, filename, is_confirmed), ext
+
+    except UploadTooLarge:
+        return JSONResponse({"error": f"Upload too large (max {server.MAX_UPLOAD_BYTES} bytes)"}, status_code=413), ext
+    except ExtractQueueFull as e:
+        return JSONResponse({"error": str(e)}, status_code=503), ext
+    except Exception as e:
+        print("=== /predict ERROR ===")
+        print(traceback.format_exc())
+        status = 415 if "Only WAV/MP3 allowed" in str(e) else 500
+        return JSONResponse({"error": str(e)}, status_code=status), ext
+
+async def _predict_admitted(request: Request, form, file, filename: str, is_confirmed: bool) -> JSONResponse:
+    """수락된 요청의 본문 읽기 → 추론 → (확정 시) 저장. 예외는 _predict 가 상태 코드로 바꾼다"""
+    with metrics.stage("read"):
+        audio_bytes = await run_in_threadpool(read_upload_prefix, file.file, filename, server.MAX_SECONDS)
+    if not audio_bytes:
+        return JSONResponse({"error": "Empty file"}, status_code=400)
+
+    # 1) 추론: 캐시 → (미스) MFCC 는 실행기에서, forward 는 배처 Future 를 await
+    vad_flag = _form_value(form, request, "vad")
+    use_vad = server.VAD_DEFAULT if not vad_flag else str(vad_flag).lower() in ("1", "true", "yes")
+    feature_key = server.feature_key_for(audio_bytes, use_vad, filename)
+    cache_key = server.cache_key_for(audio_bytes, use_vad, feature_key, filename)
+    mfcc = None
+    with metrics.stage("cache"):
+        cached = await run_in_threadpool(server.result_cache.get, cache_key)
+    if cached is not None:
+        probs_np = np.asarray(cached["probabilities"], dtype=np.float32)
+        trimmed = cached.get("vad_trimmed_fraction")
+    else:
+        extract = functools.partial(server.extract_pool.extract, use_vad=use_vad)
+        mfcc, trimmed = await _run_cpu(extract, audio_bytes, filename)
+        with metrics.stage("infer"):
+            probs_np = await asyncio.wrap_future(server.batcher.submit(mfcc))
+        await run_in_threadpool(server.result_cache.put, cache_key, server._cache_value(probs_np, trimmed))
+    idx = int(np.argmax(probs_np))
+    pred_label = server.class_names[idx]
+    conf_f = float(probs_np[idx])
+
+    # 2) 저장 여부(사용자 확인 기반 2단계)
+    saved_id, phone_number, saved = None, None, False
+    if is_confirmed and pred_label.lower() != "real":
+        phone_number = _form_value(form, request, "phone_number")
+        if not phone_number:
+            phone_number = await run_in_threadpool(server.get_next_phone_number)
+        with metrics.stage("db_save_confirmed"):
+            saved_id = await asyncio.wrap_future(
+                submit_confirmed_result(filename, pred_label, conf_f, probs_np, phone_number)
+            )
+        saved = True
+    server.record_features(feature_key, mfcc, saved_id, (audio_bytes, filename, use_vad))
+
+    payload = server._result_payload(saved_id, saved, pred_label, conf_f, probs_np, phone_number)
+    payload["cached"] = cached is not None
+    payload.update(server.vad_fields(use_vad, trimmed))
+    return JSONResponse(payload)
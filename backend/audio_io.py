@@ -0,0 +1,193 @@
+# audio_io.py
+import io, os, struct, time
+
+import numpy as np
+import soundfile as sf
+
+import metrics
+
+try:
+    import soxr as _soxr     # librosa 의 기본 리샘플러 (librosa 설치 시 함께 설치됨)
+except ImportError:
+    _soxr = None
+
+# ======================
+# 설정
+# ======================
+ALLOWED_EXT = {".wav", ".mp3"}
+
+READ_CHUNK = 64 * 1024
+# MP3 는 프레임 위치를 미리 알 수 없으므로 최대 비트레이트 기준으로 앞부분만 읽는다
+# (MPEG-1 Layer I 최대 448 kbps, + 여유 10%)
+MP3_MAX_BITRATE = 448_000
+
+# soxr 를 직접 호출하는 입력 샘플레이트 (그 외는 librosa.resample)
+COMMON_RATES = {8000, 11025, 22050, 24000, 32000, 44100, 48000}
+
+
+# ======================
+# WAV 헤더
+# ======================
+def parse_wav_header(head: bytes):
+    """
+    RIFF/WAVE 헤더에서 fmt / data 청크 위치를 찾는다.
+    반환: dict(format_tag, channels, sr, bits, block_align, data_offset, data_size) 또는 None
+    """
+    if len(head) < 12 or head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+        return None
+    pos, fmt = 12, None
+    while pos + 8 <= len(head):
+        cid, size = head[pos:pos + 4], struct.unpack_from("<I", head, pos + 4)[0]
+        body = pos + 8
+        if cid == b"fmt ":
+            if body + 16 > len(head):
+                return None
+            tag, ch, sr, _, align, bits = struct.unpack_from("<HHIIHH", head, body)
+            if tag == 0xFFFE and size >= 40 and body + 26 <= len(head):
+                tag = struct.unpack_from("<H", head, body + 24)[0]   # WAVE_FORMAT_EXTENSIBLE → 실제 포맷
+            fmt = dict(format_tag=tag, channels=ch, sr=sr, bits=bits, block_align=align)
+        elif cid == b"data":
+            if fmt is None:
+                return None
+            return dict(fmt, data_offset=body, data_size=size)
+        pos = body + size + (size & 1)
+    return None
+
+
+# ======================
+# 업로드 앞부분만 읽기
+# ======================
+def _id3v2_size(head: bytes) -> int:
+    if len(head) >= 10 and head[:3] == b"ID3":
+        s = head[6:10]
+        return 10 + ((s[0] & 0x7F) << 21 | (s[1] & 0x7F) << 14 | (s[2] & 0x7F) << 7 | (s[3] & 0x7F))
+    return 0
+
+def _read_until(stream, buf: bytearray, limit: int):
+    while len(buf) < limit:
+        chunk = stream.read(min(READ_CHUNK, limit - len(buf)))
+        if not chunk:
+            break
+        buf += chunk
+
+def prefix_limit(head: bytes, ext: str, max_seconds: float):
+    """디코딩에 필요한 최대 바이트 수 (알 수 없으면 None = 전부)"""
+    if ext == ".wav":
+        info = parse_wav_header(head)
+        if info is None or not info["block_align"] or not info["sr"]:
+            return None
+        frames = int(np.ceil(max_seconds * info["sr"])) + 1
+        return info["data_offset"] + frames * info["block_align"]
+    if ext == ".mp3":
+        return _id3v2_size(head) + int(max_seconds * MP3_MAX_BITRATE / 8 * 1.1) + READ_CHUNK
+    return None
+
+def read_upload_prefix(stream, filename: str, max_seconds: float) -> bytes:
+    """
+    업로드 스트림에서 앞 max_seconds 디코딩에 필요한 만큼만 읽는다.
+      WAV: 헤더를 파싱해 data 시작 + 필요한 프레임 수 × block_align
+      MP3: ID3v2 태그 + 최대 비트레이트 기준 바이트 수
+    나머지는 읽지 않으므로 긴 녹음도 메모리/디코딩 비용이 일정하다.
+    """
+    ext = os.path.splitext(filename.lower())[1]
+    buf = bytearray()
+    _read_until(stream, buf, READ_CHUNK)
+    limit = prefix_limit(bytes(buf), ext, max_seconds)
+    if limit is None and ext == ".wav" and len(buf) == READ_CHUNK:
+        # 헤더 앞쪽 청크(LIST 등)가 큰 경우: 조금 더 읽고 다시 시도
+        _read_until(stream, buf, 16 * READ_CHUNK)
+        limit = prefix_limit(bytes(buf), ext, max_seconds)
+    if limit is None:
+        while True:
+            chunk = stream.read(READ_CHUNK)
+            if not chunk:
+                break
+            buf += chunk
+    else:
+        _read_until(stream, buf, limit)
+    return bytes(buf)
+
+
+# ======================
+# PCM16 WAV 빠른 경로
+# ======================
+def _decode_pcm16_wav(audio_bytes: bytes, max_seconds: float):
+    """
+    16-bit PCM WAV(모노/스테레오)를 직접 파싱 → (float32 파형, sr), 해당 없으면 None.
+    샘플은 np.frombuffer 로 복사 없이 보고, float32 변환은 한 번에 한다.
+    """
+    info = parse_wav_header(audio_bytes[:READ_CHUNK * 16])
+    if info is None or info["format_tag"] != 1 or info["bits"] != 16 or info["channels"] not in (1, 2):
+        return None
+    ch, off = info["channels"], info["data_offset"]
+    if info["block_align"] != 2 * ch or not info["sr"]:
+        return None
+    available = (len(audio_bytes) - off) // info["block_align"]
+    declared = info["data_size"] // info["block_align"]
+    frames = min(available, declared or available, int(np.ceil(max_seconds * info["sr"])))
+    if frames <= 0:
+        return None
+    pcm = np.frombuffer(audio_bytes, dtype="<i2", count=frames * ch, offset=off)
+    if ch == 1:
+        y = np.multiply(pcm, np.float32(1.0 / 32768.0), dtype=np.float32)
+    else:
+        y = pcm.reshape(-1, ch).sum(axis=1, dtype=np.float32)
+        y *= np.float32(1.0 / (32768.0 * ch))
+    return y, info["sr"]
+
+
+# ======================
+# 리샘플 (librosa 기본 soxr_hq 를 직접 호출)
+# ======================
+def resample(y: np.ndarray, orig_sr: int, target_sr: int) -> np.ndarray:
+    """
+    librosa.resample 기본값과 같은 결과(soxr_hq)를 float32 그대로 얻는다.
+    자주 쓰는 비율(COMMON_RATES)은 librosa 를 거치지 않고 soxr 를 바로 부른다.
+    """
+    if orig_sr == target_sr:
+        return y
+    if orig_sr in COMMON_RATES and _soxr is not None:
+        return _soxr.resample(y, orig_sr, target_sr, quality="soxr_hq")
+    import librosa
+    return librosa.resample(y=y, orig_sr=orig_sr, target_sr=target_sr)
+
+
+# ======================
+# 디코딩 (필요한 프레임만)
+# ======================
+def decode_audio(audio_bytes: bytes, filename: str, target_sr: int = 16000,
+                 min_seconds: float = 0.3, max_seconds: float = 10.0) -> np.ndarray:
+    """디코딩 + 모노 + 리샘플 + max_seconds 자르기 (0-패딩은 하지 않음)"""
+    ext = os.path.splitext(filename.lower())[1]
+    if ext not in ALLOWED_EXT:
+        raise ValueError(f"Only WAV/MP3 allowed, got: {ext}")
+    t0 = time.perf_counter()
+    fast = _decode_pcm16_wav(audio_bytes, max_seconds) if ext == ".wav" else None
+    try:
+        if fast is not None:
+            y, sr = fast
+        elif ext == ".wav":
+            with sf.SoundFile(io.BytesIO(audio_bytes)) as f:
+                sr = f.samplerate
+                y = f.read(frames=int(np.ceil(max_seconds * sr)), always_2d=False)
+        else:
+            import librosa
+            y, sr = librosa.load(io.BytesIO(audio_bytes), sr=None, mono=False, duration=max_seconds)
+            if y.ndim == 2:
+                y = y.T     # librosa: (channels, n) → (n, channels)
+    except Exception as e:
+        raise RuntimeError(f"Audio decode failed: {e}")
+    if isinstance(y, np.ndarray) and y.ndim == 2:
+        y = y.mean(axis=1)
+    metrics.observe_stage("decode", time.perf_counter() - t0)
+    if sr != target_sr:
+        with metrics.stage("resample"):
+            y = resample(y.astype(np.float32, copy=False), sr, target_sr)
+    y = y.astype(np.float32, copy=False)
+    min_len = int(min_seconds * target_sr)
+    max_len = int(max_seconds * target_sr)
+    if y.size < min_len:
+        raise ValueError(f"Audio too short (<{min_seconds}s)")
+    y = y[:max_len]
+    metrics.AUDIO_SECONDS.observe(y.size / target_sr)
+    return y
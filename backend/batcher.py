@@ -0,0 +1,123 @@
+# batcher.py
+import threading, queue, time
+from concurrent.futures import Future
+
+import numpy as np
+
+
+# ======================
+# 동적 마이크로 배칭
+# ======================
+class MicroBatcher:
+    """
+    여러 요청의 입력 행(row)을 모아 한 번의 forward로 처리한다.
+      - max_batch_size 개가 모이거나
+      - 첫 요청 도착 후 max_wait_ms 가 지나면 flush
+    forward_fn: (B, D) float32 행렬 → (B, C) 확률 행렬
+    """
+
+    def __init__(self, forward_fn, max_batch_size: int = 32, max_wait_ms: float = 2.0, name: str = "batcher"):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.forward_fn = forward_fn
+        self.max_batch_size = int(max_batch_size)
+        self.max_wait_ms = float(max_wait_ms)
+        self._q: "queue.Queue[tuple[np.ndarray, Future, float]]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {
+            "batches": 0,
+            "items": 0,
+            "errors": 0,
+            "full_flushes": 0,      # max_batch_size 도달로 flush
+            "deadline_flushes": 0,  # max_wait_ms 만료로 flush
+            "wait_ms_total": 0.0,   # 요청별 큐 대기시간 합
+            "wait_ms_max": 0.0,
+            "forward_ms_total": 0.0,
+        }
+        self._size_hist = [0] * (self.max_batch_size + 1)
+        self._thread = threading.Thread(target=self._loop, name=name, daemon=True)
+        self._thread.start()
+
+    # ---------- 공개 API ----------
+    def submit(self, row) -> Future:
+        """1행 입력을 큐에 넣고 Future(확률 1행)를 반환"""
+        fut: Future = Future()
+        self._q.put((np.asarray(row, dtype=np.float32).reshape(-1), fut, time.perf_counter()))
+        return fut
+
+    def predict(self, row, timeout: float | None = None) -> np.ndarray:
+        """submit 후 결과를 기다림 (동기 호출용)"""
+        return self.submit(row).result(timeout=timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            hist = list(self._size_hist)
+        batches = s["batches"] or 1
+        items = s["items"] or 1
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait_ms,
+            "queue_depth": self._q.qsize(),
+            "batches": s["batches"],
+            "items": s["items"],
+            "errors": s["errors"],
+            "full_flushes": s["full_flushes"],
+            "deadline_flushes": s["deadline_flushes"],
+            "avg_batch_size": s["items"] / batches,
+            "avg_fill_ratio": s["items"] / batches / self.max_batch_size,
+            "avg_wait_ms": s["wait_ms_total"] / items,
+            "max_wait_ms_observed": s["wait_ms_max"],
+            "avg_forward_ms": s["forward_ms_total"] / batches,
+            "batch_size_hist": {str(i): n for i, n in enumerate(hist) if n},
+        }
+
+    # ---------- 내부 ----------
+    def _collect(self):
+        """첫 항목은 블로킹으로, 이후는 deadline까지 모은다"""
+        first = self._q.get()
+        items = [first]
+        deadline = first[2] + self.max_wait_ms / 1000.0
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    items.append(self._q.get_nowait())
+                else:
+                    items.append(self._q.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return items
+
+    def _loop(self):
+        while True:
+            items = self._collect()
+            t0 = time.perf_counter()
+            waits = [(t0 - enq) * 1000.0 for _, _, enq in items]
+            try:
+                x = np.stack([row for row, _, _ in items])
+                probs = np.asarray(self.forward_fn(x))
+                for i, (_, fut, _) in enumerate(items):
+                    fut.set_result(probs[i])
+                failed = False
+            except Exception as e:
+                for _, fut, _ in items:
+                    if not fut.done():
+                        fut.set_exception(e)
+                failed = True
+            forward_ms = (time.perf_counter() - t0) * 1000.0
+
+            n = len(items)
+            with self._lock:
+                st = self._stats
+                st["batches"] += 1
+                st["items"] += n
+                st["errors"] += int(failed)
+                if n >= self.max_batch_size:
+                    st["full_flushes"] += 1
+                else:
+                    st["deadline_flushes"] += 1
+                st["wait_ms_total"] += sum(waits)
+                st["wait_ms_max"] = max(st["wait_ms_max"], max(waits))
+                st["forward_ms_total"] += forward_ms
+                self._size_hist[n] += 1
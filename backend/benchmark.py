@@ -0,0 +1,499 @@
+#!/usr/bin/env python3
+"""
+탐지 파이프라인 벤치마크 (결과는 JSON → 두 실행을 자동 비교)
+
+사용법:
+  python benchmark.py corpus --out bench_corpus                    # 합성 WAV/MP3 코퍼스 생성 (시드 고정)
+  python benchmark.py stages --corpus bench_corpus --json a.json   # 단계별 마이크로벤치
+  python benchmark.py load   --corpus bench_corpus --json a.json   # 로컬 서버 기동 + 동시 부하
+  python benchmark.py compare base.json new.json --threshold 0.10  # 회귀 시 exit 1
+"""
+import argparse, hashlib, http.client, io, json, os, platform, resource, shutil
+import subprocess, sys, tempfile, threading, time, uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import soundfile as sf
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# 기본 코퍼스 구성 (--rates/--channels/--durations 로 변경)
+CORPUS_RATES     = (8000, 16000, 22050, 44100, 48000)
+CORPUS_CHANNELS  = (1, 2)
+CORPUS_DURATIONS = (0.3, 1.0, 3.0, 10.0, 60.0, 1800.0)
+CORPUS_FORMATS   = ("wav", "mp3")
+# 긴 파일은 모든 조합을 만들면 너무 커지므로 이 길이 이상은 대표 조합만
+LONG_SECONDS = 60.0
+LONG_COMBOS = {(16000, 1), (44100, 2)}
+
+
+# ======================
+# 공통
+# ======================
+def _percentiles(values) -> dict:
+    a = np.asarray(values, dtype=np.float64)
+    if a.size == 0:
+        return {}
+    return {
+        "n": int(a.size),
+        "mean_ms": float(a.mean()),
+        "min_ms": float(a.min()),
+        "p50_ms": float(np.percentile(a, 50)),
+        "p95_ms": float(np.percentile(a, 95)),
+        "p99_ms": float(np.percentile(a, 99)),
+    }
+
+def _peak_rss_mb(pid=None) -> float:
+    """최대 RSS (MB). pid 가 있으면 /proc/<pid>/status 의 VmHWM (Linux)"""
+    if pid is None:
+        kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return kb / 1024.0 if sys.platform != "darwin" else kb / 1024.0 / 1024.0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024.0
+    except OSError:
+        pass
+    return float("nan")
+
+def _children(pid) -> list:
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(p) for p in f.read().split()]
+    except OSError:
+        return []
+
+def _meta(args) -> dict:
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                         stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        commit = None
+    return {
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "args": {k: v for k, v in vars(args).items() if k != "func"},
+    }
+
+def _write_json(path, doc):
+    if not path:
+        print(json.dumps(doc, indent=2, ensure_ascii=False))
+        return
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(doc, f, indent=2, ensure_ascii=False)
+    print(f"✅ 결과 저장: {path}")
+
+def _load_manifest(corpus_dir: str) -> list:
+    with open(os.path.join(corpus_dir, "manifest.json"), encoding="utf-8") as f:
+        return json.load(f)["files"]
+
+def _select(files, max_seconds=None, formats=None) -> list:
+    out = []
+    for item in files:
+        if max_seconds is not None and item["seconds"] > max_seconds:
+            continue
+        if formats and item["format"] not in formats:
+            continue
+        out.append(item)
+    return out
+
+
+# ======================
+# 1) 합성 코퍼스
+# ======================
+def synth_voice(seconds: float, sr: int, channels: int, seed: int) -> np.ndarray:
+    """
+    음성 비슷한 합성 신호: 비브라토가 있는 배음(80~250 Hz 기본주파수) + 음절 단위 포락선 + 약한 잡음.
+    같은 (seconds, sr, channels, seed) 면 항상 같은 샘플.
+    """
+    rng = np.random.default_rng(seed)
+    n = max(1, int(round(seconds * sr)))
+    t = np.arange(n, dtype=np.float64) / sr
+    f0 = rng.uniform(80, 250) * (1.0 + 0.03 * np.sin(2 * np.pi * rng.uniform(3, 6) * t))
+    phase = 2 * np.pi * np.cumsum(f0) / sr
+    y = np.zeros(n)
+    for k in range(1, 12):
+        if k * f0.max() < sr / 2:
+            y += np.sin(k * phase) / k
+    syllable = 0.5 * (1 + np.sin(2 * np.pi * rng.uniform(2, 5) * t + rng.uniform(0, np.pi)))
+    y = 0.25 * y * syllable + 0.01 * rng.standard_normal(n)
+    y = y / max(1e-9, np.abs(y).max()) * 0.8
+    if channels == 1:
+        return y.astype(np.float32)
+    lag = int(0.0005 * sr)
+    right = np.concatenate([np.zeros(lag), y[:n - lag]]) * 0.9
+    return np.stack([y, right], axis=1).astype(np.float32)
+
+def cmd_corpus(args):
+    os.makedirs(args.out, exist_ok=True)
+    files = []
+    combos = [(sr, ch, sec, fmt) for fmt in args.formats for sec in args.durations
+              for sr in args.rates for ch in args.channels]
+    for i, (sr, ch, sec, fmt) in enumerate(combos):
+        if sec >= LONG_SECONDS and (sr, ch) not in LONG_COMBOS:
+            continue
+        if fmt == "mp3" and sr not in (8000, 11025, 12000, 16000, 22050, 24000, 32000, 44100, 48000):
+            continue
+        name = f"{fmt}_{sr}hz_{ch}ch_{sec:g}s.{fmt}"
+        path = os.path.join(args.out, name)
+        seed = args.seed * 1_000_003 + i
+        if not os.path.exists(path) or args.force:
+            # 긴 파일은 1분 단위로 이어 써서 메모리를 일정하게 유지
+            mode_fmt = "WAV" if fmt == "wav" else "MP3"
+            subtype = "PCM_16" if fmt == "wav" else None
+            with sf.SoundFile(path, "w", samplerate=sr, channels=ch, format=mode_fmt, subtype=subtype) as f:
+                left, k = sec, 0
+                while left > 0:
+                    part = min(left, 60.0)
+                    f.write(synth_voice(part, sr, ch, seed + k))
+                    left -= part
+                    k += 1
+        with open(path, "rb") as f:
+            digest = hashlib.sha256(f.read()).hexdigest()[:16]
+        files.append({"name": name, "format": fmt, "sr": sr, "channels": ch, "seconds": sec,
+                      "bytes": os.path.getsize(path), "sha256": digest})
+        print(f"  {name:<32} {os.path.getsize(path) / 1024:>10.1f} KiB")
+    with open(os.path.join(args.out, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({"seed": args.seed, "files": files}, f, indent=2)
+    print(f"✅ {len(files)}개 파일 → {args.out}")
+
+
+# ======================
+# 2) 단계별 마이크로벤치
+# ======================
+def _time_calls(fn, repeat: int, warmup: int = 1):
+    for _ in range(warmup):
+        fn()
+    out = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        out.append((time.perf_counter() - t0) * 1000.0)
+    return out
+
+def _load_engine(engine: str):
+    """(B, 13) MFCC → 확률 함수. server.py 를 import 하지 않고 같은 방식으로 로드"""
+    from numpy_engine import NumpyClassifier, source_version
+    model_path = os.path.join(ROOT, "best_asvspoof_model_cuda.pt")
+    scaler_path = os.path.join(ROOT, "scaler_asvspoof.pkl")
+    if engine == "numpy":
+        clf = NumpyClassifier.load(os.environ.get("NUMPY_MODEL_PATH", os.path.join(ROOT, "model_folded.npz")),
+                                   expect_version=source_version(model_path, scaler_path))
+        return {"forward": clf.predict_proba}
+    import torch, joblib
+    from model import AttentionAudioClassifier
+    model = AttentionAudioClassifier(input_dim=13, num_classes=3)
+    model.load_state_dict(torch.load(model_path, map_location="cpu"))
+    model.eval()
+    scaler = joblib.load(scaler_path)
+    from quantize import prepare, input_dtype
+    model, precision, _ = prepare(model, scaler, os.environ.get("MODEL_PRECISION", "fp32"))
+    dtype = input_dtype(precision)
+
+    def forward(x):
+        with torch.no_grad():
+            return torch.softmax(model(torch.from_numpy(x).to(dtype)).float(), dim=1).numpy()
+    return {"scaler": scaler.transform, "forward": forward}
+
+def cmd_stages(args):
+    import metrics
+    from audio_io import read_upload_prefix, decode_audio
+    from features import MFCCExtractor
+
+    files = _select(_load_manifest(args.corpus), args.max_seconds, args.formats)
+    ex = MFCCExtractor(sr=16000, n_mfcc=13)
+    total_len = int(10.0 * 16000)
+    results = {}
+    for item in files:
+        path = os.path.join(args.corpus, item["name"])
+        with open(path, "rb") as f:
+            raw = f.read()
+        repeat = args.repeat if item["seconds"] < LONG_SECONDS else max(3, args.repeat // 5)
+
+        read_ms = _time_calls(lambda: read_upload_prefix(io.BytesIO(raw), item["name"], 10.0), repeat)
+        head = read_upload_prefix(io.BytesIO(raw), item["name"], 10.0)
+        # decode_audio 가 내부에서 decode / resample 단계를 나눠 기록한다
+        stage_ms = {"decode": [], "resample": []}
+        y = None
+        for k in range(repeat + 1):
+            with metrics.collect_timings() as t:
+                y = decode_audio(head, item["name"], target_sr=16000, min_seconds=0.3, max_seconds=10.0)
+            if k:   # 첫 회는 워밍업
+                for name in stage_ms:
+                    stage_ms[name].append(t.get(name, 0.0) * 1000.0)
+        mfcc_ms = _time_calls(lambda: ex.transform_padded([y], total_len), repeat)
+        results[item["name"]] = {
+            "read": _percentiles(read_ms),
+            "decode": _percentiles(stage_ms["decode"]),
+            "resample": _percentiles(stage_ms["resample"]),
+            "mfcc": _percentiles(mfcc_ms),
+        }
+        print(f"  {item['name']:<32} read {np.median(read_ms):7.2f}  decode {np.median(stage_ms['decode']):7.2f}"
+              f"  resample {np.median(stage_ms['resample']):7.2f}  mfcc {np.median(mfcc_ms):7.2f} ms")
+
+    # 모델: 배치 크기별 (스케일러/forward 분리, torch 엔진일 때)
+    fns = _load_engine(args.engine)
+    rng = np.random.default_rng(0)
+    model_res = {}
+    for b in args.batch_sizes:
+        x = rng.standard_normal((b, 13)).astype(np.float32) * 50
+        row = {}
+        if "scaler" in fns:
+            row["scaler"] = _percentiles(_time_calls(lambda: fns["scaler"](x), args.repeat * 5, warmup=3))
+            xs = fns["scaler"](x).astype(np.float32)
+        else:
+            xs = x
+        row["forward"] = _percentiles(_time_calls(lambda: fns["forward"](xs), args.repeat * 5, warmup=3))
+        model_res[f"batch_{b}"] = row
+        print(f"  model batch={b:<4} " + "  ".join(f"{k} {v['p50_ms']:.3f}" for k, v in row.items()) + " ms")
+
+    _write_json(args.json, {"kind": "stages", "meta": _meta(args), "engine": args.engine,
+                            "files": results, "model": model_res, "peak_rss_mb": _peak_rss_mb()})
+
+
+# ======================
+# 3) 로컬 서버 동시 부하
+# ======================
+def _multipart(fields: dict, file_field: str, filename: str, data: bytes):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for k, v in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{k}"\r\n\r\n{v}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{file_field}"; filename="{filename}"\r\n'
+                 f"Content-Type: application/octet-stream\r\n\r\n".encode())
+    parts.append(data)
+    parts.append(f"\r\n--{boundary}--\r\n".encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+def _wait_ready(host, port, timeout: float) -> bool:
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            c = http.client.HTTPConnection(host, port, timeout=2)
+            c.request("GET", "/health")
+            if c.getresponse().status == 200:
+                return True
+        except OSError:
+            pass
+        time.sleep(0.5)
+    return False
+
+def _start_server(args, tmpdir):
+    env = dict(os.environ)
+    env.update({
+        "DB_PATH": os.path.join(tmpdir, "bench.db"),
+        "RESULT_CACHE_PATH": os.path.join(tmpdir, "cache.db"),
+        "RESULT_CACHE_SIZE": "0", "RESULT_CACHE_DISK_SIZE": "0",   # 같은 파일 반복이 캐시에 맞지 않게
+        "PORT": str(args.port),
+    })
+    for kv in args.env:
+        k, _, v = kv.partition("=")
+        env[k] = v
+    script = "run.py" if args.server == "asgi" else "server.py"
+    log = open(os.path.join(tmpdir, "server.log"), "w")
+    proc = subprocess.Popen([sys.executable, os.path.join(ROOT, script)], cwd=ROOT, env=env,
+                            stdout=log, stderr=subprocess.STDOUT)
+    return proc, log
+
+def cmd_load(args):
+    files = _select(_load_manifest(args.corpus), args.max_seconds, args.formats)
+    if not files:
+        sys.exit("no corpus files selected")
+    payloads = []
+    for item in files:
+        with open(os.path.join(args.corpus, item["name"]), "rb") as f:
+            body, ctype = _multipart({"confirm": "1" if args.confirm else "0"}, "audio", item["name"], f.read())
+        payloads.append((item["name"], body, ctype))
+
+    tmpdir = tempfile.mkdtemp(prefix="dvd-bench-")
+    proc, log = (None, None) if args.url else _start_server(args, tmpdir)
+    host, port = (args.url.split(":")[0], int(args.url.split(":")[1])) if args.url else ("127.0.0.1", args.port)
+    try:
+        if not _wait_ready(host, port, args.startup_timeout):
+            sys.exit(f"server did not become ready (log: {os.path.join(tmpdir, 'server.log')})")
+
+        lat, statuses, lock = [], {}, threading.Lock()
+        deadline = time.time() + args.duration
+        counter = iter(range(10 ** 9))
+
+        def client(_):
+            conn = http.client.HTTPConnection(host, port, timeout=120)
+            while time.time() < deadline:
+                i = next(counter)
+                if args.requests and i >= args.requests:
+                    break
+                name, body, ctype = payloads[i % len(payloads)]
+                t0 = time.perf_counter()
+                try:
+                    conn.request("POST", "/predict", body=body, headers={"Content-Type": ctype})
+                    resp = conn.getresponse()
+                    resp.read()
+                    status = resp.status
+                except OSError:
+                    status = "conn_error"
+                    conn.close()
+                    conn = http.client.HTTPConnection(host, port, timeout=120)
+                ms = (time.perf_counter() - t0) * 1000.0
+                with lock:
+                    lat.append(ms)
+                    statuses[str(status)] = statuses.get(str(status), 0) + 1
+            conn.close()
+
+        # 워밍업 (모델/워커 첫 호출 제외)
+        for name, body, ctype in payloads[:min(3, len(payloads))]:
+            c = http.client.HTTPConnection(host, port, timeout=120)
+            c.request("POST", "/predict", body=body, headers={"Content-Type": ctype})
+            c.getresponse().read()
+
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(args.concurrency) as ex:
+            list(ex.map(client, range(args.concurrency)))
+        wall = time.perf_counter() - t0
+
+        rss = None
+        if proc is not None:
+            rss = _peak_rss_mb(proc.pid)
+            workers = [_peak_rss_mb(p) for p in _children(proc.pid)]
+            rss = {"server_mb": rss, "children_mb": workers, "total_mb": rss + sum(workers)}
+        ok = sum(n for s, n in statuses.items() if s == "200")
+        doc = {
+            "kind": "load", "meta": _meta(args), "server": args.server if proc else args.url,
+            "files": [p[0] for p in payloads],
+            "requests": len(lat), "ok": ok, "statuses": statuses, "wall_s": wall,
+            "throughput_rps": ok / wall if wall > 0 else 0.0,
+            "latency": _percentiles(lat), "peak_rss": rss,
+        }
+        p = doc["latency"]
+        print(f"  {len(lat)} req / {wall:.1f}s → {doc['throughput_rps']:.1f} req/s  "
+              f"p50 {p.get('p50_ms', 0):.1f}  p95 {p.get('p95_ms', 0):.1f}  p99 {p.get('p99_ms', 0):.1f} ms  {statuses}")
+        _write_json(args.json, doc)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+            log.close()
+            if not args.keep_tmp:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+# ======================
+# 4) 두 결과 비교
+# ======================
+# 키 끝이 이것이면 작을수록 좋음 / 클수록 좋음 (그 외는 비교하지 않음)
+LOWER_IS_BETTER  = ("p50_ms", "p95_ms", "p99_ms", "mean_ms", "_mb")
+HIGHER_IS_BETTER = ("throughput_rps",)
+
+def _flatten(doc, prefix="") -> dict:
+    out = {}
+    if isinstance(doc, dict):
+        for k, v in doc.items():
+            if k == "meta":
+                continue
+            out.update(_flatten(v, f"{prefix}{k}."))
+    elif isinstance(doc, (int, float)) and not isinstance(doc, bool):
+        out[prefix[:-1]] = float(doc)
+    return out
+
+def compare(base: dict, new: dict, threshold: float) -> list:
+    """[(key, base, new, 변화율, 'regression'|'improvement'|''), ...]"""
+    a, b = _flatten(base), _flatten(new)
+    rows = []
+    for key in sorted(set(a) & set(b)):
+        if key.endswith(HIGHER_IS_BETTER):
+            sign = -1.0
+        elif key.endswith(LOWER_IS_BETTER):
+            sign = 1.0
+        else:
+            continue
+        if not np.isfinite(a[key]) or not np.isfinite(b[key]) or a[key] <= 0:
+            continue
+        change = (b[key] - a[key]) / a[key]
+        verdict = ""
+        if sign * change > threshold:
+            verdict = "regression"
+        elif sign * change < -threshold:
+            verdict = "improvement"
+        rows.append((key, a[key], b[key], change, verdict))
+    return rows
+
+def cmd_compare(args):
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    rows = compare(base, new, args.threshold)
+    regressions = [r for r in rows if r[4] == "regression"]
+    for key, x, y, change, verdict in rows:
+        if verdict or args.verbose:
+            mark = {"regression": "❌", "improvement": "✅"}.get(verdict, "  ")
+            print(f"{mark} {key:<60} {x:10.3f} → {y:10.3f}  ({change * 100:+.1f}%)")
+    print(f"{len(rows)}개 지표 비교, 회귀 {len(regressions)}개 (임계 {args.threshold * 100:.0f}%)")
+    if args.json:
+        _write_json(args.json, {"kind": "compare", "threshold": args.threshold, "regressions": [
+            {"key": k, "base": x, "new": y, "change": c} for k, x, y, c, _ in regressions]})
+    sys.exit(1 if regressions else 0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Detection pipeline benchmarks")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    p = sub.add_parser("corpus", help="generate a synthetic WAV/MP3 corpus")
+    p.add_argument("--out", default=os.path.join(ROOT, "bench_corpus"))
+    p.add_argument("--rates", type=int, nargs="+", default=list(CORPUS_RATES))
+    p.add_argument("--channels", type=int, nargs="+", default=list(CORPUS_CHANNELS))
+    p.add_argument("--durations", type=float, nargs="+", default=list(CORPUS_DURATIONS))
+    p.add_argument("--formats", nargs="+", default=list(CORPUS_FORMATS), choices=CORPUS_FORMATS)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--force", action="store_true", help="regenerate existing files")
+    p.set_defaults(func=cmd_corpus)
+
+    p = sub.add_parser("stages", help="microbenchmark each pipeline stage")
+    p.add_argument("--corpus", default=os.path.join(ROOT, "bench_corpus"))
+    p.add_argument("--engine", default=os.environ.get("INFERENCE_ENGINE", "torch"), choices=("torch", "numpy"))
+    p.add_argument("--repeat", type=int, default=20)
+    p.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 8, 32, 128])
+    p.add_argument("--max-seconds", type=float, default=None)
+    p.add_argument("--formats", nargs="+", default=None, choices=CORPUS_FORMATS)
+    p.add_argument("--json", default=None)
+    p.set_defaults(func=cmd_stages)
+
+    p = sub.add_parser("load", help="concurrent end-to-end load against a local server")
+    p.add_argument("--corpus", default=os.path.join(ROOT, "bench_corpus"))
+    p.add_argument("--server", default="flask", choices=("flask", "asgi"))
+    p.add_argument("--url", default=None, help="host:port of an already running server (skip startup)")
+    p.add_argument("--port", type=int, default=5057)
+    p.add_argument("--env", nargs="*", default=[], help="extra server env, e.g. EXTRACT_WORKERS=4")
+    p.add_argument("--concurrency", type=int, default=16)
+    p.add_argument("--duration", type=float, default=20.0)
+    p.add_argument("--requests", type=int, default=0, help="stop after N requests (0 = duration only)")
+    p.add_argument("--max-seconds", type=float, default=60.0)
+    p.add_argument("--formats", nargs="+", default=None, choices=CORPUS_FORMATS)
+    p.add_argument("--confirm", action="store_true", help="send confirm=1 (exercise DB writes)")
+    p.add_argument("--startup-timeout", type=float, default=120.0)
+    p.add_argument("--keep-tmp", action="store_true")
+    p.add_argument("--json", default=None)
+    p.set_defaults(func=cmd_load)
+
+    p = sub.add_parser("compare", help="compare two result files and flag regressions")
+    p.add_argument("base")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.10)
+    p.add_argument("--verbose", action="store_true")
+    p.add_argument("--json", default=None)
+    p.set_defaults(func=cmd_compare)
+
+    args = ap.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,833 @@
+# db.py
+import sqlite3, os, re, threading, queue, time, atexit
+from concurrent.futures import Future
+from datetime import datetime, timezone
+
+import metrics
+
+# ======================
+# 경로/설정
+# ======================
+ROOT = os.path.dirname(os.path.abspath(__file__))
+DB_PATH = os.environ.get("DB_PATH", os.path.join(ROOT, "deepfake.db"))
+
+# 단일 writer 그룹 커밋
+WRITER_MAX_BATCH   = int(os.environ.get("DB_WRITER_MAX_BATCH", "128"))
+WRITER_MAX_WAIT_MS = float(os.environ.get("DB_WRITER_MAX_WAIT_MS", "1"))
+
+# 위험도 구간 (통계 요약): risk >= RISK_HIGH → high, >= RISK_MEDIUM → medium, 그 외 low
+RISK_HIGH   = float(os.environ.get("RISK_HIGH", "0.8"))
+RISK_MEDIUM = float(os.environ.get("RISK_MEDIUM", "0.5"))
+
+# ======================
+# DB 유틸/마이그레이션
+# ======================
+def _utcnow_str():
+    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+def _clamp(v: float, lo: float = 0.0, hi: float = 1.0) -> float:
+    try:
+        v = float(v)
+    except Exception:
+        v = lo
+    return max(lo, min(hi, v))
+
+_PHONE_SEP = re.compile(r"[\s\-().]")
+
+def normalize_phone(raw) -> str | None:
+    """
+    전화번호 표기 통일 (저장 키 / 조회 키 공통)
+      "010-1234-5678", "+82 10 1234 5678", "0082-10-1234-5678" → "01012345678"
+      그 밖의 국제번호는 "+<숫자>" 형태 유지, 숫자가 아니면 None
+    """
+    if raw is None:
+        return None
+    s = _PHONE_SEP.sub("", str(raw))
+    if s.startswith("00"):
+        s = "+" + s[2:]
+    if s.startswith("+82"):
+        s = s[3:]
+        s = s if s.startswith("0") else "0" + s
+    digits = s[1:] if s.startswith("+") else s
+    if not digits.isdigit() or not 3 <= len(digits) <= 20:
+        return None
+    return s
+
+def ema_risk(conf: float, old_risk):
+    """
+    동적 α EMA 한 단계 → (new_risk, alpha)
+      alpha = 0.3 + 0.7*(conf - 0.5)  → 0~1로 클램프 (신뢰도 높을수록 더 빠르게 반영)
+      old_risk 없으면 conf로 시작
+    """
+    conf = _clamp(conf)
+    alpha = _clamp(0.3 + 0.7 * (conf - 0.5))
+    if old_risk is None:
+        return conf, alpha
+    return _clamp(alpha * conf + (1.0 - alpha) * float(old_risk)), alpha
+
+def _conn():
+    # WAL + busy_timeout으로 "database is locked" 완화
+    conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None, check_same_thread=False)  # autocommit
+    cur = conn.cursor()
+    cur.execute("PRAGMA journal_mode=WAL;")
+    cur.execute("PRAGMA synchronous=NORMAL;")
+    cur.execute("PRAGMA busy_timeout=10000;")
+    cur.execute("PRAGMA foreign_keys=ON;")
+    return conn
+
+# ======================
+# 연결 풀: 스레드별 reader + 단일 writer
+# ======================
+_local = threading.local()
+
+_writer_local = threading.local()    # writer 스레드: 현재 트랜잭션의 커밋 후 작업
+
+def after_commit(fn, *args):
+    """
+    writer 트랜잭션이 커밋된 뒤에 fn(*args) 실행 (작업이 롤백되면 버림).
+    writer 밖(직접 연 연결)에서 부르면 바로 실행한다.
+    """
+    pending = getattr(_writer_local, "pending", None)
+    if pending is None:
+        fn(*args)
+    else:
+        pending.append((fn, args))
+
+# 번호별 위험도가 바뀌면 (커밋 후) 호출: fn(phone_number, risk_score, report_count, updated_at)
+_phone_report_listeners = []
+
+def on_phone_report(fn):
+    _phone_report_listeners.append(fn)
+    return fn
+
+def _notify_phone_report(*row):
+    for fn in _phone_report_listeners:
+        try:
+            fn(*row)
+        except Exception:
+            pass
+
+def reader():
+    """스레드별로 한 번만 여는 읽기 전용 연결 (PRAGMA 재실행 없음)"""
+    conn = getattr(_local, "conn", None)
+    if conn is None or getattr(_local, "pid", None) != os.getpid():
+        conn = _conn()
+        conn.execute("PRAGMA query_only=ON;")
+        _local.conn, _local.pid = conn, os.getpid()
+    return conn
+
+
+class DBWriter:
+    """
+    모든 쓰기를 전용 스레드 1개가 처리한다.
+    큐에 쌓인 작업을 최대 max_batch 개씩 묶어 한 트랜잭션으로 커밋(그룹 커밋)하고,
+    작업별로 SAVEPOINT 를 두어 한 작업의 실패가 같은 묶음의 다른 작업에 번지지 않게 한다.
+    작업 함수는 fn(cur, *args) 형태이며 반환값이 Future 결과가 된다.
+    """
+
+    def __init__(self, max_batch: int = WRITER_MAX_BATCH, max_wait_ms: float = WRITER_MAX_WAIT_MS):
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait_ms = float(max_wait_ms)
+        self._q: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._stats = {
+            "commits": 0,
+            "jobs": 0,
+            "job_errors": 0,
+            "commit_errors": 0,
+            "commit_ms_total": 0.0,
+            "commit_ms_max": 0.0,
+            "commit_ms_last": 0.0,
+            "queue_wait_ms_total": 0.0,
+            "max_group": 0,
+        }
+        self._thread = threading.Thread(target=self._loop, name="db-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn, *args) -> Future:
+        fut: Future = Future()
+        self._q.put((fn, args, fut, time.perf_counter()))
+        return fut
+
+    def close(self, timeout: float = 5.0):
+        """남은 작업을 모두 커밋한 뒤 종료"""
+        self._q.put(None)
+        self._thread.join(timeout)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        commits = s["commits"] or 1
+        jobs = s["jobs"] or 1
+        return {
+            "queue_depth": self._q.qsize(),
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait_ms,
+            "commits": s["commits"],
+            "jobs": s["jobs"],
+            "job_errors": s["job_errors"],
+            "commit_errors": s["commit_errors"],
+            "avg_group_size": s["jobs"] / commits,
+            "max_group_size": s["max_group"],
+            "avg_commit_ms": s["commit_ms_total"] / commits,
+            "max_commit_ms": s["commit_ms_max"],
+            "last_commit_ms": s["commit_ms_last"],
+            "avg_queue_wait_ms": s["queue_wait_ms_total"] / jobs,
+        }
+
+    def _collect(self):
+        first = self._q.get()
+        if first is None:
+            return None
+        jobs = [first]
+        deadline = time.perf_counter() + self.max_wait_ms / 1000.0
+        while len(jobs) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                job = self._q.get_nowait() if remaining <= 0 else self._q.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if job is None:
+                self._q.put(None)   # 종료 신호는 이번 묶음 처리 후에
+                break
+            jobs.append(job)
+        return jobs
+
+    def _loop(self):
+        conn = _conn()
+        cur = conn.cursor()
+        while True:
+            jobs = self._collect()
+            if jobs is None:
+                break
+            t0 = time.perf_counter()
+            results = []
+            errors = 0
+            pending = _writer_local.pending = []
+            try:
+                cur.execute("BEGIN IMMEDIATE")
+                for fn, args, fut, _ in jobs:
+                    cur.execute("SAVEPOINT job")
+                    mark = len(pending)
+                    try:
+                        results.append((fut, fn(cur, *args), None))
+                        cur.execute("RELEASE job")
+                    except Exception as e:
+                        cur.execute("ROLLBACK TO job")
+                        cur.execute("RELEASE job")
+                        del pending[mark:]
+                        results.append((fut, None, e))
+                        errors += 1
+                cur.execute("COMMIT")
+            except Exception as e:
+                _writer_local.pending = None
+                try:
+                    cur.execute("ROLLBACK")
+                except Exception:
+                    pass
+                with self._lock:
+                    self._stats["commit_errors"] += 1
+                for _, _, fut, _ in jobs:
+                    if not fut.done():
+                        fut.set_exception(e)
+                continue
+            commit_ms = (time.perf_counter() - t0) * 1000.0
+            metrics.observe_stage("db_commit", commit_ms / 1000.0)
+            _writer_local.pending = None
+            for fn, args in pending:
+                try:
+                    fn(*args)
+                except Exception:
+                    pass
+
+            # 커밋이 끝난 뒤에 결과를 돌려준다 (호출자는 영속화된 row id 를 받음)
+            for fut, value, err in results:
+                if err is not None:
+                    fut.set_exception(err)
+                else:
+                    fut.set_result(value)
+            with self._lock:
+                st = self._stats
+                st["commits"] += 1
+                st["jobs"] += len(jobs)
+                st["job_errors"] += errors
+                st["commit_ms_total"] += commit_ms
+                st["commit_ms_max"] = max(st["commit_ms_max"], commit_ms)
+                st["commit_ms_last"] = commit_ms
+                st["queue_wait_ms_total"] += sum((t0 - enq) * 1000.0 for _, _, _, enq in jobs)
+                st["max_group"] = max(st["max_group"], len(jobs))
+        conn.close()
+
+
+_writer = None
+_writer_pid = None
+_writer_lock = threading.Lock()
+
+def get_writer() -> DBWriter:
+    """프로세스별 writer (fork 후에는 새로 시작)"""
+    global _writer, _writer_pid
+    if _writer is None or _writer_pid != os.getpid() or not _writer._thread.is_alive():
+        with _writer_lock:
+            if _writer is None or _writer_pid != os.getpid() or not _writer._thread.is_alive():
+                _writer = DBWriter()
+                _writer_pid = os.getpid()
+                atexit.register(_writer.close)
+    return _writer
+
+def write(fn, *args, timeout: float | None = 30.0):
+    """fn(cur, *args) 를 writer 트랜잭션 안에서 실행하고 결과를 기다림 (대기 포함 시간을 db_<작업> 단계로 기록)"""
+    with metrics.stage(_stage_name(fn)):
+        return get_writer().submit(fn, *args).result(timeout=timeout)
+
+def _stage_name(fn) -> str:
+    name = getattr(fn, "__name__", "job").strip("_")
+    return "db_" + (name[:-4] if name.endswith("_cur") else name)
+
+# ======================
+# 스키마
+# ======================
+def _table_columns(cur, table):
+    cur.execute(f"PRAGMA table_info({table})")
+    return [r[1] for r in cur.fetchall()]
+
+def init_db():
+    """테이블 생성 + 스키마 자동 업그레이드"""
+    conn = _conn()
+    cur = conn.cursor()
+
+    # results: 파일별 최신 판별 + 연결된 전화번호(선택)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS results (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp    TEXT NOT NULL,
+        filename     TEXT,
+        prediction   TEXT,
+        confidence   REAL,
+        prob_real    REAL,
+        prob_fake2   REAL,
+        prob_tts     REAL,
+        phone_number TEXT
+    )
+    """)
+    cols = _table_columns(cur, "results")
+    if "phone_number" not in cols:
+        cur.execute("ALTER TABLE results ADD COLUMN phone_number TEXT")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_results_filename ON results(filename)")
+
+    # phone_reports: 번호별 누적
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS phone_reports (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        phone_number    TEXT UNIQUE,
+        report_count    INTEGER DEFAULT 0,
+        last_confidence REAL,
+        risk_score      REAL,
+        ema_alpha       REAL,
+        updated_at      TEXT,
+        created_at      TEXT
+    )
+    """)
+    cols = _table_columns(cur, "phone_reports")
+    if "report_count" not in cols:
+        cur.execute("ALTER TABLE phone_reports ADD COLUMN report_count INTEGER DEFAULT 0")
+    if "last_confidence" not in cols:
+        cur.execute("ALTER TABLE phone_reports ADD COLUMN last_confidence REAL")
+    if "risk_score" not in cols:
+        cur.execute("ALTER TABLE phone_reports ADD COLUMN risk_score REAL")
+    if "ema_alpha" not in cols:
+        cur.execute("ALTER TABLE phone_reports ADD COLUMN ema_alpha REAL")
+    if "updated_at" not in cols:
+        cur.execute("ALTER TABLE phone_reports ADD COLUMN updated_at TEXT")
+    if "created_at" not in cols:
+        cur.execute("ALTER TABLE phone_reports ADD COLUMN created_at TEXT")
+
+    now = _utcnow_str()
+    cur.execute("UPDATE phone_reports SET report_count = COALESCE(report_count, 0)")
+    cur.execute("UPDATE phone_reports SET ema_alpha   = COALESCE(ema_alpha, 0.3)")
+    cur.execute("UPDATE phone_reports SET updated_at  = COALESCE(updated_at, ?)", (now,))
+    cur.execute("UPDATE phone_reports SET created_at  = COALESCE(created_at, ?)", (now,))
+    # 메모리 인덱스(phone_index)의 증분 갱신용
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_phone_reports_updated ON phone_reports(updated_at)")
+
+    # 상위 K 조회용 (ORDER BY ... LIMIT k 가 인덱스만 훑음)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_phone_reports_risk ON phone_reports(risk_score DESC, report_count DESC)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_phone_reports_count ON phone_reports(report_count DESC, risk_score DESC)")
+
+    # phone_pool_cursor: 번호 풀 순환 위치 (프로세스 간 공유)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS phone_pool_cursor (
+        id  INTEGER PRIMARY KEY CHECK (id = 1),
+        pos INTEGER NOT NULL
+    )
+    """)
+
+    # jobs: 비동기 판별 작업 큐 (jobs.py). 업로드 바이트는 좁은 jobs 행과 분리해 job_payloads 에
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS jobs (
+        id           TEXT PRIMARY KEY,
+        status       TEXT NOT NULL,              -- queued | running | done | failed
+        filename     TEXT,
+        confirm      INTEGER NOT NULL DEFAULT 0,
+        phone_number TEXT,
+        vad          INTEGER NOT NULL DEFAULT 0,
+        attempts     INTEGER NOT NULL DEFAULT 0,
+        lease_until  REAL,
+        worker       TEXT,
+        created_at   REAL NOT NULL,
+        started_at   REAL,
+        finished_at  REAL,
+        http_status  INTEGER,
+        result       TEXT,
+        error        TEXT
+    )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status_created ON jobs(status, created_at)")
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS job_payloads (
+        job_id TEXT PRIMARY KEY,
+        data   BLOB NOT NULL
+    )
+    """)
+
+    _init_stats(cur)
+    _init_rollups(cur)
+    _migrate_phone_numbers(cur)
+
+    conn.commit()
+    conn.close()
+
+def _migrate_phone_numbers(cur):
+    """
+    1회 (user_version 0 → 1): 번호 정규화 이전에 저장된 표기를 normalize_phone 형태로 통일.
+      results.phone_number 는 그대로 바꾸고, phone_reports 는 같은 번호로 모이는 행을 하나로 합친다
+      (신고 수는 합, 위험도/α/마지막 신뢰도는 updated_at 이 가장 최근인 행 — phone_index 병합과 같은 규칙).
+    형식이 맞지 않아 정규화되지 않는 번호는 건드리지 않는다.
+    """
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        if cur.execute("PRAGMA user_version").fetchone()[0] >= 1:
+            cur.execute("COMMIT")
+            return
+        cur.connection.create_function("normalize_phone", 1, normalize_phone, deterministic=True)
+        cur.execute("""
+            UPDATE results SET phone_number = normalize_phone(phone_number)
+             WHERE phone_number IS NOT NULL AND phone_number != COALESCE(normalize_phone(phone_number), phone_number)
+        """)
+
+        groups = {}
+        for row in cur.execute("""
+            SELECT id, phone_number, report_count, last_confidence, risk_score, ema_alpha, updated_at, created_at
+              FROM phone_reports WHERE phone_number IS NOT NULL
+        """).fetchall():
+            key = normalize_phone(row[1])
+            if key is not None:
+                groups.setdefault(key, []).append(row)
+        now = _utcnow_str()
+        for key, rows in groups.items():
+            if len(rows) == 1 and rows[0][1] == key:
+                continue
+            keep = next((r for r in rows if r[1] == key), min(rows, key=lambda r: r[0]))
+            latest = max(rows, key=lambda r: (r[6] or "", r[0]))
+            cur.executemany("DELETE FROM phone_reports WHERE id = ?", [(r[0],) for r in rows if r is not keep])
+            cur.execute("""
+                UPDATE phone_reports
+                   SET phone_number = ?, report_count = ?, last_confidence = ?, risk_score = ?, ema_alpha = ?,
+                       updated_at = ?, created_at = ?
+                 WHERE id = ?
+            """, (key, sum(r[2] or 0 for r in rows), latest[3], latest[4], latest[5],
+                  now, min((r[7] for r in rows if r[7]), default=now), keep[0]))
+        cur.execute("PRAGMA user_version = 1")
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+
+# ======================
+# 통계 요약 (트리거로 증분 유지)
+# ======================
+def _bands(row: str) -> str:
+    """트리거용: (high, medium, low) 0/1 식"""
+    r = f"COALESCE({row}.risk_score, 0)"
+    return f"({r} >= {RISK_HIGH!r})", f"({r} >= {RISK_MEDIUM!r} AND {r} < {RISK_HIGH!r})", f"({r} < {RISK_MEDIUM!r})"
+
+def _init_stats(cur):
+    """
+    phone_stats(1행) / result_stats(라벨별) 요약 테이블 + 트리거.
+    phone_reports/results 에 쓰는 모든 경로(서버 writer, upload_json 일괄 반영 등)가
+    같은 트랜잭션 안에서 요약을 갱신하므로, 통계 조회는 테이블 크기와 무관하게 O(1).
+    구간 기준(RISK_HIGH/RISK_MEDIUM)이 바뀌었거나 요약이 없으면 1회 전체 집계로 다시 만든다.
+    """
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS phone_stats (
+            id        INTEGER PRIMARY KEY CHECK (id = 1),
+            numbers   INTEGER NOT NULL DEFAULT 0,
+            reports   INTEGER NOT NULL DEFAULT 0,
+            risk_sum  REAL    NOT NULL DEFAULT 0,
+            high      INTEGER NOT NULL DEFAULT 0,
+            medium    INTEGER NOT NULL DEFAULT 0,
+            low       INTEGER NOT NULL DEFAULT 0,
+            high_at   REAL,
+            medium_at REAL
+        )
+        """)
+        cur.execute("""
+        CREATE TABLE IF NOT EXISTS result_stats (
+            prediction TEXT PRIMARY KEY,
+            count      INTEGER NOT NULL DEFAULT 0,
+            conf_sum   REAL    NOT NULL DEFAULT 0
+        )
+        """)
+
+        # 구간 기준이 트리거 본문에 들어가므로 매번 다시 만든다
+        for name in ("phone_reports_stats_ai", "phone_reports_stats_au", "phone_reports_stats_ad",
+                     "results_stats_ai", "results_stats_au", "results_stats_ad"):
+            cur.execute(f"DROP TRIGGER IF EXISTS {name}")
+        nh, nm, nl = _bands("NEW")
+        oh, om, ol = _bands("OLD")
+        cur.execute(f"""
+        CREATE TRIGGER phone_reports_stats_ai AFTER INSERT ON phone_reports BEGIN
+            UPDATE phone_stats SET
+                numbers  = numbers + 1,
+                reports  = reports + COALESCE(NEW.report_count, 0),
+                risk_sum = risk_sum + COALESCE(NEW.risk_score, 0),
+                high = high + {nh}, medium = medium + {nm}, low = low + {nl}
+             WHERE id = 1;
+        END
+        """)
+        cur.execute(f"""
+        CREATE TRIGGER phone_reports_stats_au AFTER UPDATE OF report_count, risk_score ON phone_reports BEGIN
+            UPDATE phone_stats SET
+                reports  = reports + COALESCE(NEW.report_count, 0) - COALESCE(OLD.report_count, 0),
+                risk_sum = risk_sum + COALESCE(NEW.risk_score, 0) - COALESCE(OLD.risk_score, 0),
+                high = high + {nh} - {oh}, medium = medium + {nm} - {om}, low = low + {nl} - {ol}
+             WHERE id = 1;
+        END
+        """)
+        cur.execute(f"""
+        CREATE TRIGGER phone_reports_stats_ad AFTER DELETE ON phone_reports BEGIN
+            UPDATE phone_stats SET
+                numbers  = numbers - 1,
+                reports  = reports - COALESCE(OLD.report_count, 0),
+                risk_sum = risk_sum - COALESCE(OLD.risk_score, 0),
+                high = high - {oh}, medium = medium - {om}, low = low - {ol}
+             WHERE id = 1;
+        END
+        """)
+        add_new = """
+            INSERT INTO result_stats (prediction, count, conf_sum)
+            VALUES (COALESCE(NEW.prediction, ''), 1, COALESCE(NEW.confidence, 0))
+            ON CONFLICT(prediction) DO UPDATE SET count = count + 1, conf_sum = conf_sum + excluded.conf_sum;
+        """
+        sub_old = """
+            UPDATE result_stats SET count = count - 1, conf_sum = conf_sum - COALESCE(OLD.confidence, 0)
+             WHERE prediction = COALESCE(OLD.prediction, '');
+        """
+        cur.execute(f"CREATE TRIGGER results_stats_ai AFTER INSERT ON results BEGIN {add_new} END")
+        cur.execute(f"CREATE TRIGGER results_stats_au AFTER UPDATE OF prediction, confidence ON results BEGIN {sub_old} {add_new} END")
+        cur.execute(f"CREATE TRIGGER results_stats_ad AFTER DELETE ON results BEGIN {sub_old} END")
+
+        cur.execute("SELECT high_at, medium_at FROM phone_stats WHERE id = 1")
+        row = cur.fetchone()
+        if row is None or row[0] != RISK_HIGH or row[1] != RISK_MEDIUM:
+            _rebuild_stats_cur(cur)
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+
+def _rebuild_stats_cur(cur):
+    """요약 테이블을 전체 집계로 다시 채움 (마이그레이션/구간 변경/수동 점검용)"""
+    h, m, l = (b.replace("X.", "") for b in _bands("X"))
+    cur.execute("DELETE FROM phone_stats")
+    cur.execute(f"""
+        INSERT INTO phone_stats (id, numbers, reports, risk_sum, high, medium, low, high_at, medium_at)
+        SELECT 1, COUNT(*), COALESCE(SUM(report_count), 0), TOTAL(risk_score),
+               COALESCE(SUM({h}), 0), COALESCE(SUM({m}), 0), COALESCE(SUM({l}), 0), ?, ?
+          FROM phone_reports
+    """, (RISK_HIGH, RISK_MEDIUM))
+    cur.execute("DELETE FROM result_stats")
+    cur.execute("""
+        INSERT INTO result_stats (prediction, count, conf_sum)
+        SELECT COALESCE(prediction, ''), COUNT(*), TOTAL(confidence) FROM results GROUP BY 1
+    """)
+
+def rebuild_stats():
+    write(_rebuild_stats_cur)
+
+def get_stats() -> dict:
+    """요약 테이블만 읽는 통계 (번호 수/신고 수/평균/위험도 구간/판별 라벨별 건수)"""
+    conn = reader()
+    row = conn.execute("SELECT numbers, reports, risk_sum, high, medium, low FROM phone_stats WHERE id = 1").fetchone()
+    numbers, reports, risk_sum, high, medium, low = row or (0, 0, 0.0, 0, 0, 0)
+    by_pred = {
+        (label or "unknown"): {"count": count, "avg_confidence": conf_sum / count}
+        for label, count, conf_sum in conn.execute(
+            "SELECT prediction, count, conf_sum FROM result_stats WHERE count > 0 ORDER BY count DESC")
+    }
+    return {
+        "numbers": numbers,
+        "reports": reports,
+        "avg_reports": reports / numbers if numbers else 0.0,
+        "avg_risk": risk_sum / numbers if numbers else 0.0,
+        "risk_bands": {"high": high, "medium": medium, "low": low},
+        "thresholds": {"high": RISK_HIGH, "medium": RISK_MEDIUM},
+        "results": {"total": sum(v["count"] for v in by_pred.values()), "by_prediction": by_pred},
+    }
+
+def risk_band(risk) -> str:
+    risk = risk or 0.0
+    return "high" if risk >= RISK_HIGH else "medium" if risk >= RISK_MEDIUM else "low"
+
+TOP_ORDER = {
+    "risk":    "risk_score DESC, report_count DESC",
+    "reports": "report_count DESC, risk_score DESC",
+}
+
+def top_numbers(k: int = 10, by: str = "risk") -> list:
+    """위험도(by="risk") 또는 신고 수(by="reports") 상위 k개 — 인덱스 순서대로 k행만 읽음"""
+    rows = reader().execute(f"""
+        SELECT phone_number, report_count, risk_score, last_confidence, updated_at
+          FROM phone_reports
+         ORDER BY {TOP_ORDER[by]}
+         LIMIT ?
+    """, (max(0, int(k)),)).fetchall()
+    return [
+        {"phone_number": p, "report_count": n or 0, "risk_score": r, "risk_band": risk_band(r),
+         "last_confidence": c, "updated_at": u}
+        for p, n, r, c, u in rows
+    ]
+
+# ======================
+# 탐지 롤업 (시간/일/번호별 라벨 건수)
+# ======================
+# 버킷 키는 results.timestamp('%Y-%m-%dT%H:%M:%S') 앞부분: 시간 = 13자, 일 = 10자
+ROLLUP_BUCKETS = {"hour": 13, "day": 10}
+
+def _init_rollups(cur):
+    for name in ("hour", "day"):
+        cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS detections_{name} (
+            bucket     TEXT NOT NULL,
+            prediction TEXT NOT NULL,
+            count      INTEGER NOT NULL DEFAULT 0,
+            conf_sum   REAL    NOT NULL DEFAULT 0,
+            PRIMARY KEY (bucket, prediction)
+        ) WITHOUT ROWID
+        """)
+    cur.execute("""
+    CREATE TABLE IF NOT EXISTS detections_phone_day (
+        phone_number TEXT NOT NULL,
+        bucket       TEXT NOT NULL,
+        prediction   TEXT NOT NULL,
+        count        INTEGER NOT NULL DEFAULT 0,
+        conf_sum     REAL    NOT NULL DEFAULT 0,
+        PRIMARY KEY (phone_number, bucket, prediction)
+    ) WITHOUT ROWID
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_detections_phone_day_bucket ON detections_phone_day(bucket)")
+
+def _rollup_detection_cur(cur, ts: str, pred_label: str, conf: float, phone_number: str | None):
+    """확정 저장 1건 → 시간/일(/번호-일) 버킷 += 1 (같은 트랜잭션)"""
+    label, conf = pred_label or "unknown", _clamp(conf)
+    for name, n in ROLLUP_BUCKETS.items():
+        cur.execute(f"""
+            INSERT INTO detections_{name} (bucket, prediction, count, conf_sum) VALUES (?, ?, 1, ?)
+            ON CONFLICT(bucket, prediction) DO UPDATE SET count = count + 1, conf_sum = conf_sum + excluded.conf_sum
+        """, (ts[:n], label, conf))
+    phone = normalize_phone(phone_number) or phone_number
+    if phone:
+        cur.execute("""
+            INSERT INTO detections_phone_day (phone_number, bucket, prediction, count, conf_sum) VALUES (?, ?, ?, 1, ?)
+            ON CONFLICT(phone_number, bucket, prediction) DO UPDATE SET count = count + 1, conf_sum = conf_sum + excluded.conf_sum
+        """, (phone, ts[:10], label, conf))
+
+def _rebuild_rollups_cur(cur) -> int:
+    """
+    results 를 한 번만 훑어 (시간, 번호, 라벨) 로 모은 뒤 세 롤업을 그 중간 결과에서 다시 채움.
+    results 는 파일당 최신 1행이라, 같은 파일을 여러 번 확정한 이력은 마지막 1건으로 센다.
+    """
+    cur.connection.create_function("normalize_phone", 1, normalize_phone, deterministic=True)
+    cur.execute("DROP TABLE IF EXISTS temp.detections_backfill")
+    cur.execute("""
+        CREATE TEMP TABLE detections_backfill AS
+        SELECT substr(timestamp, 1, 13) AS hour,
+               COALESCE(normalize_phone(phone_number), NULLIF(phone_number, '')) AS phone_number,
+               COALESCE(prediction, 'unknown') AS prediction,
+               COUNT(*) AS count, TOTAL(MIN(1.0, MAX(0.0, COALESCE(confidence, 0)))) AS conf_sum
+          FROM results
+         WHERE timestamp IS NOT NULL
+         GROUP BY 1, 2, 3
+    """)
+    for name in ("hour", "day", "phone_day"):
+        cur.execute(f"DELETE FROM detections_{name}")
+    cur.execute("""
+        INSERT INTO detections_hour (bucket, prediction, count, conf_sum)
+        SELECT hour, prediction, SUM(count), TOTAL(conf_sum) FROM temp.detections_backfill GROUP BY 1, 2
+    """)
+    cur.execute("""
+        INSERT INTO detections_day (bucket, prediction, count, conf_sum)
+        SELECT substr(hour, 1, 10), prediction, SUM(count), TOTAL(conf_sum) FROM temp.detections_backfill GROUP BY 1, 2
+    """)
+    cur.execute("""
+        INSERT INTO detections_phone_day (phone_number, bucket, prediction, count, conf_sum)
+        SELECT phone_number, substr(hour, 1, 10), prediction, SUM(count), TOTAL(conf_sum)
+          FROM temp.detections_backfill WHERE phone_number IS NOT NULL GROUP BY 1, 2, 3
+    """)
+    cur.execute("SELECT COALESCE(SUM(count), 0) FROM temp.detections_backfill")
+    total = cur.fetchone()[0]
+    cur.execute("DROP TABLE temp.detections_backfill")
+    return total
+
+def rebuild_rollups() -> int:
+    """롤업 백필: 기존 results 로 다시 만들고 반영한 행 수 반환"""
+    return write(_rebuild_rollups_cur, timeout=None)
+
+def _pred_filter(predictions) -> tuple:
+    if not predictions:
+        return "", ()
+    return f" AND prediction IN ({','.join('?' * len(predictions))})", tuple(predictions)
+
+def detection_series(bucket: str, since: str, until: str, predictions=None, phone_number: str | None = None) -> list:
+    """
+    [since, until] 버킷 범위의 라벨별 건수 (롤업만 읽음, 건수 0 인 버킷은 생략)
+    phone_number 를 주면 번호-일 롤업 (bucket="day" 만 가능)
+    반환: [{"bucket": ..., "counts": {label: n}, "total": n, "avg_confidence": x}, ...]
+    """
+    n = ROLLUP_BUCKETS[bucket]
+    lo, hi = since[:n], (until[:n] if len(until) >= n else until + "~")   # to=날짜만 주면 그날 전체 포함
+    where, args = _pred_filter(predictions)
+    if phone_number is not None:
+        if bucket != "day":
+            raise ValueError("per-phone rollups are daily")
+        sql = "SELECT bucket, prediction, count, conf_sum FROM detections_phone_day WHERE phone_number = ? AND bucket BETWEEN ? AND ?"
+        args = (normalize_phone(phone_number) or phone_number, lo, hi) + args
+    else:
+        sql = f"SELECT bucket, prediction, count, conf_sum FROM detections_{bucket} WHERE bucket BETWEEN ? AND ?"
+        args = (lo, hi) + args
+    series = {}
+    for b, label, count, conf_sum in reader().execute(sql + where + " ORDER BY bucket", args):
+        row = series.setdefault(b, {"bucket": b, "counts": {}, "total": 0, "conf_sum": 0.0})
+        row["counts"][label] = row["counts"].get(label, 0) + count
+        row["total"] += count
+        row["conf_sum"] += conf_sum
+    out = list(series.values())
+    for row in out:
+        row["avg_confidence"] = row.pop("conf_sum") / row["total"] if row["total"] else 0.0
+    return out
+
+def detections_by_phone(since: str, until: str, predictions=None, limit: int = 50) -> list:
+    """[since, until] 일 범위에서 탐지 건수가 많은 번호 순 (번호-일 롤업의 bucket 인덱스 범위만 읽음)"""
+    where, args = _pred_filter(predictions)
+    rows = reader().execute(f"""
+        SELECT phone_number, SUM(count), TOTAL(conf_sum), MAX(bucket)
+          FROM detections_phone_day
+         WHERE bucket BETWEEN ? AND ?{where}
+         GROUP BY phone_number
+         ORDER BY 2 DESC, 1
+         LIMIT ?
+    """, (since[:10], until[:10]) + args + (max(0, int(limit)),)).fetchall()
+    return [
+        {"phone_number": p, "count": c, "avg_confidence": s / c if c else 0.0, "last_day": d}
+        for p, c, s, d in rows
+    ]
+
+def _save_result_cur(cur, filename: str, pred_label: str, conf: float, probs_np, phone_number: str | None,
+                     ts: str | None = None):
+    """results upsert (커서 단위, 트랜잭션은 호출자가 관리)"""
+    ts = ts or _utcnow_str()
+    prob_real, prob_fake2, prob_tts = float(probs_np[0]), float(probs_np[1]), float(probs_np[2])
+    phone_number = normalize_phone(phone_number) or phone_number     # phone_reports 와 같은 표기
+
+    cur.execute("""
+        INSERT INTO results (timestamp, filename, prediction, confidence, prob_real, prob_fake2, prob_tts, phone_number)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(filename) DO UPDATE SET
+            timestamp    = excluded.timestamp,
+            prediction   = excluded.prediction,
+            confidence   = excluded.confidence,
+            prob_real    = excluded.prob_real,
+            prob_fake2   = excluded.prob_fake2,
+            prob_tts     = excluded.prob_tts,
+            phone_number = excluded.phone_number
+    """, (ts, filename, pred_label, conf, prob_real, prob_fake2, prob_tts, phone_number))
+    cur.execute("SELECT id FROM results WHERE filename = ?", (filename,))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+def _upsert_phone_report_cur(cur, phone_number: str, confidence: float):
+    """번호별 누적 + EMA 위험도 갱신 (ema_risk 참고). 번호는 normalize_phone 으로 통일해 저장"""
+    now = _utcnow_str()
+    conf = _clamp(confidence)
+    phone_number = normalize_phone(phone_number) or phone_number
+
+    cur.execute("""
+        SELECT id, report_count, risk_score
+          FROM phone_reports
+         WHERE phone_number = ?
+    """, (phone_number,))
+    row = cur.fetchone()
+
+    if row:
+        _id, count, old_risk = row[0], (row[1] or 0), row[2]
+        new_risk, alpha = ema_risk(conf, old_risk)
+        cur.execute("""
+            UPDATE phone_reports
+               SET report_count    = ?,
+                   last_confidence = ?,
+                   risk_score      = ?,
+                   ema_alpha       = ?,
+                   updated_at      = ?
+             WHERE id = ?
+        """, (count + 1, conf, new_risk, alpha, now, _id))
+        after_commit(_notify_phone_report, phone_number, new_risk, count + 1, now)
+    else:
+        # 최초 행: risk = conf 시작
+        new_risk, alpha = ema_risk(conf, None)
+        cur.execute("""
+            INSERT INTO phone_reports
+                (phone_number, report_count, last_confidence, risk_score, ema_alpha, updated_at, created_at)
+            VALUES
+                (?,            1,           ?,               ?,          ?,         ?,          ?)
+        """, (phone_number, conf, new_risk, alpha, now, now))
+        after_commit(_notify_phone_report, phone_number, new_risk, 1, now)
+
+# ======================
+# 쓰기 API (writer 경유)
+# ======================
+def _save_confirmed_cur(cur, filename: str, pred_label: str, conf: float, probs_np, phone_number: str | None):
+    # 롤업 버킷은 results.timestamp 와 같은 시각 (rebuild_rollups 결과와 경계에서도 일치)
+    ts = _utcnow_str()
+    rowid = _save_result_cur(cur, filename, pred_label, conf, probs_np, phone_number, ts)
+    _rollup_detection_cur(cur, ts, pred_label, conf, phone_number)
+    if phone_number:
+        _upsert_phone_report_cur(cur, phone_number, conf)
+    return rowid
+
+def _save_results_batch_cur(cur, items):
+    return [_save_confirmed_cur(cur, *item) for item in items]
+
+def save_result(filename: str, pred_label: str, conf: float, probs_np, phone_number: str | None):
+    """results에 upsert(파일당 1행)하고 row id 반환"""
+    return write(_save_result_cur, filename, pred_label, conf, probs_np, phone_number)
+
+def upsert_phone_report(phone_number: str, confidence: float):
+    """번호별 누적 + EMA 위험도 갱신 (_upsert_phone_report_cur 참고)"""
+    write(_upsert_phone_report_cur, phone_number, confidence)
+
+def save_confirmed_result(filename: str, pred_label: str, conf: float, probs_np, phone_number: str | None):
+    """확정 결과 저장 + 번호 누적을 한 작업(같은 트랜잭션)으로, row id 반환"""
+    return write(_save_confirmed_cur, filename, pred_label, conf, probs_np, phone_number)
+
+def submit_confirmed_result(filename: str, pred_label: str, conf: float, probs_np, phone_number: str | None) -> Future:
+    """save_confirmed_result 와 같은 작업을 기다리지 않고 Future 로 반환 (asyncio.wrap_future 용)"""
+    return get_writer().submit(_save_confirmed_cur, filename, pred_label, conf, probs_np, phone_number)
+
+def save_results_batch(items):
+    """
+    여러 확정 결과를 단일 트랜잭션으로 저장.
+    items: [(filename, pred_label, conf, probs_np, phone_number), ...]
+    반환: 입력 순서대로 results row id 리스트
+    """
+    return write(_save_results_batch_cur, list(items))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+torch 체크포인트 + 스케일러 → NumPy 추론용 .npz 내보내기
+- StandardScaler 와 eval BatchNorm1d 를 인접 Linear 에 접어 넣는다
+- 임시 파일로 내보내 torch 모델과 확률 일치(parity)를 확인하고, 통과해야 out 을 교체한다
+
+사용법:
+  python export_numpy.py                       # model_folded.npz 생성 + 검증
+  python export_numpy.py --out x.npz --samples 4096 --atol 1e-4
+"""
+import argparse, os, sys, time
+
+import numpy as np
+import torch, joblib
+
+from model import AttentionAudioClassifier
+from numpy_engine import NumpyClassifier, fold_state_dict, source_version
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH  = os.path.join(ROOT, "best_asvspoof_model_cuda.pt")
+SCALER_PATH = os.path.join(ROOT, "scaler_asvspoof.pkl")
+N_MFCC = 13
+CLASS_NAMES = ["real", "fake_2", "tts"]
+
+
+def load_torch():
+    model = AttentionAudioClassifier(input_dim=N_MFCC, num_classes=len(CLASS_NAMES))
+    model.load_state_dict(torch.load(MODEL_PATH, map_location="cpu"))
+    model.eval()
+    return model, joblib.load(SCALER_PATH)
+
+
+def fold(model, scaler) -> NumpyClassifier:
+    sd = {k: v.detach().cpu().numpy() for k, v in model.state_dict().items()}
+    weights = fold_state_dict(
+        sd,
+        scaler_mean=getattr(scaler, "mean_", None),
+        scaler_scale=getattr(scaler, "scale_", None),
+    )
+    return NumpyClassifier(weights, class_names=CLASS_NAMES, version=source_version(MODEL_PATH, SCALER_PATH))
+
+
+def export(out_path: str, samples: int = 2048, atol: float = 1e-4):
+    """
+    임시 .npz 에 저장 → 다시 읽어 parity 확인 → 통과하면 os.replace 로 out_path 교체.
+    실패하면 임시 파일만 지우고 기존 out_path 는 그대로 (버전 스탬프가 맞는 잘못된 npz 가 남지 않게).
+    → (통과 여부, engine)
+    """
+    model, scaler = load_torch()
+    engine = fold(model, scaler)
+    tmp_path = f"{os.path.splitext(out_path)[0]}.tmp-{os.getpid()}.npz"
+    engine.save(tmp_path)
+    try:
+        ok = check_parity(model, scaler, NumpyClassifier.load(tmp_path), samples, atol)
+        if ok:
+            os.replace(tmp_path, out_path)
+        return ok, engine
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def check_parity(model, scaler, engine, samples: int, atol: float, seed: int = 0) -> bool:
+    """스케일러 분포 주변의 합성 MFCC 로 torch vs NumPy 확률 비교"""
+    rng = np.random.default_rng(seed)
+    mean = getattr(scaler, "mean_", np.zeros(N_MFCC))
+    scale = getattr(scaler, "scale_", np.ones(N_MFCC))
+    x = (mean + scale * rng.standard_normal((samples, N_MFCC)) * 1.5).astype(np.float32)
+
+    t0 = time.perf_counter()
+    with torch.no_grad():
+        ref = torch.softmax(model(torch.from_numpy(scaler.transform(x)).float()), dim=1).numpy()
+    t_torch = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    got = engine.predict_proba(x)
+    t_np = time.perf_counter() - t0
+
+    max_diff = float(np.abs(ref - got).max())
+    agree = float((ref.argmax(1) == got.argmax(1)).mean())
+    print(f"  samples={samples}  max|Δp|={max_diff:.2e}  argmax agreement={agree * 100:.3f}%")
+    print(f"  batch forward: torch {t_torch * 1000:.2f} ms / numpy {t_np * 1000:.2f} ms")
+    return max_diff <= atol and agree == 1.0
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export folded NumPy weights")
+    ap.add_argument("--out", default=os.path.join(ROOT, "model_folded.npz"))
+    ap.add_argument("--samples", type=int, default=2048)
+    ap.add_argument("--atol", type=float, default=1e-4)
+    args = ap.parse_args()
+
+    print(f"🔄 {MODEL_PATH} + {SCALER_PATH} → {args.out}")
+    print("🔎 parity 검증 (torch vs numpy)")
+    ok, engine = export(args.out, args.samples, args.atol)
+    if not ok:
+        print(f"❌ 허용 오차({args.atol}) 초과 — {args.out} 는 바꾸지 않음")
+        sys.exit(1)
+    print(f"✅ 일치, 저장 완료 ({os.path.getsize(args.out) / 1024:.1f} KiB, version={engine.version})")
+
+
+if __name__ == "__main__":
+    main()
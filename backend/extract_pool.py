@@ -0,0 +1,206 @@
+# extract_pool.py
+import os, sys, threading, time
+import multiprocessing as mp
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import metrics
+
+# ======================
+# 워커 프로세스 쪽 (spawn 으로 import 되므로 server.py 를 import 하지 않는다)
+# ======================
+_W = {}     # 워커별 설정/추출기
+
+
+def _init_worker(sr: int, n_mfcc: int, min_seconds: float, max_seconds: float):
+    """워커 시작 시 1회: 무거운 import + 필터뱅크 생성 + 더미 추출로 예열"""
+    from features import MFCCExtractor
+    import audio_io, vad
+    ex = MFCCExtractor(sr=sr, n_mfcc=n_mfcc)
+    _W.update(ex=ex, sr=sr, min_seconds=min_seconds, max_seconds=max_seconds, audio_io=audio_io, vad=vad)
+    ex.transform_padded([np.zeros(sr, dtype=np.float32)], int(max_seconds * sr))
+    audio_io.resample(np.zeros(4410, dtype=np.float32), 44100, sr)
+
+
+def _warmup(_=None) -> int:
+    time.sleep(0.05)    # 작업이 한 워커에 몰리지 않게 (모든 워커 기동 확인용)
+    return os.getpid()
+
+
+def _extract_shm(shm_name: str, size: int, filename: str, use_vad: bool = False):
+    """
+    공유 메모리의 업로드 바이트 → (MFCC 13개, {단계: 초}, 오디오 길이(초), VAD 로 잘라낸 비율 또는 None).
+    큰 바이트열은 파이프로 피클링하지 않고, 작은 결과만 돌려보낸다.
+    """
+    with metrics.collect_timings() as timings:
+        with metrics.stage("shm_read"):
+            shm = shared_memory.SharedMemory(name=shm_name)
+            try:
+                audio_bytes = bytes(shm.buf[:size])
+            finally:
+                shm.close()
+        y = _W["audio_io"].decode_audio(audio_bytes, filename, target_sr=_W["sr"],
+                                        min_seconds=_W["min_seconds"], max_seconds=_W["max_seconds"])
+        audio_seconds, trimmed = y.size / _W["sr"], None
+        if use_vad:
+            with metrics.stage("vad"):
+                y, trimmed = _W["vad"].trim(y, _W["sr"])
+        with metrics.stage("mfcc"):
+            mfcc = _W["ex"].transform_padded([y], int(_W["max_seconds"] * _W["sr"]))[0]
+    return mfcc, timings, audio_seconds, trimmed
+
+
+# ======================
+# 부모 프로세스 쪽
+# ======================
+@contextmanager
+def _hide_main_script():
+    """
+    spawn 자식은 실행 스크립트(python server.py)를 __mp_main__ 으로 다시 import 한다.
+    그러면 워커마다 모델 로드/배처 스레드가 생기므로, 워커를 띄우는 동안만 __file__ 을 숨긴다.
+    """
+    main = sys.modules.get("__main__")
+    path = getattr(main, "__file__", None)
+    if path is None or getattr(main, "__spec__", None) is not None:
+        yield
+        return
+    del main.__file__
+    try:
+        yield
+    finally:
+        main.__file__ = path
+
+
+class ExtractQueueFull(RuntimeError):
+    """진행 중 작업이 queue_depth 를 넘어 대기 시간 안에 자리가 나지 않음"""
+
+
+class ExtractPool:
+    """
+    디코딩 + 리샘플 + MFCC 를 별도 프로세스에서 실행해 GIL 경합을 피한다.
+      - 업로드 바이트는 SharedMemory 로 넘기고, 결과(MFCC 13개)만 부모로 돌아온다
+      - 워커는 부팅 시 예열(start) → 첫 요청에서 import/필터 생성 지연이 없다
+      - 진행 중 작업 수는 queue_depth 로 제한 (초과 시 queue_timeout 만큼 대기 후 ExtractQueueFull)
+    workers=0 이면 풀 없이 fallback_fn(audio_bytes, filename, use_vad) 을 호출 스레드에서 그대로 실행한다.
+    """
+
+    STAGES = ("queue_wait", "shm_write", "shm_read", "decode", "resample", "vad", "mfcc", "total")
+
+    def __init__(self, workers: int, fallback_fn, sr: int = 16000, n_mfcc: int = 13,
+                 min_seconds: float = 0.3, max_seconds: float = 10.0,
+                 queue_depth: int | None = None, queue_timeout: float = 5.0):
+        self.workers = max(0, int(workers))
+        self.fallback_fn = fallback_fn
+        self.queue_depth = max(1, int(queue_depth if queue_depth else 4 * max(1, self.workers)))
+        self.queue_timeout = float(queue_timeout)
+        self._initargs = (sr, n_mfcc, min_seconds, max_seconds)
+        self._slots = threading.BoundedSemaphore(self.queue_depth)
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._executor = None
+        self._in_flight = 0
+        self._stats = {"tasks": 0, "errors": 0, "rejected": 0, "warm_workers": 0}
+        self._ms_total = dict.fromkeys(self.STAGES, 0.0)
+        self._ms_max = dict.fromkeys(self.STAGES, 0.0)
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 0
+
+    def start(self):
+        """워커 생성 + 예열 (모든 워커가 initializer 를 마칠 때까지 대기)"""
+        with self._start_lock:
+            if not self.enabled or self._executor is not None:
+                return self
+            executor = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=mp.get_context("spawn"),
+                initializer=_init_worker, initargs=self._initargs,
+            )
+            with _hide_main_script():
+                # spawn 풀은 submit 때 워커를 늘리므로, 여기서 전부 띄워 둔다
+                pids = set(executor.map(_warmup, range(self.workers * 2)))
+            with self._lock:
+                self._stats["warm_workers"] = len(pids)
+            self._executor = executor
+        return self
+
+    def shutdown(self):
+        with self._start_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+
+    def extract(self, audio_bytes: bytes, filename: str, timeout: float | None = None, use_vad: bool = False):
+        """
+        업로드 바이트 → (프레임 평균 MFCC (n_mfcc,), VAD 로 잘라낸 비율 또는 None).
+        use_vad 면 MFCC 전에 무음/잡음 구간을 뺀다 (vad.trim). 디코딩 오류는 그대로 전달
+        """
+        if not self.enabled:
+            return self.fallback_fn(audio_bytes, filename, use_vad)
+        if self._executor is None:
+            self.start()
+
+        t0 = time.perf_counter()
+        if not self._slots.acquire(timeout=self.queue_timeout):
+            with self._lock:
+                self._stats["rejected"] += 1
+            raise ExtractQueueFull(f"Feature extraction queue full (depth {self.queue_depth})")
+        shm = None
+        try:
+            with self._lock:
+                self._in_flight += 1
+            t1 = time.perf_counter()
+            shm = shared_memory.SharedMemory(create=True, size=max(1, len(audio_bytes)))
+            shm.buf[:len(audio_bytes)] = audio_bytes
+            t2 = time.perf_counter()
+            try:
+                mfcc, worker_s, audio_seconds, trimmed = self._executor.submit(
+                    _extract_shm, shm.name, len(audio_bytes), filename, use_vad
+                ).result(timeout=timeout)
+            except Exception:
+                with self._lock:
+                    self._stats["errors"] += 1
+                raise
+            t3 = time.perf_counter()
+            # 워커에서 잰 단계는 부모의 /metrics 와 요청 Server-Timing 에 반영
+            stages = {"extract_queue": t1 - t0, "shm_write": t2 - t1, **worker_s}
+            for name, sec in stages.items():
+                metrics.observe_stage(name, sec)
+            metrics.AUDIO_SECONDS.observe(audio_seconds)
+            stages["queue_wait"] = stages.pop("extract_queue")
+            self._record({**{k: v * 1000.0 for k, v in stages.items()}, "total": (t3 - t0) * 1000.0})
+            return mfcc, trimmed
+        finally:
+            if shm is not None:
+                shm.close()
+                shm.unlink()
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def _record(self, ms: dict):
+        with self._lock:
+            self._stats["tasks"] += 1
+            for k, v in ms.items():
+                if k not in self._ms_total:
+                    continue
+                self._ms_total[k] += v
+                self._ms_max[k] = max(self._ms_max[k], v)
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+            in_flight = self._in_flight
+            total, mx = dict(self._ms_total), dict(self._ms_max)
+        n = s["tasks"] or 1
+        return {
+            "workers": self.workers,
+            "queue_depth": self.queue_depth,
+            "in_flight": in_flight,
+            **s,
+            "avg_ms": {k: total[k] / n for k in self.STAGES},
+            "max_ms": mx,
+        }
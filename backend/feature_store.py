@@ -0,0 +1,435 @@
+# feature_store.py
+"""
+판별 특징 저장소 — append-only 열(column) 파일 + memmap 읽기 (새 모델을 과거 트래픽으로 평가할 때 재디코딩 없이)
+
+디렉터리 구성 (행 = 업로드 콘텐츠 1개, 같은 바이트/옵션은 한 번만 저장)
+  header.json     커밋된 행/프레임/링크 수. 이 값까지만 유효 (쓰다 죽은 꼬리는 다음 쓰기가 덮어씀)
+  vector.f32      (N, dim)  프레임 평균 MFCC (모델 입력과 동일)
+  key.u8          (N, 16)   콘텐츠 키 (sha256 앞 16바이트, result_cache.content_key 와 같은 해시)
+  ts.f64          (N,)      저장 시각
+  frame_off.i64   (N,)      frames.f32 안의 시작 행 (-1 = 프레임 없음)
+  frame_len.i32   (N,)      프레임 수
+  frames.f32      (F, dim)  프레임별 MFCC 를 이어 붙인 것 (선택)
+  links.i64       (L, 2)    (results.id, 행) — 확정 저장된 결과와 연결
+  key.idx / result.idx      linear probing 해시 테이블 (uint64 키, int64 값) — memmap 으로 O(1) 조회
+
+읽기는 전부 np.memmap 조각(복사 없음)이라 수백만 행도 RAM 에 올리지 않고 훑을 수 있다:
+  store = FeatureStore("feature_store", readonly=True)
+  for start, block in store.iter_vectors(1 << 16): ...
+"""
+import fcntl, json, os, queue, threading, time
+
+import numpy as np
+
+_SLOT = np.dtype([("k", "<u8"), ("v", "<i8")])
+_MIX = 0x9E3779B97F4A7C15
+_M64 = (1 << 64) - 1
+_INDEX_MIN_CAP = 1024
+KEY_BYTES = 16
+
+
+def as_key(key) -> bytes:
+    """content_key 16진 문자열 또는 bytes → 16바이트 키"""
+    if isinstance(key, str):
+        key = bytes.fromhex(key[:KEY_BYTES * 2])
+    key = bytes(key[:KEY_BYTES])
+    if len(key) != KEY_BYTES:
+        raise ValueError(f"feature key must be {KEY_BYTES} bytes")
+    return key
+
+def _key_u64(key: bytes) -> int:
+    return int.from_bytes(key[:8], "little") or 1            # 0 은 빈 칸 표시
+
+
+class _HashIndex:
+    """uint64 키 → int64 값 (중복 키 허용, 확인은 호출자가 열 데이터로). 파일이 통째로 바뀌면 다시 map"""
+
+    def __init__(self, path: str, writable: bool):
+        self.path = path
+        self.writable = writable
+        self._sig = None
+        self._k = self._v = None
+
+    def _open(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self._sig, self._k, self._v = None, None, None
+            return False
+        sig = (st.st_ino, st.st_size)
+        if sig != self._sig:
+            m = np.memmap(self.path, dtype=_SLOT, mode="r+" if self.writable else "r")
+            self._k, self._v, self._sig = m["k"], m["v"], sig
+        return True
+
+    @property
+    def capacity(self) -> int:
+        return len(self._k) if self._open() else 0
+
+    @staticmethod
+    def _slot(key: int, cap: int) -> int:
+        return ((key * _MIX) & _M64) >> (64 - (cap.bit_length() - 1))
+
+    def candidates(self, key: int):
+        if not self._open():
+            return
+        ks, vs = self._k, self._v
+        cap = len(ks)
+        i = self._slot(key, cap)
+        while True:
+            k = int(ks[i])
+            if k == 0:
+                return
+            if k == key:
+                yield int(vs[i])
+            i = (i + 1) & (cap - 1)
+
+    def insert(self, pairs):
+        ks, vs = self._k, self._v
+        cap = len(ks)
+        for key, value in pairs:
+            i = self._slot(key, cap)
+            while ks[i] != 0:
+                i = (i + 1) & (cap - 1)
+            ks[i] = key
+            vs[i] = value
+
+    def rebuild(self, keys, values, cap: int):
+        """전체 (키, 값) 으로 cap 칸 새 테이블을 만들어 원자적으로 교체"""
+        ks, vs = [0] * cap, [0] * cap
+        mask = cap - 1
+        for key, value in zip(keys, values):
+            i = self._slot(key, cap)
+            while ks[i]:
+                i = (i + 1) & mask
+            ks[i] = key
+            vs[i] = value
+        table = np.empty(cap, dtype=_SLOT)
+        table["k"] = np.array(ks, dtype=np.uint64)
+        table["v"] = np.array(vs, dtype=np.int64)
+        tmp = self.path + ".tmp"
+        table.tofile(tmp)
+        os.replace(tmp, self.path)
+        self._sig = None
+
+    def flush(self):
+        if self._k is not None and self.writable:
+            self._k.base.flush()
+
+
+class FeatureStore:
+    """
+    append(items) 는 프로세스 간에도 안전 (lock 파일 flock). 읽기는 header 의 커밋된 수까지만 본다.
+    다른 프로세스가 추가한 행은 refresh() 후 보인다.
+    """
+
+    def __init__(self, path: str, dim: int = 13, readonly: bool = False, fsync: bool = False):
+        self.path = path
+        self.readonly = readonly
+        self.fsync = fsync
+        if not readonly:
+            os.makedirs(path, exist_ok=True)
+        self._lock = threading.Lock()
+        self._maps = {}
+        self._key_index = _HashIndex(os.path.join(path, "key.idx"), not readonly)
+        self._result_index = _HashIndex(os.path.join(path, "result.idx"), not readonly)
+        self._header = {"version": 1, "dim": int(dim), "rows": 0, "frames": 0, "links": 0}
+        self.refresh()
+        self.dim = self._header["dim"]
+
+    # ---------- header / 열 파일 ----------
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def refresh(self) -> int:
+        """다른 프로세스의 커밋 반영 → 행 수"""
+        try:
+            with open(self._file("header.json"), "r", encoding="utf-8") as f:
+                header = json.load(f)
+        except FileNotFoundError:
+            header = None
+        with self._lock:
+            if header is not None:
+                self._header = header
+            return self._header["rows"]
+
+    def _write_header(self, header: dict):
+        tmp = self._file("header.json.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(header, f)
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, self._file("header.json"))
+
+    def _col(self, name: str, dtype, count: int, width: int = 0):
+        """커밋된 count 개 까지의 읽기 전용 memmap (같은 count 면 재사용)"""
+        shape = (count, width) if width else (count,)
+        if count == 0:
+            return np.empty(shape, dtype=dtype)
+        cached = self._maps.get(name)
+        if cached is not None and cached.shape[0] == count:
+            return cached
+        m = np.memmap(self._file(name), dtype=dtype, mode="r", shape=shape)
+        self._maps[name] = m
+        return m
+
+    def _pwrite(self, name: str, data: bytes, offset: int):
+        """offset 에 쓰고 그 뒤(이전 실패한 쓰기의 꼬리)는 잘라냄"""
+        fd = os.open(self._file(name), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            os.pwrite(fd, data, offset)
+            os.ftruncate(fd, offset + len(data))
+            if self.fsync:
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    # ---------- 읽기 (복사 없음) ----------
+    def __len__(self) -> int:
+        return self._header["rows"]
+
+    def vectors(self, start: int = 0, stop: int | None = None) -> np.ndarray:
+        """(stop-start, dim) float32 memmap 조각"""
+        return self._col("vector.f32", np.float32, self._header["rows"], self.dim)[start:stop]
+
+    def keys(self, start: int = 0, stop: int | None = None) -> np.ndarray:
+        return self._col("key.u8", np.uint8, self._header["rows"], KEY_BYTES)[start:stop]
+
+    def timestamps(self, start: int = 0, stop: int | None = None) -> np.ndarray:
+        return self._col("ts.f64", np.float64, self._header["rows"])[start:stop]
+
+    def frames(self, row: int):
+        """행의 프레임별 MFCC (T, dim) 조각, 저장 안 했으면 None"""
+        n = self._header["rows"]
+        if not 0 <= row < n:
+            raise IndexError(row)
+        off = int(self._col("frame_off.i64", np.int64, n)[row])
+        if off < 0:
+            return None
+        length = int(self._col("frame_len.i32", np.int32, n)[row])
+        return self._col("frames.f32", np.float32, self._header["frames"], self.dim)[off:off + length]
+
+    def links(self) -> np.ndarray:
+        """(L, 2) int64 — (results.id, 행)"""
+        return self._col("links.i64", np.int64, self._header["links"], 2)
+
+    def iter_vectors(self, chunk_rows: int = 1 << 16, start: int = 0):
+        """(시작 행, (chunk, dim) memmap 조각) 을 차례로 — 오프라인 전체 스캔용"""
+        n = self._header["rows"]
+        for s in range(start, n, max(1, int(chunk_rows))):
+            yield s, self.vectors(s, min(n, s + chunk_rows))
+
+    def lookup(self, key):
+        """콘텐츠 키 → 행 (없으면 None), 평균 O(1)"""
+        key = as_key(key)
+        n = self._header["rows"]
+        keys = self._col("key.u8", np.uint8, n, KEY_BYTES)
+        for row in self._key_index.candidates(_key_u64(key)):
+            if row < n and keys[row].tobytes() == key:
+                return row
+        return None
+
+    def row_for_result(self, result_id: int):
+        """results.id → 행 (없으면 None)"""
+        n_links = self._header["links"]
+        links = self._col("links.i64", np.int64, n_links, 2)
+        for pos in self._result_index.candidates(int(result_id) + 1):
+            if pos < n_links and int(links[pos, 0]) == int(result_id):
+                return int(links[pos, 1])
+        return None
+
+    # ---------- 쓰기 ----------
+    def append(self, items) -> dict:
+        """
+        items: dict(key, vector=None, frames=None, result_id=None) 목록.
+          vector 가 있고 처음 보는 키면 새 행, result_id 가 있으면 그 키의 행과 연결.
+        → {"appended", "duplicates", "linked", "orphan_links"}
+        """
+        if self.readonly:
+            raise RuntimeError("feature store opened readonly")
+        out = {"appended": 0, "duplicates": 0, "linked": 0, "orphan_links": 0}
+        with self._lock, open(self._file("lock"), "a+b") as lockf:
+            fcntl.flock(lockf, fcntl.LOCK_EX)
+            try:
+                header = dict(self._header)
+                try:
+                    with open(self._file("header.json"), "r", encoding="utf-8") as f:
+                        header = json.load(f)
+                except FileNotFoundError:
+                    pass
+                self._header = header
+                self._append_locked(header, items, out)
+            finally:
+                fcntl.flock(lockf, fcntl.LOCK_UN)
+        return out
+
+    def _append_locked(self, header: dict, items, out: dict):
+        n, n_frames, n_links, dim = header["rows"], header["frames"], header["links"], header["dim"]
+        new_rows, new_links, batch_rows, batch_rids = [], [], {}, set()
+        for it in items:
+            key = as_key(it["key"])
+            row = batch_rows.get(key)
+            if row is None:
+                row = self.lookup(key)
+            vec = it.get("vector")
+            if row is None and vec is not None:
+                row = n + len(new_rows)
+                batch_rows[key] = row
+                frames = it.get("frames")
+                new_rows.append((key, np.asarray(vec, dtype=np.float32).reshape(dim),
+                                 None if frames is None else np.asarray(frames, dtype=np.float32).reshape(-1, dim)))
+            elif vec is not None:
+                out["duplicates"] += 1
+            rid = it.get("result_id")
+            if rid is not None:
+                if row is None:
+                    out["orphan_links"] += 1
+                elif int(rid) not in batch_rids and self.row_for_result(rid) is None:
+                    batch_rids.add(int(rid))
+                    new_links.append((int(rid), row))
+        if not new_rows and not new_links:
+            return
+
+        if new_rows:
+            now = time.time()
+            offs, lens, frame_blocks, f = [], [], [], n_frames
+            for _, _, fr in new_rows:
+                if fr is None:
+                    offs.append(-1)
+                    lens.append(0)
+                else:
+                    offs.append(f)
+                    lens.append(fr.shape[0])
+                    frame_blocks.append(fr)
+                    f += fr.shape[0]
+            self._pwrite("vector.f32", np.stack([v for _, v, _ in new_rows]).tobytes(), n * dim * 4)
+            self._pwrite("key.u8", b"".join(k for k, _, _ in new_rows), n * KEY_BYTES)
+            self._pwrite("ts.f64", np.full(len(new_rows), now, dtype=np.float64).tobytes(), n * 8)
+            self._pwrite("frame_off.i64", np.asarray(offs, dtype=np.int64).tobytes(), n * 8)
+            self._pwrite("frame_len.i32", np.asarray(lens, dtype=np.int32).tobytes(), n * 4)
+            if frame_blocks:
+                self._pwrite("frames.f32", np.concatenate(frame_blocks).tobytes(), n_frames * dim * 4)
+            n_frames = f
+        if new_links:
+            self._pwrite("links.i64", np.asarray(new_links, dtype=np.int64).tobytes(), n_links * 16)
+
+        rows_after, links_after = n + len(new_rows), n_links + len(new_links)
+        if new_rows:
+            self._index_add(self._key_index, rows_after,
+                            [(_key_u64(k), n + i) for i, (k, _, _) in enumerate(new_rows)],
+                            lambda: self._all_key_pairs(new_rows, n))
+        if new_links:
+            self._index_add(self._result_index, links_after,
+                            [(rid + 1, n_links + i) for i, (rid, _) in enumerate(new_links)],
+                            lambda: self._all_link_pairs(new_links, n_links))
+
+        header = dict(header, rows=rows_after, frames=n_frames, links=links_after)
+        self._write_header(header)
+        self._header = header
+        out["appended"] += len(new_rows)
+        out["linked"] += len(new_links)
+
+    def _index_add(self, index: _HashIndex, count_after: int, pairs, all_pairs):
+        """적재율 0.5 를 넘으면 두 배 크기로 재구성, 아니면 제자리 삽입"""
+        cap = index.capacity
+        if cap == 0 or count_after * 2 > cap:
+            new_cap = max(_INDEX_MIN_CAP, cap)
+            while count_after * 2 > new_cap:
+                new_cap *= 2
+            keys, values = all_pairs()
+            index.rebuild(keys, values, new_cap)
+        else:
+            index.insert(pairs)
+            index.flush()
+
+    def _all_key_pairs(self, new_rows, n):
+        old = self._col("key.u8", np.uint8, n, KEY_BYTES) if n else np.empty((0, KEY_BYTES), np.uint8)
+        heads = np.ascontiguousarray(old[:, :8]).view("<u8").ravel().tolist()
+        keys = [h or 1 for h in heads] + [_key_u64(k) for k, _, _ in new_rows]
+        return keys, list(range(len(keys)))
+
+    def _all_link_pairs(self, new_links, n_links):
+        old = self._col("links.i64", np.int64, n_links, 2)[:, 0].tolist() if n_links else []
+        ids = old + [rid for rid, _ in new_links]
+        return [i + 1 for i in ids], list(range(len(ids)))
+
+    def stats(self) -> dict:
+        h = self._header
+        return {"path": self.path, "rows": h["rows"], "frames": h["frames"], "links": h["links"], "dim": h["dim"],
+                "key_index_capacity": self._key_index.capacity, "result_index_capacity": self._result_index.capacity}
+
+
+class FeatureWriter:
+    """
+    요청 경로 밖에서 저장: submit 은 큐에 넣기만 하고(가득 차면 버림), 스레드 하나가 묶어서 append.
+    frames_fn(audio_bytes, filename, use_vad) 가 있으면 새 행의 프레임별 MFCC 도 이 스레드에서 계산.
+    """
+
+    def __init__(self, store: FeatureStore, max_queue: int = 1024, batch: int = 256, frames_fn=None):
+        self.store = store
+        self.batch = max(1, int(batch))
+        self.frames_fn = frames_fn
+        self._q = queue.Queue(maxsize=max(1, int(max_queue)))
+        self._lock = threading.Lock()
+        self._stats = {"submitted": 0, "dropped": 0, "appended": 0, "duplicates": 0, "linked": 0,
+                       "orphan_links": 0, "errors": 0}
+        self._thread = None
+
+    def submit(self, key, vector=None, result_id=None, source=None):
+        """source: 프레임 계산용 (audio_bytes, filename, use_vad) — frames_fn 이 있을 때만 사용"""
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._loop, name="feature-writer", daemon=True)
+                    self._thread.start()
+        try:
+            self._q.put_nowait({"key": key, "vector": vector, "result_id": result_id,
+                                "source": source if self.frames_fn is not None and vector is not None else None})
+        except queue.Full:
+            with self._lock:
+                self._stats["dropped"] += 1
+            return False
+        with self._lock:
+            self._stats["submitted"] += 1
+        return True
+
+    def flush(self, timeout: float = 10.0) -> bool:
+        """큐가 빌 때까지 대기 (테스트/종료용)"""
+        deadline = time.monotonic() + timeout
+        while self._q.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return not self._q.unfinished_tasks
+
+    def _loop(self):
+        while True:
+            items = [self._q.get()]
+            while len(items) < self.batch:
+                try:
+                    items.append(self._q.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                for it in items:
+                    src = it.pop("source")
+                    if src is not None:
+                        try:
+                            it["frames"] = self.frames_fn(*src)
+                        except Exception:
+                            it["frames"] = None
+                res = self.store.append(items)
+                with self._lock:
+                    for k, v in res.items():
+                        self._stats[k] += v
+            except Exception as e:
+                print(f"⚠️ feature store write failed: {e}")
+                with self._lock:
+                    self._stats["errors"] += 1
+            finally:
+                for _ in items:
+                    self._q.task_done()
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        return {**self.store.stats(), **s, "queue_depth": self._q.qsize()}
@@ -0,0 +1,126 @@
+# features.py
+from functools import lru_cache
+
+import numpy as np
+import scipy.fft
+from numpy.lib.stride_tricks import sliding_window_view
+
+# ======================
+# 설정 (librosa.feature.mfcc 기본값과 동일)
+# ======================
+N_FFT   = 2048
+HOP     = 512
+N_MELS  = 128
+AMIN    = 1e-10
+TOP_DB  = 80.0
+
+
+@lru_cache(maxsize=None)
+def mfcc_bases(sr: int, n_mfcc: int):
+    """
+    고정 파라미터용 행렬을 한 번만 만든다.
+      window: periodic hann (N_FFT,)
+      mel_t : slaney mel 필터뱅크 전치 (1 + N_FFT//2, N_MELS)
+      dct_t : DCT-II(ortho) 앞 n_mfcc 행의 전치 (N_MELS, n_mfcc)
+    """
+    import librosa   # 필터뱅크 생성에만 사용 (최초 1회)
+    window = librosa.filters.get_window("hann", N_FFT, fftbins=True).astype(np.float32)
+    mel = librosa.filters.mel(sr=sr, n_fft=N_FFT, n_mels=N_MELS).astype(np.float32)
+    dct = scipy.fft.dct(np.eye(N_MELS, dtype=np.float64), type=2, norm="ortho", axis=0)[:n_mfcc]
+    return window, np.ascontiguousarray(mel.T), np.ascontiguousarray(dct.T.astype(np.float32))
+
+
+# ======================
+# 프레임 평균 MFCC 추출기
+# ======================
+class MFCCExtractor:
+    """
+    librosa.feature.mfcc(y, sr, n_mfcc) 의 프레임 평균을 전용 경로로 계산한다.
+      center=True(0 패딩) STFT → |X|^2 → mel → power_to_db(top_db=80) → DCT
+    여러 클립은 프레임을 쌓아 한 번의 rfft + 행렬곱으로 처리한다.
+    """
+
+    def __init__(self, sr: int = 16000, n_mfcc: int = 13, max_batch: int = 8, fft_workers: int = 1):
+        self.sr = sr
+        self.n_mfcc = n_mfcc
+        self.max_batch = max(1, int(max_batch))
+        self.fft_workers = fft_workers
+        self.window, self.mel_t, self.dct_t = mfcc_bases(sr, n_mfcc)
+
+    def _frames(self, Y: np.ndarray) -> np.ndarray:
+        """(B, L) → 창 적용 프레임 (B, T, N_FFT)"""
+        pad = N_FFT // 2
+        Yp = np.pad(Y, ((0, 0), (pad, pad)))
+        return sliding_window_view(Yp, N_FFT, axis=1)[:, ::HOP] * self.window
+
+    def _log_mel(self, frames: np.ndarray) -> np.ndarray:
+        """(B, T, N_FFT) → dB mel (B, T, N_MELS), top_db 는 클립별 최대값 기준"""
+        spec = scipy.fft.rfft(frames, axis=-1, workers=self.fft_workers)
+        power = spec.real ** 2 + spec.imag ** 2
+        mel_db = 10.0 * np.log10(np.maximum(AMIN, power @ self.mel_t))
+        peak = mel_db.max(axis=(1, 2), keepdims=True)
+        return np.maximum(mel_db, peak - TOP_DB)
+
+    def frames_mfcc(self, y: np.ndarray) -> np.ndarray:
+        """1개 클립의 프레임별 MFCC (n_mfcc, T) — librosa.feature.mfcc 와 같은 모양"""
+        y = np.asarray(y, dtype=np.float32)[None, :]
+        return (self._log_mel(self._frames(y)) @ self.dct_t)[0].T
+
+    def transform_batch(self, Y) -> np.ndarray:
+        """같은 길이 클립들 (B, L) → 프레임 평균 MFCC (B, n_mfcc)"""
+        Y = np.asarray(Y, dtype=np.float32)
+        if Y.ndim == 1:
+            Y = Y[None, :]
+        out = np.empty((Y.shape[0], self.n_mfcc), dtype=np.float32)
+        for s in range(0, Y.shape[0], self.max_batch):
+            mel_db = self._log_mel(self._frames(Y[s:s + self.max_batch]))
+            # DCT 는 선형이므로 프레임 평균을 먼저 내고 곱한다
+            out[s:s + self.max_batch] = mel_db.mean(axis=1) @ self.dct_t
+        return out
+
+    def transform(self, y: np.ndarray) -> np.ndarray:
+        return self.transform_batch(y)[0]
+
+    # ---------- 0-패딩 인식 경로 ----------
+    def n_frames(self, n_samples: int) -> int:
+        """center=True STFT 프레임 수 (librosa 와 동일)"""
+        return 1 + n_samples // HOP
+
+    def _touched_frames(self, n_real: int, total_len: int) -> int:
+        """실제 샘플이 하나라도 걸친 프레임 수 (나머지는 전부 0 프레임)"""
+        return min(self.n_frames(total_len), -(-(n_real + N_FFT // 2) // HOP))
+
+    def transform_padded(self, signals, total_len: int) -> np.ndarray:
+        """
+        뒤를 0으로 채워 total_len 으로 만든 클립들의 프레임 평균 MFCC (B, n_mfcc).
+        np.pad 후 transform_batch 와 같은 값이지만, 실제 신호가 걸친 프레임만 STFT 하고
+        전부 0인 패딩 프레임은 한 번에 더한다:
+          0 프레임의 log-mel = 모든 밴드에서 max(10*log10(amin), peak - top_db)
+        peak 는 계산한 프레임에 이미 0 프레임(또는 더 큰 값)이 포함되므로 그대로 정확하다.
+        """
+        signals = [np.asarray(y, dtype=np.float32)[:total_len] for y in signals]
+        total_frames = self.n_frames(total_len)
+        floor_db = 10.0 * np.log10(AMIN)
+        out = np.empty((len(signals), self.n_mfcc), dtype=np.float32)
+        # 길이가 비슷한 클립끼리 묶어야 배치 안의 불필요한 0 프레임이 줄어든다
+        order = sorted(range(len(signals)), key=lambda i: signals[i].size)
+        for s in range(0, len(order), self.max_batch):
+            idx = order[s:s + self.max_batch]
+            F = max(self._touched_frames(signals[i].size, total_len) for i in idx)
+            # F 프레임에 필요한 길이: (F-1)*HOP + N_FFT//2 (앞쪽 center 패딩은 _frames 가 붙임)
+            need = (F - 1) * HOP + N_FFT // 2
+            Y = np.zeros((len(idx), need), dtype=np.float32)
+            for r, i in enumerate(idx):
+                n = min(signals[i].size, need)
+                Y[r, :n] = signals[i][:n]
+            frames = self._frames(Y)[:, :F]
+            spec = scipy.fft.rfft(frames, axis=-1, workers=self.fft_workers)
+            power = spec.real ** 2 + spec.imag ** 2
+            mel_db = 10.0 * np.log10(np.maximum(AMIN, power @ self.mel_t))
+            peak = mel_db.max(axis=(1, 2), keepdims=True)
+            lo = peak - TOP_DB
+            summed = np.maximum(mel_db, lo).sum(axis=1)                       # (b, N_MELS)
+            zero_db = np.maximum(floor_db, lo[:, 0, :])                       # (b, 1)
+            mean_db = (summed + (total_frames - F) * zero_db) / total_frames
+            out[idx] = mean_db @ self.dct_t
+        return out
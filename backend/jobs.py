@@ -0,0 +1,318 @@
+#!/usr/bin/env python3
+# jobs.py
+"""
+긴 녹음용 비동기 판별 작업 큐 (SQLite jobs / job_payloads 테이블, 스키마는 db.init_db)
+  - submit: 업로드(앞 MAX_SECONDS 분량)를 저장하고 job id 를 바로 돌려줌
+  - 워커: 여러 작업을 한 번에 claim(리스) → 한 배치로 처리 → 결과 저장
+  - 리스가 끝날 때까지 완료되지 않은 작업(워커 종료/크래시)은 다른 워커가 다시 가져감 (max_attempts 까지)
+
+별도 프로세스 워커:
+  python jobs.py worker --threads 2
+"""
+import argparse, json, os, threading, time, uuid
+
+import db
+import metrics
+
+# ======================
+# 설정
+# ======================
+JOB_CLAIM_BATCH  = int(os.environ.get("JOB_CLAIM_BATCH", "8"))          # 워커가 한 번에 가져가는 작업 수
+JOB_LEASE_S      = float(os.environ.get("JOB_LEASE_S", "120"))          # 이 시간 안에 끝내지 못하면 재시도 대상
+JOB_MAX_ATTEMPTS = int(os.environ.get("JOB_MAX_ATTEMPTS", "3"))
+JOB_POLL_S       = float(os.environ.get("JOB_POLL_S", "0.5"))           # 큐가 비었을 때 재확인 주기
+JOB_RETENTION_S  = float(os.environ.get("JOB_RETENTION_S", str(24 * 3600)))  # 끝난 작업 보관 기간
+
+QUEUE_SECONDS = metrics.histogram("dvd_job_queue_seconds", "Time from submit to claim",
+                                  buckets=(0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0))
+JOB_SECONDS   = metrics.histogram("dvd_job_seconds", "Time from submit to finish",
+                                  buckets=(0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0))
+BATCH_SIZE    = metrics.histogram("dvd_job_batch_size", "Jobs claimed per worker batch",
+                                  buckets=(1, 2, 4, 8, 16, 32, 64))
+JOBS_TOTAL    = metrics.counter("dvd_jobs_total", "Jobs by outcome", ("outcome",))
+
+
+# ======================
+# 큐 (writer 작업 / 읽기)
+# ======================
+def _submit_cur(cur, job_id, filename, audio_bytes, confirm, phone_number, vad, now):
+    cur.execute("""
+        INSERT INTO jobs (id, status, filename, confirm, phone_number, vad, created_at)
+        VALUES (?, 'queued', ?, ?, ?, ?, ?)
+    """, (job_id, filename, int(bool(confirm)), phone_number, int(bool(vad)), now))
+    cur.execute("INSERT INTO job_payloads (job_id, data) VALUES (?, ?)", (job_id, audio_bytes))
+
+def _claim_cur(cur, worker: str, limit: int, lease_s: float, max_attempts: int, now: float):
+    """
+    리스가 만료된 실행 중 작업은 시도 횟수를 넘겼으면 실패 처리, 아니면 queued 와 함께 다시 claim.
+    오래된 순으로 limit 개를 running 으로 바꾸고 (id, filename, confirm, phone, vad, attempts, created_at) 반환
+    """
+    cur.execute("""
+        UPDATE jobs SET status = 'failed', http_status = 500, finished_at = ?,
+                        error = 'Lease expired after ' || attempts || ' attempts'
+         WHERE status = 'running' AND lease_until < ? AND attempts >= ?
+    """, (now, now, max_attempts))
+    # 재시도(리스 만료) 먼저, 그다음 오래된 대기 작업 — 둘 다 (status, created_at) 인덱스 순서로 limit 개만 읽음
+    cur.execute("""
+        SELECT id FROM jobs WHERE status = 'running' AND lease_until < ? ORDER BY created_at LIMIT ?
+    """, (now, limit))
+    ids = [r[0] for r in cur.fetchall()]
+    if len(ids) < limit:
+        cur.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY created_at LIMIT ?", (limit - len(ids),))
+        ids += [r[0] for r in cur.fetchall()]
+    if not ids:
+        return []
+    cur.execute(f"""
+        UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, lease_until = ?, started_at = ?
+         WHERE id IN ({','.join('?' * len(ids))})
+        RETURNING id, filename, confirm, phone_number, vad, attempts, created_at
+    """, (worker, now + lease_s, now, *ids))
+    return sorted(cur.fetchall(), key=lambda r: r[-1])
+
+def _finish_cur(cur, done, worker: str, now):
+    """
+    done: [(job_id, attempts, status, http_status, body, error, save), ...]
+    리스를 가진 워커(running + 같은 worker + 같은 attempts)의 결과만 반영하고, 확정 저장(save: _save_confirmed_cur 인자)도
+    같은 트랜잭션에서 한다. 리스가 만료돼 다른 워커가 다시 가져간 작업은 저장/결과/페이로드 삭제를 모두 건너뛰므로
+    재시도된 작업의 EMA/롤업/번호 신고가 두 번 반영되지 않는다.
+    → 반영된 [(job_id, results.id 또는 None), ...]
+    """
+    applied = []
+    for job_id, attempts, status, code, body, error, save in done:
+        cur.execute("SELECT 1 FROM jobs WHERE id = ? AND status = 'running' AND worker = ? AND attempts = ?",
+                    (job_id, worker, attempts))
+        if cur.fetchone() is None:
+            continue
+        rowid = None
+        if save is not None:
+            rowid = db._save_confirmed_cur(cur, *save)
+            body["id"], body["saved"] = rowid, True
+        cur.execute("""
+            UPDATE jobs SET status = ?, http_status = ?, result = ?, error = ?, finished_at = ?, lease_until = NULL
+             WHERE id = ?
+        """, (status, code, json.dumps(body) if status == "done" else None, error, now, job_id))
+        cur.execute("DELETE FROM job_payloads WHERE job_id = ?", (job_id,))
+        applied.append((job_id, rowid))
+    return applied
+
+def _purge_cur(cur, before: float):
+    """보관 기간이 지난 완료/실패 작업 삭제"""
+    cur.execute("""
+        DELETE FROM job_payloads WHERE job_id IN
+            (SELECT id FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?)
+    """, (before,))
+    cur.execute("DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?", (before,))
+    return cur.rowcount
+
+def submit(filename: str, audio_bytes: bytes, confirm: bool = False, phone_number: str | None = None,
+           vad: bool = False) -> str:
+    """작업 등록 → job id"""
+    job_id = uuid.uuid4().hex
+    db.write(_submit_cur, job_id, filename, audio_bytes, confirm, phone_number, vad, time.time())
+    return job_id
+
+def get(job_id: str) -> dict | None:
+    """GET /jobs/<id> 본문 (없으면 None)"""
+    row = db.reader().execute("""
+        SELECT id, status, filename, attempts, created_at, started_at, finished_at, http_status, result, error
+          FROM jobs WHERE id = ?
+    """, (job_id,)).fetchone()
+    if row is None:
+        return None
+    job_id, status, filename, attempts, created, started, finished, code, result, error = row
+    out = {"job_id": job_id, "status": status, "filename": filename, "attempts": attempts,
+           "created_at": created, "started_at": started, "finished_at": finished}
+    if status == "done":
+        out["result"] = json.loads(result) if result else None
+    elif status == "failed":
+        out["error"] = error
+        out["status_code"] = code
+    else:
+        q = db.reader().execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created_at < ?",
+                                (created,)).fetchone()[0]
+        out["queue_position"] = q if status == "queued" else 0
+    return out
+
+def queue_stats() -> dict:
+    """대기 작업 수 / 가장 오래된 대기 작업 나이 (status 인덱스 범위만 읽음)"""
+    n, oldest = db.reader().execute(
+        "SELECT COUNT(*), MIN(created_at) FROM jobs WHERE status = 'queued'").fetchone()
+    running = db.reader().execute("SELECT COUNT(*) FROM jobs WHERE status = 'running'").fetchone()[0]
+    return {"queued": n, "running": running, "oldest_queued_age_s": (time.time() - oldest) if oldest else 0.0}
+
+metrics.gauge("dvd_jobs_queued", "Jobs waiting to be claimed", fn=lambda: queue_stats()["queued"])
+metrics.gauge("dvd_jobs_oldest_queued_age_seconds", "Age of the oldest queued job",
+              fn=lambda: queue_stats()["oldest_queued_age_s"])
+
+
+# ======================
+# 워커
+# ======================
+class JobWorkers:
+    """
+    threads 개의 스레드가 작업을 claim_batch 개씩 가져와 process_batch 로 한꺼번에 처리한다.
+      process_batch(jobs) → [(status_code, payload dict 또는 {"error": ...}, save 또는 None), ...] (입력 순서)
+        save 는 확정 저장할 (filename, pred_label, conf, probs, phone_number) — 리스 확인과 같은 트랜잭션에서 저장
+      jobs 원소: dict(id, filename, audio_bytes, confirm, phone_number, vad, attempts)
+      on_saved(job, results.id): 커밋 후 확정 저장된 작업마다 호출 (선택)
+    같은 프로세스의 submit 은 바로 깨우고, 다른 프로세스가 넣은 작업은 poll_s 주기로 확인한다.
+    """
+
+    def __init__(self, process_batch, threads: int = 1, claim_batch: int = JOB_CLAIM_BATCH,
+                 lease_s: float = JOB_LEASE_S, max_attempts: int = JOB_MAX_ATTEMPTS, poll_s: float = JOB_POLL_S,
+                 on_saved=None):
+        self.process_batch = process_batch
+        self.on_saved = on_saved
+        self.threads = max(0, int(threads))
+        self.claim_batch = max(1, int(claim_batch))
+        self.lease_s = float(lease_s)
+        self.max_attempts = max(1, int(max_attempts))
+        self.poll_s = float(poll_s)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._workers = []
+        self._stats = {"batches": 0, "done": 0, "failed": 0, "errors": 0, "stale": 0, "max_batch": 0}
+
+    @property
+    def enabled(self) -> bool:
+        return self.threads > 0
+
+    def start(self):
+        with self._start_lock:
+            if not self.enabled or self._workers:
+                return self
+            self._stop.clear()
+            for i in range(self.threads):
+                t = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+                t.start()
+                self._workers.append(t)
+        return self
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wake.set()
+        for t in self._workers:
+            t.join(timeout)
+        self._workers = []
+
+    def notify(self):
+        """같은 프로세스에서 작업을 넣었을 때 대기 중인 워커를 깨움"""
+        self._wake.set()
+
+    def run_once(self, worker: str = "") -> int:
+        """작업을 한 묶음 claim 해서 처리 → 처리한 작업 수 (없으면 0)"""
+        now = time.time()
+        worker = worker or f"{os.getpid()}:{threading.current_thread().name}"
+        rows = db.write(_claim_cur, worker, self.claim_batch, self.lease_s, self.max_attempts, now)
+        if not rows:
+            return 0
+        ids = [r[0] for r in rows]
+        payloads = dict(db.reader().execute(
+            f"SELECT job_id, data FROM job_payloads WHERE job_id IN ({','.join('?' * len(ids))})", ids).fetchall())
+        batch = [
+            {"id": job_id, "filename": filename, "audio_bytes": payloads.get(job_id, b""), "confirm": bool(confirm),
+             "phone_number": phone, "vad": bool(vad), "attempts": attempts}
+            for job_id, filename, confirm, phone, vad, attempts, _ in rows
+        ]
+        for r in rows:
+            QUEUE_SECONDS.observe(max(0.0, now - r[-1]))
+        BATCH_SIZE.observe(len(rows))
+
+        try:
+            outcomes = self.process_batch(batch)
+        except Exception:
+            # 배치 전체 실패: 리스를 그대로 두면 만료 후 재시도된다
+            with self._lock:
+                self._stats["errors"] += 1
+            JOBS_TOTAL.labels("error").inc(len(rows))
+            raise
+
+        done, finished = [], time.time()
+        for job, (code, body, *save) in zip(batch, outcomes):
+            if code == 200:
+                done.append((job["id"], job["attempts"], "done", code, body, None, save[0] if save else None))
+            else:
+                done.append((job["id"], job["attempts"], "failed", code, None, (body or {}).get("error"), None))
+        applied = dict(db.write(_finish_cur, done, worker, finished))
+        n_ok = sum(1 for d in done if d[2] == "done" and d[0] in applied)
+        n_stale = len(done) - len(applied)      # 리스를 잃은 작업: 결과는 새 리스 보유자가 쓴다
+        for r in rows:
+            JOB_SECONDS.observe(max(0.0, finished - r[-1]))
+        JOBS_TOTAL.labels("done").inc(n_ok)
+        JOBS_TOTAL.labels("failed").inc(len(applied) - n_ok)
+        JOBS_TOTAL.labels("stale").inc(n_stale)
+        if self.on_saved is not None:
+            for job in batch:
+                if applied.get(job["id"]) is not None:
+                    try:
+                        self.on_saved(job, applied[job["id"]])
+                    except Exception:
+                        pass
+        with self._lock:
+            st = self._stats
+            st["batches"] += 1
+            st["done"] += n_ok
+            st["failed"] += len(applied) - n_ok
+            st["stale"] += n_stale
+            st["max_batch"] = max(st["max_batch"], len(rows))
+        return len(rows)
+
+    def _loop(self):
+        last_purge = 0.0
+        while not self._stop.is_set():
+            try:
+                n = self.run_once()
+            except Exception as e:
+                print(f"⚠️ job worker error: {e}")
+                n = 0
+            if time.time() - last_purge > 60.0:
+                last_purge = time.time()
+                try:
+                    db.write(_purge_cur, last_purge - JOB_RETENTION_S)
+                except Exception:
+                    pass
+            if n == 0:
+                self._wake.wait(self.poll_s)
+                self._wake.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self._stats)
+        try:
+            q = queue_stats()
+        except Exception:
+            q = {}
+        return {"threads": self.threads, "claim_batch": self.claim_batch, "lease_s": self.lease_s,
+                "max_attempts": self.max_attempts, **s, **q}
+
+
+# ======================
+# 실행부 (HTTP 없이 작업만 처리하는 별도 프로세스)
+# ======================
+def main():
+    ap = argparse.ArgumentParser(description="Run job workers without the HTTP server")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    w = sub.add_parser("worker")
+    w.add_argument("--threads", type=int, default=1)
+    w.add_argument("--claim-batch", type=int, default=JOB_CLAIM_BATCH)
+    args = ap.parse_args()
+
+    import server       # 모델/배처/추출 풀 로드
+    db.init_db()
+    workers = JobWorkers(server.process_jobs, threads=args.threads, claim_batch=args.claim_batch,
+                         on_saved=server.job_saved)
+    if server.extract_pool.enabled:
+        server.extract_pool.start()
+    workers.start()
+    print(f"✅ Job workers: {args.threads} threads (claim {args.claim_batch}), DB: {db.DB_PATH}")
+    try:
+        while True:
+            time.sleep(5.0)
+    except KeyboardInterrupt:
+        workers.stop()
+
+
+if __name__ == "__main__":
+    main()
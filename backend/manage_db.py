@@ -1,125 +1,84 @@
 #!/usr/bin/env python3
 """
-데이터베이스 관리 스크립트
+데이터베이스 관리 스크립트 (서버와 같은 SQLite: phone_reports / results)
 - 더미데이터 생성
-- DB 내용 조회
+- DB 내용 조회 (상위 N개)
+- 통계 조회 (요약 테이블, 전체 스캔 없음)
+- 탐지 롤업 백필
 - DB 초기화
 """
 import sys
-from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
 import random
 
-from app.database import SessionLocal, init_db
-from app.models import DeepfakeReport
+import db
+from db import init_db, get_stats, top_numbers, normalize_phone, risk_band, write, _upsert_phone_report_cur
+
+BAND_ICON = {"high": "🔴", "medium": "🟡", "low": "🟢"}
+
+
+def _create_dummy_cur(cur, count: int):
+    """번호 count개, 번호마다 1~15회 신고를 서버와 같은 upsert 로 누적"""
+    for _ in range(count):
+        number = f"010{random.randint(1000, 9999)}{random.randint(1000, 9999)}"
+        base = random.uniform(0.3, 0.99)
+        for _ in range(random.randint(1, 15)):
+            _upsert_phone_report_cur(cur, number, min(1.0, max(0.0, random.gauss(base, 0.1))))
 
 
 def create_dummy_data(count: int = 10):
     """더미데이터 생성"""
     print(f"🔄 {count}개의 더미데이터 생성 중...")
-    
-    db: Session = SessionLocal()
-    
-    # 샘플 전화번호 패턴
-    prefixes = ["010"]
-    
     try:
-        for i in range(count):
-            prefix = random.choice(prefixes)
-            if prefix == "010":
-                number = f"{prefix}{random.randint(1000, 9999)}{random.randint(1000, 9999)}"
-            else:
-                number = f"{prefix}{random.randint(100, 999)}{random.randint(1000, 9999)}"
-            
-            report_count = random.randint(1, 15)
-            total_confidence = round(random.uniform(0.7, 0.99) * report_count, 2)
-            
-            # 과거 날짜 생성
-            days_ago = random.randint(1, 30)
-            first_date = datetime.utcnow() - timedelta(days=days_ago)
-            last_date = datetime.utcnow() - timedelta(days=random.randint(0, days_ago))
-            
-            report = DeepfakeReport(
-                phone_number=number,
-                report_count=report_count,
-                first_reported=first_date,
-                last_reported=last_date,
-                total_confidence=total_confidence
-            )
-            report.update_risk_level()
-            
-            db.add(report)
-        
-        db.commit()
+        write(_create_dummy_cur, count, timeout=None)
         print(f"✅ {count}개의 더미데이터 생성 완료!")
-        
     except Exception as e:
         print(f"❌ 에러 발생: {e}")
-        db.rollback()
-    finally:
-        db.close()
 
 
-def view_all_data():
-    """모든 데이터 조회"""
-    db: Session = SessionLocal()
-    
-    try:
-        reports = db.query(DeepfakeReport).order_by(DeepfakeReport.report_count.desc()).all()
-        
-        if not reports:
-            print("📭 데이터가 없습니다.")
-            return
-        
-        print(f"\n📊 총 {len(reports)}개의 레코드\n")
-        print("=" * 100)
-        print(f"{'ID':<5} {'전화번호':<15} {'신고횟수':<10} {'위험도':<10} {'최초신고':<20} {'최근신고':<20}")
-        print("=" * 100)
-        
-        for report in reports:
-            print(f"{report.id:<5} {report.phone_number:<15} {report.report_count:<10} "
-                  f"{report.risk_level:<10} {str(report.first_reported)[:19]:<20} "
-                  f"{str(report.last_reported)[:19]:<20}")
-        
-        print("=" * 100)
-        
-        # 통계
-        high_risk = sum(1 for r in reports if r.risk_level == "high")
-        medium_risk = sum(1 for r in reports if r.risk_level == "medium")
-        low_risk = sum(1 for r in reports if r.risk_level == "low")
-        
-        print(f"\n📈 통계:")
-        print(f"   🔴 High Risk: {high_risk}개")
-        print(f"   🟡 Medium Risk: {medium_risk}개")
-        print(f"   🟢 Low Risk: {low_risk}개")
-        
-    finally:
-        db.close()
+def view_all_data(limit: int = 50, by: str = "reports"):
+    """상위 limit개 조회 (신고 수 또는 위험도 순, 인덱스 사용)"""
+    total = get_stats()["numbers"]
+    if not total:
+        print("📭 데이터가 없습니다.")
+        return
+    rows = top_numbers(limit, by)
+
+    print(f"\n📊 총 {total}개의 번호 중 상위 {len(rows)}개 ({'신고 수' if by == 'reports' else '위험도'} 순)\n")
+    print("=" * 90)
+    print(f"{'전화번호':<15} {'신고횟수':<10} {'위험도':<10} {'구간':<8} {'최근신뢰도':<12} {'최근신고':<20}")
+    print("=" * 90)
+    for r in rows:
+        last = f"{r['last_confidence']:.3f}" if r["last_confidence"] is not None else "-"
+        print(f"{r['phone_number']:<15} {r['report_count']:<10} {r['risk_score'] or 0:<10.3f} "
+              f"{r['risk_band']:<8} {last:<12} {str(r['updated_at'])[:19]:<20}")
+    print("=" * 90)
 
 
 def search_by_phone(phone_number: str):
     """특정 전화번호 조회"""
-    db: Session = SessionLocal()
-    
-    try:
-        report = db.query(DeepfakeReport).filter(
-            DeepfakeReport.phone_number == phone_number
-        ).first()
-        
-        if not report:
-            print(f"❌ {phone_number} 번호를 찾을 수 없습니다.")
-            return
-        
-        print(f"\n📱 전화번호: {report.phone_number}")
-        print(f"📊 신고 횟수: {report.report_count}회")
-        print(f"⚠️  위험도: {report.risk_level}")
-        print(f"📅 최초 신고: {report.first_reported}")
-        print(f"📅 최근 신고: {report.last_reported}")
-        print(f"🎯 총 신뢰도: {report.total_confidence:.2f}")
-        print(f"📈 평균 신뢰도: {report.total_confidence / report.report_count:.2f}")
-        
-    finally:
-        db.close()
+    key = normalize_phone(phone_number) or phone_number
+    row = db.reader().execute("""
+        SELECT phone_number, report_count, risk_score, last_confidence, ema_alpha, created_at, updated_at
+          FROM phone_reports WHERE phone_number = ?
+    """, (key,)).fetchone()
+    if not row:
+        print(f"❌ {phone_number} 번호를 찾을 수 없습니다.")
+        return
+
+    number, count, risk, last_conf, alpha, created, updated = row
+    print(f"\n📱 전화번호: {number}")
+    print(f"📊 신고 횟수: {count}회")
+    print(f"⚠️  위험도: {risk or 0:.3f} ({risk_band(risk)})")
+    print(f"🎯 최근 신뢰도: {last_conf if last_conf is not None else '-'} (α={alpha})")
+    print(f"📅 최초 신고: {created}")
+    print(f"📅 최근 신고: {updated}")
+
+
+def _clear_cur(cur):
+    cur.execute("DELETE FROM phone_reports")
+    cur.execute("DELETE FROM results")
+    for name in ("hour", "day", "phone_day"):
+        cur.execute(f"DELETE FROM detections_{name}")
 
 
 def clear_all_data():
@@ -128,94 +87,97 @@ def clear_all_data():
     if response.lower() != "yes":
         print("취소되었습니다.")
         return
-    
-    db: Session = SessionLocal()
-    
-    try:
-        count = db.query(DeepfakeReport).count()
-        db.query(DeepfakeReport).delete()
-        db.commit()
-        print(f"✅ {count}개의 레코드가 삭제되었습니다.")
-    finally:
-        db.close()
-
-
-def show_statistics():
-    """상세 통계 조회"""
-    db: Session = SessionLocal()
-    
-    try:
-        reports = db.query(DeepfakeReport).all()
-        
-        if not reports:
-            print("📭 데이터가 없습니다.")
-            return
-        
-        total_reports = len(reports)
-        total_report_count = sum(r.report_count for r in reports)
-        avg_report_count = total_report_count / total_reports
-        
-        high_risk = [r for r in reports if r.risk_level == "high"]
-        medium_risk = [r for r in reports if r.risk_level == "medium"]
-        low_risk = [r for r in reports if r.risk_level == "low"]
-        
-        print("\n" + "=" * 60)
-        print("📊 데이터베이스 통계")
-        print("=" * 60)
-        print(f"총 전화번호: {total_reports}개")
-        print(f"총 신고 건수: {total_report_count}건")
-        print(f"평균 신고 횟수: {avg_report_count:.2f}회")
-        print()
-        print(f"🔴 High Risk: {len(high_risk)}개 ({len(high_risk)/total_reports*100:.1f}%)")
-        print(f"🟡 Medium Risk: {len(medium_risk)}개 ({len(medium_risk)/total_reports*100:.1f}%)")
-        print(f"🟢 Low Risk: {len(low_risk)}개 ({len(low_risk)/total_reports*100:.1f}%)")
+    count = get_stats()["numbers"]
+    write(_clear_cur, timeout=None)
+    print(f"✅ {count}개의 번호 레코드가 삭제되었습니다.")
+
+
+def show_statistics(top: int = 5):
+    """상세 통계 조회 (phone_stats/result_stats 요약 테이블 + 상위 K)"""
+    s = get_stats()
+    total = s["numbers"]
+    if not total:
+        print("📭 데이터가 없습니다.")
+        return
+
+    print("\n" + "=" * 60)
+    print("📊 데이터베이스 통계")
+    print("=" * 60)
+    print(f"총 전화번호: {total}개")
+    print(f"총 신고 건수: {s['reports']}건")
+    print(f"평균 신고 횟수: {s['avg_reports']:.2f}회")
+    print(f"평균 위험도: {s['avg_risk']:.3f}")
+    print()
+    th = s["thresholds"]
+    labels = {"high": f"High Risk (≥{th['high']})", "medium": f"Medium Risk (≥{th['medium']})", "low": "Low Risk"}
+    for band, n in s["risk_bands"].items():
+        print(f"{BAND_ICON[band]} {labels[band]}: {n}개 ({n / total * 100:.1f}%)")
+    print()
+
+    res = s["results"]
+    if res["total"]:
+        print(f"판별 결과: {res['total']}건")
+        for label, v in res["by_prediction"].items():
+            print(f"   {label:<8} {v['count']}건 (평균 신뢰도 {v['avg_confidence']:.3f})")
         print()
-        
-        if reports:
-            most_reported = max(reports, key=lambda r: r.report_count)
-            print(f"가장 많이 신고된 번호: {most_reported.phone_number} ({most_reported.report_count}회)")
-        
-        print("=" * 60)
-        
-    finally:
-        db.close()
+
+    print(f"가장 많이 신고된 번호 Top {top}:")
+    for r in top_numbers(top, "reports"):
+        print(f"   {r['phone_number']} ({r['report_count']}회, 위험도 {r['risk_score'] or 0:.3f})")
+    print(f"위험도가 가장 높은 번호 Top {top}:")
+    for r in top_numbers(top, "risk"):
+        print(f"   {BAND_ICON[r['risk_band']]} {r['phone_number']} ({r['risk_score'] or 0:.3f}, {r['report_count']}회)")
+    print("=" * 60)
 
 
 def main():
-    # DB 초기화 (테이블 생성)
+    # DB 초기화 (테이블/요약 트리거 생성)
     init_db()
-    
+
     if len(sys.argv) < 2:
         print("\n사용법:")
-        print("  python manage_db.py view          - 모든 데이터 조회")
-        print("  python manage_db.py create [N]    - N개의 더미데이터 생성 (기본: 10)")
-        print("  python manage_db.py search [번호] - 특정 전화번호 조회")
-        print("  python manage_db.py stats         - 상세 통계 조회")
-        print("  python manage_db.py clear         - 모든 데이터 삭제")
+        print("  python manage_db.py view [N] [risk] - 상위 N개 조회 (기본: 신고 수 순 50개, risk=위험도 순)")
+        print("  python manage_db.py create [N]      - N개의 더미데이터 생성 (기본: 10)")
+        print("  python manage_db.py search [번호]   - 특정 전화번호 조회")
+        print("  python manage_db.py stats [K]       - 상세 통계 + 상위 K개 (기본: 5)")
+        print("  python manage_db.py rebuild-stats   - 요약 테이블을 전체 집계로 다시 생성")
+        print("  python manage_db.py backfill-rollups - 시간/일/번호별 탐지 롤업을 results 로 다시 생성")
+        print("  python manage_db.py clear           - 모든 데이터 삭제")
         return
-    
+
     command = sys.argv[1]
-    
+
     if command == "view":
-        view_all_data()
-    
+        limit = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+        by = "risk" if len(sys.argv) > 3 and sys.argv[3] == "risk" else "reports"
+        view_all_data(limit, by)
+
     elif command == "create":
         count = int(sys.argv[2]) if len(sys.argv) > 2 else 10
         create_dummy_data(count)
-        view_all_data()
-    
+        view_all_data(10)
+
     elif command == "search":
         if len(sys.argv) < 3:
             print("전화번호를 입력하세요.")
             return
         search_by_phone(sys.argv[2])
-    
+
     elif command == "stats":
+        show_statistics(int(sys.argv[2]) if len(sys.argv) > 2 else 5)
+
+    elif command == "rebuild-stats":
+        db.rebuild_stats()
+        print("✅ 요약 테이블을 다시 만들었습니다.")
         show_statistics()
-    
+
+    elif command == "backfill-rollups":
+        n = db.rebuild_rollups()
+        print(f"✅ results {n}건으로 탐지 롤업을 다시 만들었습니다.")
+
     elif command == "clear":
         clear_all_data()
-    
+
     else:
         print(f"알 수 없는 명령어: {command}")
 
@@ -0,0 +1,263 @@
+# metrics.py
+import bisect, contextvars, os, threading, time
+from contextlib import contextmanager
+
+# ======================
+# 설정
+# ======================
+# 응답에 Server-Timing 헤더 추가 (1 = 항상, 0 = ?timing=1 요청에만)
+SERVER_TIMING = os.environ.get("SERVER_TIMING", "0") == "1"
+
+# 초 단위 지연 버킷 (0.5ms ~ 10s)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+DURATION_BUCKETS = (0.3, 0.5, 1.0, 2.0, 3.0, 5.0, 7.5, 10.0)
+BYTES_BUCKETS = (16e3, 64e3, 128e3, 256e3, 512e3, 1e6, 2e6, 5e6, 10e6, 50e6, 200e6)
+
+
+def _esc(v) -> str:
+    return str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _fmt_labels(names, values, extra=""):
+    parts = [f'{n}="{_esc(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+def _fmt_num(v) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+# ======================
+# 메트릭 타입 (prometheus_client 없이 최소 구현)
+# ======================
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._children = {}
+
+    def labels(self, *values):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(self._children.items()):
+            lines.extend(child.render(self.name, self.labelnames, key))
+        return lines
+
+
+class _Value:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0):
+        with self._lock:
+            self.value -= amount
+
+    def set(self, value: float):
+        self.value = float(value)
+
+    def render(self, name, labelnames, key):
+        return [f"{name}{_fmt_labels(labelnames, key)} {_fmt_num(self.value)}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+    _new_child = _Value
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    """값을 직접 set/inc 하거나, fn 을 주면 수집 시점에 호출해 읽는다"""
+    kind = "gauge"
+    _new_child = _Value
+
+    def __init__(self, name: str, help: str, labelnames=(), fn=None):
+        super().__init__(name, help, labelnames)
+        self.fn = fn
+
+    def render(self) -> list:
+        if self.fn is not None:
+            try:
+                self.labels().set(self.fn())
+            except Exception:
+                pass
+        return super().render()
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._lock = threading.Lock()
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)     # 마지막 = +Inf
+        self.sum = 0.0
+
+    def observe(self, v: float):
+        i = bisect.bisect_left(self.buckets, v)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += v
+
+    def render(self, name, labelnames, key):
+        with self._lock:
+            counts, total = list(self.counts), self.sum
+        lines, acc = [], 0
+        for le, n in zip(list(self.buckets) + [float("inf")], counts):
+            acc += n
+            le_label = 'le="' + _fmt_num(le) + '"'
+            lines.append(f"{name}_bucket{_fmt_labels(labelnames, key, le_label)} {acc}")
+        lines.append(f"{name}_sum{_fmt_labels(labelnames, key)} {_fmt_num(total)}")
+        lines.append(f"{name}_count{_fmt_labels(labelnames, key)} {acc}")
+        return lines
+
+
+class Histogram(_Metric):
+    """고정 버킷 누적 히스토그램 (observe 는 bisect + 잠금 1회)"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, v: float):
+        self.labels().observe(v)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for m in metrics:
+            lines.extend(m.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def counter(name, help, labelnames=()):
+    return REGISTRY.register(Counter(name, help, labelnames))
+
+def gauge(name, help, labelnames=(), fn=None):
+    return REGISTRY.register(Gauge(name, help, labelnames, fn=fn))
+
+def histogram(name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labelnames, buckets))
+
+def render() -> str:
+    return REGISTRY.render()
+
+
+# ======================
+# 공용 메트릭
+# ======================
+REQUESTS  = counter("dvd_requests_total", "Requests by endpoint, status and file extension", ("endpoint", "status", "ext"))
+ERRORS    = counter("dvd_request_errors_total", "Requests answered with status >= 400", ("endpoint", "status", "ext"))
+LATENCY   = histogram("dvd_request_seconds", "End-to-end request latency", ("endpoint",))
+IN_FLIGHT = gauge("dvd_in_flight_requests", "Requests currently being handled", ("endpoint",))
+STAGE     = histogram("dvd_stage_seconds", "Time spent per pipeline stage", ("stage",))
+AUDIO_SECONDS = histogram("dvd_audio_duration_seconds", "Decoded audio duration (before padding, capped at the model window)",
+                          buckets=DURATION_BUCKETS)
+UPLOAD_BYTES  = histogram("dvd_upload_bytes", "Request body size", ("ext",), buckets=BYTES_BUCKETS)
+
+
+# ======================
+# 단계 타이밍 (요청별 Server-Timing 용으로도 모음)
+# ======================
+_timings = contextvars.ContextVar("dvd_timings", default=None)
+
+def observe_stage(name: str, seconds: float):
+    """단계 히스토그램에 기록 + 진행 중인 요청이 있으면 그 요청의 타이밍에도 더한다"""
+    STAGE.labels(name).observe(seconds)
+    t = _timings.get()
+    if t is not None:
+        t[name] = t.get(name, 0.0) + seconds
+
+@contextmanager
+def stage(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe_stage(name, time.perf_counter() - t0)
+
+@contextmanager
+def collect_timings():
+    """블록 안에서 기록된 단계 시간을 dict(초)로 모은다 (프로세스 풀 워커가 부모로 돌려줄 때 사용)"""
+    t = {}
+    token = _timings.set(t)
+    try:
+        yield t
+    finally:
+        _timings.reset(token)
+
+def server_timing(timings: dict, total: float | None = None) -> str:
+    """{단계: 초} → Server-Timing 헤더 값 (ms)"""
+    parts = [f"{k};dur={v * 1000.0:.2f}" for k, v in timings.items()]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000.0:.2f}")
+    return ", ".join(parts)
+
+
+class RequestScope:
+    """요청 1건: in-flight 게이지, 지연 히스토그램, 상태/확장자 카운터, 단계 타이밍"""
+
+    def __init__(self, endpoint: str):
+        self.endpoint = endpoint
+        self.timings = {}
+        self.status = 500
+        self.ext = ""
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def server_timing(self) -> str:
+        return server_timing(self.timings, time.perf_counter() - self.started)
+
+@contextmanager
+def request_scope(endpoint: str):
+    scope = RequestScope(endpoint)
+    gauge_child = IN_FLIGHT.labels(endpoint)
+    gauge_child.inc()
+    token = _timings.set(scope.timings)
+    try:
+        yield scope
+    finally:
+        _timings.reset(token)
+        gauge_child.dec()
+        scope.elapsed = time.perf_counter() - scope.started
+        LATENCY.labels(endpoint).observe(scope.elapsed)
+        ext = scope.ext or "none"
+        REQUESTS.labels(endpoint, scope.status, ext).inc()
+        if scope.status >= 400:
+            ERRORS.labels(endpoint, scope.status, ext).inc()
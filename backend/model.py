@@ -0,0 +1,52 @@
+# model.py
+import torch
+
+# ======================
+# 모델 정의
+# ======================
+class SEBlock(torch.nn.Module):
+    def __init__(self, channels, reduction=8):
+        super().__init__()
+        self.fc1 = torch.nn.Linear(channels, channels // reduction)
+        self.fc2 = torch.nn.Linear(channels // reduction, channels)
+    def forward(self, x):
+        y = torch.relu(self.fc1(x))
+        y = torch.sigmoid(self.fc2(y))
+        return x * y
+
+class AttentionAudioClassifier(torch.nn.Module):
+    def __init__(self, input_dim, num_classes=3):
+        super().__init__()
+        self.fc1 = torch.nn.Sequential(
+            torch.nn.Linear(input_dim, 512),
+            torch.nn.BatchNorm1d(512),
+            torch.nn.ReLU(),
+            torch.nn.Dropout(0.4),
+        )
+        self.se1 = SEBlock(512)
+        self.fc2 = torch.nn.Sequential(
+            torch.nn.Linear(512, 384),
+            torch.nn.BatchNorm1d(384),
+            torch.nn.ReLU(),
+            torch.nn.Dropout(0.35),
+        )
+        self.se2 = SEBlock(384)
+        self.fc3 = torch.nn.Sequential(
+            torch.nn.Linear(384, 256),
+            torch.nn.BatchNorm1d(256),
+            torch.nn.ReLU(),
+            torch.nn.Dropout(0.3),
+        )
+        self.se3 = SEBlock(256)
+        self.classifier = torch.nn.Sequential(
+            torch.nn.Linear(256, 128),
+            torch.nn.BatchNorm1d(128),
+            torch.nn.ReLU(),
+            torch.nn.Dropout(0.3),
+            torch.nn.Linear(128, num_classes),
+        )
+    def forward(self, x):
+        x = self.fc1(x); x = self.se1(x)
+        x = self.fc2(x); x = self.se2(x)
+        x = self.fc3(x); x = self.se3(x)
+        return self.classifier(x)
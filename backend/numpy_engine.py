@@ -0,0 +1,112 @@
+# numpy_engine.py
+import hashlib
+
+import numpy as np
+
+# ======================
+# AttentionAudioClassifier 의 NumPy 추론 (torch 불필요)
+# ======================
+# 블록 구성 (model.py 와 같은 순서)
+#   fc1 → se1 → fc2 → se2 → fc3 → se3 → classifier[0..2] → classifier[4]
+# fcN / classifier[0] : Linear + BatchNorm1d(eval) + ReLU (+ Dropout: 추론 시 무시)
+_DENSE = ["fc1", "fc2", "fc3"]
+_SE    = ["se1", "se2", "se3"]
+
+
+def bytes_version(model_bytes: bytes, scaler_bytes: bytes) -> str:
+    """체크포인트 + 스케일러 내용 해시 (로드한 바이트 그대로 → 결과 캐시 버전과 npz 스탬프에 공통)"""
+    h = hashlib.sha256()
+    for data in (model_bytes, scaler_bytes):
+        h.update(hashlib.sha256(data).digest())
+    return h.hexdigest()[:16]
+
+
+def source_version(model_path: str, scaler_path: str) -> str:
+    """원본 체크포인트 + 스케일러 파일 내용 해시 (npz 가 최신인지 확인용)"""
+    with open(model_path, "rb") as f, open(scaler_path, "rb") as g:
+        return bytes_version(f.read(), g.read())
+
+
+def _fold_bn(w, b, sd, prefix, eps=1e-5):
+    """Linear(w, b) 뒤 eval BatchNorm1d 를 Linear 로 흡수"""
+    gamma = sd[f"{prefix}.weight"]
+    beta  = sd[f"{prefix}.bias"]
+    mean  = sd[f"{prefix}.running_mean"]
+    var   = sd[f"{prefix}.running_var"]
+    s = gamma / np.sqrt(var + eps)
+    return w * s[:, None], (b - mean) * s + beta
+
+
+def fold_state_dict(sd: dict, scaler_mean=None, scaler_scale=None, eps: float = 1e-5) -> dict:
+    """
+    state_dict(NumPy 배열) → 접힌 가중치 dict.
+      - StandardScaler: (x - mean) / scale 를 첫 Linear 로 흡수
+      - BatchNorm1d(eval): 바로 앞 Linear 로 흡수
+    가중치는 x @ W 형태로 쓰도록 (in, out) 으로 전치해 float32 로 저장한다.
+    """
+    sd = {k: np.asarray(v, dtype=np.float64) for k, v in sd.items()}
+    out = {}
+
+    for i, name in enumerate(_DENSE):
+        w, b = _fold_bn(sd[f"{name}.0.weight"], sd[f"{name}.0.bias"], sd, f"{name}.1", eps)
+        if i == 0 and scaler_scale is not None:
+            mean = np.zeros(w.shape[1]) if scaler_mean is None else np.asarray(scaler_mean, np.float64)
+            scale = np.asarray(scaler_scale, np.float64)
+            b = b - w @ (mean / scale)
+            w = w / scale[None, :]
+        out[f"{name}_w"], out[f"{name}_b"] = w.T, b
+        se = _SE[i]
+        out[f"{se}_w1"], out[f"{se}_b1"] = sd[f"{se}.fc1.weight"].T, sd[f"{se}.fc1.bias"]
+        out[f"{se}_w2"], out[f"{se}_b2"] = sd[f"{se}.fc2.weight"].T, sd[f"{se}.fc2.bias"]
+
+    w, b = _fold_bn(sd["classifier.0.weight"], sd["classifier.0.bias"], sd, "classifier.1", eps)
+    out["head_w"], out["head_b"] = w.T, b
+    out["out_w"], out["out_b"] = sd["classifier.4.weight"].T, sd["classifier.4.bias"]
+    return {k: np.ascontiguousarray(v, dtype=np.float32) for k, v in out.items()}
+
+
+class NumpyClassifier:
+    """접힌 가중치(.npz)로 배치 forward: 입력은 스케일링 전 MFCC"""
+
+    def __init__(self, weights: dict, class_names=None, version: str | None = None):
+        self.w = {k: np.ascontiguousarray(v, dtype=np.float32) for k, v in weights.items()}
+        self.class_names = list(class_names) if class_names is not None else ["real", "fake_2", "tts"]
+        self.version = version
+
+    @classmethod
+    def load(cls, path: str, expect_version: str | None = None):
+        with np.load(path, allow_pickle=False) as z:
+            weights = {k: z[k] for k in z.files if not k.startswith("meta_")}
+            version = str(z["meta_version"]) if "meta_version" in z.files else None
+            names = [str(n) for n in z["meta_class_names"]] if "meta_class_names" in z.files else None
+        if expect_version is not None and version != expect_version:
+            raise RuntimeError(
+                f"{path} was exported from a different model/scaler "
+                f"(npz={version}, current={expect_version}); re-run export_numpy.py"
+            )
+        return cls(weights, class_names=names, version=version)
+
+    def save(self, path: str):
+        meta = {"meta_class_names": np.array(self.class_names)}
+        if self.version:
+            meta["meta_version"] = np.array(self.version)
+        np.savez(path, **self.w, **meta)
+
+    def logits(self, x: np.ndarray) -> np.ndarray:
+        w = self.w
+        h = np.asarray(x, dtype=np.float32)
+        if h.ndim == 1:
+            h = h[None, :]
+        for name, se in zip(_DENSE, _SE):
+            h = np.maximum(h @ w[f"{name}_w"] + w[f"{name}_b"], 0.0)
+            g = np.maximum(h @ w[f"{se}_w1"] + w[f"{se}_b1"], 0.0)
+            g = g @ w[f"{se}_w2"] + w[f"{se}_b2"]
+            h = h * (1.0 / (1.0 + np.exp(-np.clip(g, -80.0, 80.0))))
+        h = np.maximum(h @ w["head_w"] + w["head_b"], 0.0)
+        return h @ w["out_w"] + w["out_b"]
+
+    def predict_proba(self, x: np.ndarray) -> np.ndarray:
+        z = self.logits(x)
+        z = z - z.max(axis=1, keepdims=True)
+        e = np.exp(z)
+        return e / e.sum(axis=1, keepdims=True)
@@ -0,0 +1,138 @@
+# phone_index.py
+import threading, time
+
+import db
+from db import normalize_phone
+
+
+# ======================
+# 번호별 위험도 메모리 인덱스
+# ======================
+class PhoneIndex:
+    """
+    phone_reports 의 (risk_score, report_count, updated_at) 를 dict 로 들고 조회한다.
+      - 시작 시 rebuild() 로 SQLite 전체를 읽어 채움
+      - upsert_phone_report 커밋 직후 db.on_phone_report 로 같은 프로세스의 쓰기를 즉시 반영(write-through)
+      - refresh_s > 0 이면 백그라운드에서 updated_at 이후 변경분만 읽어 다른 프로세스의 쓰기도 따라감
+    조회(get/get_many)는 dict 조회만 하므로 디스크에 닿지 않는다.
+    """
+
+    def __init__(self, refresh_s: float = 0.0):
+        self.refresh_s = float(refresh_s)
+        self._lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._rows = {}            # 번호 → (risk_score, report_count, updated_at)
+        self._loaded = False
+        self._building = None      # rebuild 중 들어온 쓰기 (교체 후 재적용)
+        self._since = ""           # 읽어 온 updated_at 최댓값
+        self._stats = {"rebuilds": 0, "rebuild_ms": 0.0, "refreshes": 0, "writes": 0, "lookups": 0, "hits": 0}
+        self._thread = None
+        db.on_phone_report(self.apply)
+
+    # ---------- 적재 ----------
+    def _read(self, since: str | None = None):
+        sql = "SELECT phone_number, risk_score, report_count, updated_at FROM phone_reports"
+        if since:
+            # 같은 초에 커밋된 행을 놓치지 않도록 >=
+            return db.reader().execute(sql + " WHERE updated_at >= ?", (since,)).fetchall()
+        return db.reader().execute(sql).fetchall()
+
+    @staticmethod
+    def _merge(rows: dict, number, risk, count, updated_at) -> str:
+        """정규화한 번호로 병합 (같은 번호의 옛 표기가 여러 행이면 최신 updated_at 우선)"""
+        key = normalize_phone(number) or number
+        cur = rows.get(key)
+        if cur is None or (updated_at or "") >= (cur[2] or ""):
+            rows[key] = (risk, count or 0, updated_at)
+        return updated_at or ""
+
+    def rebuild(self):
+        """SQLite 전체 → 새 dict 로 교체 (읽는 동안 들어온 쓰기는 교체 후 다시 적용)"""
+        t0 = time.perf_counter()
+        with self._lock:
+            self._building = []
+        try:
+            raw = self._read()
+        except Exception:
+            with self._lock:
+                self._building = None
+            raise
+        rows, since = {}, ""
+        for r in raw:
+            since = max(since, self._merge(rows, *r))
+        with self._lock:
+            for r in self._building:
+                since = max(since, self._merge(rows, *r))
+            self._rows, self._since, self._building, self._loaded = rows, since, None, True
+            self._stats["rebuilds"] += 1
+            self._stats["rebuild_ms"] = (time.perf_counter() - t0) * 1000.0
+        return self
+
+    def refresh(self):
+        """updated_at >= 마지막 값 인 행만 다시 읽어 반영 (다른 프로세스의 쓰기)"""
+        raw = self._read(self._since)
+        with self._lock:
+            for r in raw:
+                self._since = max(self._since, self._merge(self._rows, *r))
+            self._stats["refreshes"] += 1
+
+    def start(self):
+        """(아직이면) rebuild + (refresh_s > 0 이면) 백그라운드 증분 갱신 시작"""
+        with self._start_lock:
+            if not self._loaded:
+                self.rebuild()
+            if self.refresh_s > 0 and self._thread is None:
+                self._thread = threading.Thread(target=self._loop, name="phone-index", daemon=True)
+                self._thread.start()
+        return self
+
+    def _loop(self):
+        while True:
+            time.sleep(self.refresh_s)
+            try:
+                self.refresh()
+            except Exception:
+                pass
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            self.start()
+
+    # ---------- write-through ----------
+    def apply(self, number, risk, count, updated_at):
+        with self._lock:
+            self._since = max(self._since, self._merge(self._rows, number, risk, count, updated_at))
+            if self._building is not None:
+                self._building.append((number, risk, count, updated_at))
+            self._stats["writes"] += 1
+
+    # ---------- 조회 ----------
+    def _lookup(self, raw) -> dict:
+        key = normalize_phone(raw)
+        row = self._rows.get(key) if key else None
+        if row is None:
+            return {"phone_number": key or raw, "found": False, "valid": key is not None}
+        return {"phone_number": key, "found": True, "valid": True,
+                "risk_score": row[0], "report_count": row[1], "updated_at": row[2]}
+
+    def get(self, raw) -> dict:
+        self._ensure_loaded()
+        out = self._lookup(raw)
+        with self._lock:
+            self._stats["lookups"] += 1
+            self._stats["hits"] += out["found"]
+        return out
+
+    def get_many(self, raws) -> list:
+        self._ensure_loaded()
+        out = [self._lookup(r) for r in raws]
+        hits = sum(r["found"] for r in out)
+        with self._lock:
+            self._stats["lookups"] += len(out)
+            self._stats["hits"] += hits
+        return out
+
+    def stats(self) -> dict:
+        """카운터는 조회/쓰기/갱신 스레드가 함께 바꾸므로 같은 락 아래에서 한 번에 복사"""
+        with self._lock:
+            return {"entries": len(self._rows), "loaded": self._loaded, "refresh_s": self.refresh_s, **self._stats}
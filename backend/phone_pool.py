@@ -0,0 +1,109 @@
+# phone_pool.py
+import json, os, threading, atexit
+
+import db
+
+
+# ======================
+# 번호 풀 (data.json) 순환 – 시연용
+# ======================
+def _load_phone_pool(path: str):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        pool = []
+        for item in data:
+            if isinstance(item, str):
+                pool.append(item.strip())
+            elif isinstance(item, dict) and "phone_number" in item:
+                pool.append(str(item["phone_number"]).strip())
+        return [p for p in pool if p]
+    except Exception:
+        return []
+
+def _read_legacy_cursor(path: str, max_len: int) -> int:
+    """이전 phone_cursor.txt 위치 (최초 이관용). 기존 서버처럼 풀 범위 밖이면 0"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            v = int(f.read().strip())
+            return v if 0 <= v < max_len else 0
+    except Exception:
+        return 0
+
+def _reserve_cur(cur, size: int, seed: int):
+    """공유 커서를 size 만큼 전진시키고 예약 구간 시작 위치 반환"""
+    cur.execute("INSERT OR IGNORE INTO phone_pool_cursor (id, pos) VALUES (1, ?)", (seed,))
+    cur.execute("UPDATE phone_pool_cursor SET pos = pos + ? WHERE id = 1 RETURNING pos", (size,))
+    return cur.fetchone()[0] - size
+
+def _release_cur(cur, reserved_end: int, next_pos: int):
+    """다른 프로세스가 더 예약하지 않았다면 쓰지 않은 구간을 반납"""
+    cur.execute("UPDATE phone_pool_cursor SET pos = ? WHERE id = 1 AND pos = ?", (next_pos, reserved_end))
+
+
+class PhonePool:
+    """
+    번호 풀을 메모리에 한 번만 올리고(mtime 이 바뀔 때만 재로딩) 순환 할당한다.
+      - 프로세스 안: lock 으로 보호되는 커서 → 동시 요청이 같은 번호를 받지 않음
+      - 프로세스 간: SQLite phone_pool_cursor 에서 block 개씩 구간을 예약 (hi/lo 방식)
+    예약 자체가 커서의 영속화이므로 재시작하면 마지막 예약 지점부터 이어가며,
+    정상 종료 시에는 쓰지 않은 구간을 반납해 정확히 같은 위치에서 재개한다.
+    """
+
+    def __init__(self, pool_path: str, legacy_cursor_path: str | None = None, block: int = 16):
+        self.pool_path = pool_path
+        self.legacy_cursor_path = legacy_cursor_path
+        self.block = max(1, int(block))
+        self._lock = threading.Lock()
+        self._pool = []
+        self._mtime = None
+        self._next = 0
+        self._end = 0          # 예약 구간 [_next, _end)
+        self._pid = os.getpid()
+        self._atexit = False
+        self._seed = None
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.stat(self.pool_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime != self._mtime:
+            self._pool = _load_phone_pool(self.pool_path) if mtime is not None else []
+            self._mtime = mtime
+
+    def next(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # fork 된 자식은 부모의 예약 구간을 이어 쓰지 않는다
+                self._pid, self._next, self._end = os.getpid(), 0, 0
+            self._reload_if_changed()
+            if not self._pool:
+                return None
+            if self._next >= self._end:
+                if self._seed is None:
+                    self._seed = (_read_legacy_cursor(self.legacy_cursor_path, len(self._pool))
+                                  if self.legacy_cursor_path else 0)
+                self._next = db.write(_reserve_cur, self.block, self._seed)
+                self._end = self._next + self.block
+                if not self._atexit:
+                    # writer 보다 나중에 등록 → 종료 시 writer 가 닫히기 전에 반납
+                    atexit.register(self.release)
+                    self._atexit = True
+            pos = self._next
+            self._next += 1
+            return self._pool[pos % len(self._pool)]
+
+    def release(self):
+        with self._lock:
+            if self._pid != os.getpid() or self._next >= self._end:
+                return
+            try:
+                db.write(_release_cur, self._end, self._next, timeout=2.0)
+            except Exception:
+                pass
+            self._end = self._next
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"pool_size": len(self._pool), "next": self._next, "reserved_until": self._end, "block": self.block}
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+# quantize.py
+"""
+CPU 추론용 저정밀 변형 (AttentionAudioClassifier)
+  fp32 : 원본 그대로
+  int8 : BatchNorm 을 Linear 에 접은 뒤 동적 int8 양자화
+         (입력층 fc1.0 은 fp32 유지 — 13차원 입력이라 오차에 가장 민감하고 크기 이득도 거의 없음)
+  bf16 / fp16 : BatchNorm 을 접은 뒤 가중치/활성값을 반정밀도로
+서버는 MODEL_PRECISION 으로 고르고, 시작할 때 fp32 대비 정확도 게이트를 통과해야 켠다 (실패 시 fp32).
+
+사용법:
+  python quantize.py                                   # 전 변형 평가 + 배치 1~256 지연/메모리 표
+  python quantize.py --features feats.npz              # 라벨된 특징 (X: (N,13) 원시 MFCC, y: 선택 라벨)
+  python quantize.py --precisions int8 --json q.json   # 결과 JSON 저장
+"""
+import argparse, copy, io, json, os, sys, time, warnings
+
+import numpy as np
+import torch
+
+# ======================
+# 설정
+# ======================
+PRECISIONS = ("fp32", "int8", "bf16", "fp16")
+QUANT_MIN_AGREEMENT = float(os.environ.get("QUANT_MIN_AGREEMENT", "0.99"))  # fp32 와 argmax 일치율 하한
+QUANT_MAX_DRIFT     = float(os.environ.get("QUANT_MAX_DRIFT", "0.15"))      # 샘플별 max|Δp| 의 p99 상한
+QUANT_GATE_SAMPLES  = int(os.environ.get("QUANT_GATE_SAMPLES", "4096"))     # 시작 시 게이트용 합성 특징 수
+
+BENCH_BATCH_SIZES = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+_KEEP_FP32 = {"fc1.0"}
+
+
+# ======================
+# 변형 생성
+# ======================
+def fold_batchnorm(model: torch.nn.Module) -> torch.nn.Module:
+    """eval BatchNorm1d 를 바로 앞 Linear 에 접은 사본 (BN 자리는 Identity)"""
+    from torch.nn.utils.fusion import fuse_linear_bn_eval
+    folded = copy.deepcopy(model).eval()
+    for seq in (folded.fc1, folded.fc2, folded.fc3, folded.classifier):
+        seq[0] = fuse_linear_bn_eval(seq[0], seq[1])
+        seq[1] = torch.nn.Identity()
+    return folded
+
+def build_variant(model: torch.nn.Module, precision: str) -> torch.nn.Module:
+    """fp32 eval 모델 → precision 변형 (원본은 건드리지 않음)"""
+    if precision == "fp32":
+        return model
+    folded = fold_batchnorm(model)
+    if precision == "int8":
+        names = {n for n, m in folded.named_modules() if isinstance(m, torch.nn.Linear) and n not in _KEEP_FP32}
+        with warnings.catch_warnings():       # torch.ao → torchao 이전 안내 경고
+            warnings.simplefilter("ignore")
+            return torch.ao.quantization.quantize_dynamic(folded, names, dtype=torch.qint8).eval()
+    if precision == "bf16":
+        return folded.to(torch.bfloat16).eval()
+    if precision == "fp16":
+        return folded.half().eval()
+    raise ValueError(f"Unknown precision: {precision} ({'|'.join(PRECISIONS)})")
+
+def input_dtype(precision: str):
+    return {"bf16": torch.bfloat16, "fp16": torch.float16}.get(precision, torch.float32)
+
+def predict_proba(module: torch.nn.Module, precision: str, x_scaled: np.ndarray, device="cpu") -> np.ndarray:
+    """스케일된 (B, 13) → (B, 3) float32 softmax"""
+    with torch.no_grad():
+        x = torch.from_numpy(np.asarray(x_scaled, dtype=np.float32)).to(device=device, dtype=input_dtype(precision))
+        return torch.softmax(module(x).float(), dim=1).cpu().numpy()
+
+def weights_bytes(module: torch.nn.Module) -> int:
+    """직렬화한 state_dict 크기 (int8 의 packed 가중치 포함) — 워커당 모델 메모리의 근사"""
+    buf = io.BytesIO()
+    torch.save(module.state_dict(), buf)
+    return buf.tell()
+
+
+# ======================
+# 정확도 게이트
+# ======================
+def synthetic_features(scaler, n: int, seed: int = 0, spread: float = 1.0) -> np.ndarray:
+    """스케일러 분포(평균 ± spread·표준편차) 주변의 원시 MFCC (N, 13)"""
+    rng = np.random.default_rng(seed)
+    mean = np.asarray(getattr(scaler, "mean_", np.zeros(13)), dtype=np.float64)
+    scale = np.asarray(getattr(scaler, "scale_", np.ones(mean.size)), dtype=np.float64)
+    return (mean + scale * rng.standard_normal((n, mean.size)) * spread).astype(np.float32)
+
+def compare(ref: np.ndarray, probs: np.ndarray, labels=None) -> dict:
+    """fp32 확률 ref 대비 일치율/확률 편차 (labels 가 있으면 정확도도)"""
+    drift = np.abs(probs - ref).max(axis=1)
+    out = {
+        "samples": int(ref.shape[0]),
+        "agreement": float((probs.argmax(1) == ref.argmax(1)).mean()),
+        "drift_mean": float(drift.mean()),
+        "drift_p99": float(np.percentile(drift, 99)),
+        "drift_max": float(drift.max()),
+    }
+    if labels is not None:
+        out["accuracy"] = float((probs.argmax(1) == labels).mean())
+        out["accuracy_fp32"] = float((ref.argmax(1) == labels).mean())
+    return out
+
+def gate(report: dict, min_agreement: float = QUANT_MIN_AGREEMENT, max_drift: float = QUANT_MAX_DRIFT):
+    """→ (통과 여부, 사유)"""
+    if report["agreement"] < min_agreement:
+        return False, f"agreement {report['agreement']:.4f} < {min_agreement}"
+    if report["drift_p99"] > max_drift:
+        return False, f"p99 drift {report['drift_p99']:.4f} > {max_drift}"
+    return True, "ok"
+
+def prepare(model: torch.nn.Module, scaler, precision: str = "fp32", device=None,
+            samples: int = QUANT_GATE_SAMPLES):
+    """
+    서버 시작용: precision 변형을 만들고 합성 특징으로 게이트 확인.
+    → (사용할 모듈, 실제 precision, 보고 dict). 게이트/생성 실패면 fp32 원본으로 되돌린다.
+    """
+    precision = (precision or "fp32").lower()
+    device = device or torch.device("cpu")
+    if precision == "fp32":
+        return model, "fp32", {"requested": "fp32", "enabled": True}
+    info = {"requested": precision, "enabled": False}
+    if precision == "int8" and device.type != "cpu":
+        info["reason"] = "int8 dynamic quantization is CPU-only"
+        return model, "fp32", info
+    try:
+        variant = build_variant(model, precision).to(device)
+        x = scaler.transform(synthetic_features(scaler, samples))
+        report = compare(predict_proba(model, "fp32", x, device), predict_proba(variant, precision, x, device))
+    except Exception as e:
+        info["reason"] = f"build failed: {e}"
+        return model, "fp32", info
+    ok, reason = gate(report)
+    info.update(report, enabled=ok, reason=reason)
+    return (variant, precision, info) if ok else (model, "fp32", info)
+
+
+# ======================
+# 지연/메모리
+# ======================
+def bench(module: torch.nn.Module, precision: str, x_scaled: np.ndarray, batch_sizes=BENCH_BATCH_SIZES,
+          min_time: float = 0.2) -> dict:
+    """배치 크기별 forward 지연 (p50 ms, 행당 µs)"""
+    out = {}
+    for bs in batch_sizes:
+        xb = np.resize(x_scaled, (bs, x_scaled.shape[1]))
+        predict_proba(module, precision, xb)      # 워밍업
+        times, t_end = [], time.perf_counter() + min_time
+        while time.perf_counter() < t_end or len(times) < 5:
+            t0 = time.perf_counter()
+            predict_proba(module, precision, xb)
+            times.append(time.perf_counter() - t0)
+        p50 = float(np.median(times)) * 1000.0
+        out[bs] = {"p50_ms": p50, "per_row_us": p50 * 1000.0 / bs}
+    return out
+
+
+# ======================
+# 실행부 (평가 하네스)
+# ======================
+def _load_features(path: str, class_names):
+    """npz(X, y) → (원시 MFCC, 라벨 인덱스 또는 None). y 는 정수 또는 클래스 이름"""
+    data = np.load(path, allow_pickle=False)
+    x = np.asarray(data["X"], dtype=np.float32)
+    if "y" not in data:
+        return x, None
+    y = data["y"]
+    if y.dtype.kind in "US":
+        y = np.array([class_names.index(str(v)) for v in y])
+    return x, np.asarray(y, dtype=np.int64)
+
+def main():
+    ap = argparse.ArgumentParser(description="Evaluate reduced-precision model variants against fp32")
+    ap.add_argument("--precisions", nargs="+", default=[p for p in PRECISIONS if p != "fp32"], choices=PRECISIONS)
+    ap.add_argument("--features", default=None, help="npz with X (N,13 raw MFCC) and optional y labels")
+    ap.add_argument("--samples", type=int, default=8192, help="synthetic set size when --features is not given")
+    ap.add_argument("--spread", type=float, default=1.0, help="synthetic spread in scaler standard deviations")
+    ap.add_argument("--batch-sizes", type=int, nargs="+", default=list(BENCH_BATCH_SIZES))
+    ap.add_argument("--min-agreement", type=float, default=QUANT_MIN_AGREEMENT)
+    ap.add_argument("--max-drift", type=float, default=QUANT_MAX_DRIFT)
+    ap.add_argument("--threads", type=int, default=0, help="torch intra-op threads (0 = torch default)")
+    ap.add_argument("--json", default=None)
+    args = ap.parse_args()
+
+    from export_numpy import load_torch, CLASS_NAMES
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    model, scaler = load_torch()
+    if args.features:
+        x_raw, labels = _load_features(args.features, CLASS_NAMES)
+        source = args.features
+    else:
+        x_raw, labels = synthetic_features(scaler, args.samples, spread=args.spread), None
+        source = f"synthetic(n={args.samples}, spread={args.spread})"
+    x = scaler.transform(x_raw)
+    ref = predict_proba(model, "fp32", x)
+
+    print(f"🔎 {source}  gate: agreement ≥ {args.min_agreement}, p99 drift ≤ {args.max_drift}")
+    base_bytes = weights_bytes(model)
+    base_lat = bench(model, "fp32", x, args.batch_sizes)
+    doc = {"source": source, "thresholds": {"min_agreement": args.min_agreement, "max_drift": args.max_drift},
+           "variants": {"fp32": {"weights_bytes": base_bytes, "latency": base_lat}}}
+    failed = []
+    for precision in args.precisions:
+        if precision == "fp32":
+            continue
+        variant = build_variant(model, precision)
+        report = compare(ref, predict_proba(variant, precision, x), labels)
+        ok, reason = gate(report, args.min_agreement, args.max_drift)
+        lat = bench(variant, precision, x, args.batch_sizes)
+        wb = weights_bytes(variant)
+        doc["variants"][precision] = {**report, "enabled": ok, "reason": reason, "weights_bytes": wb, "latency": lat}
+        if not ok:
+            failed.append(precision)
+
+        acc = f"  acc {report['accuracy']:.4f} (fp32 {report['accuracy_fp32']:.4f})" if labels is not None else ""
+        print(f"\n{'✅' if ok else '❌'} {precision}: agreement {report['agreement'] * 100:.2f}%  "
+              f"drift p99 {report['drift_p99']:.4f} / max {report['drift_max']:.4f}{acc}"
+              + ("" if ok else f"  → 사용 불가 ({reason})"))
+        print(f"   weights {wb / 1024:.0f} KiB (fp32 {base_bytes / 1024:.0f} KiB, {base_bytes / max(1, wb):.2f}x 작음)")
+        print(f"   {'batch':>6} {'fp32 ms':>9} {precision + ' ms':>9} {'speedup':>8}")
+        for bs in args.batch_sizes:
+            b, v = base_lat[bs]["p50_ms"], lat[bs]["p50_ms"]
+            print(f"   {bs:>6} {b:>9.3f} {v:>9.3f} {b / v:>7.2f}x")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(doc, f, ensure_ascii=False, indent=2)
+        print(f"\n✅ {args.json} 저장")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
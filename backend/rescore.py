@@ -0,0 +1,424 @@
+#!/usr/bin/env python3
+# rescore.py
+"""
+모델/스케일러 교체 후 판별 이력 일괄 재채점
+  results 의 prediction/confidence/prob_* 를 새 모델로 다시 계산하고,
+  phone_reports 의 위험도를 서버 upsert_phone_report 와 같은 동적 α EMA (db.ema_risk) 로 다시 접는다.
+  - 특징: feature_store 의 (results.id → 행) 링크 우선, 없으면 --audio-dir/<filename> 을 프로세스 풀에서 재디코딩
+  - id 순 chunk 단위: 특징 모으기 → 배치 forward 한 번 → 값이 바뀐 행만 executemany UPDATE (chunk 당 트랜잭션 1개)
+  - chunk 를 커밋할 때마다 체크포인트(마지막 id) 저장 → --resume 으로 이어서
+  - 마지막에 번호별 위험도 재계산 (트랜잭션 1개) + 롤업 재구성
+
+번호 위험도는 report_count 가 results 행 수와 같은 번호(신고 이력이 전부 results 에 남은 번호)만 다시 접는다.
+피드 일괄 반영(upload_json.py)이나 같은 파일 재확정으로 results 에 없는 신고가 섞인 번호는 그대로 둔다 (--all-phones 로 강제).
+서버처럼 'real' 로 바뀐 행은 EMA 에 넣지 않고, report_count(신고 횟수)는 바꾸지 않는다.
+
+사용법:
+  python rescore.py                                  # feature_store 에 특징이 있는 결과만
+  python rescore.py --audio-dir uploads/ --workers 8 # 특징이 없으면 원본 오디오 재디코딩
+  python rescore.py --resume                         # 중단된 지점부터
+  python rescore.py --engine numpy --chunk 100000 --dry-run
+"""
+import argparse, json, os, sys, time
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import db
+from db import init_db, ema_risk, normalize_phone, _clamp, _utcnow_str
+
+# ======================
+# 설정 (server.py 와 같은 값)
+# ======================
+ROOT = os.path.dirname(os.path.abspath(__file__))
+MODEL_PATH  = os.path.join(ROOT, "best_asvspoof_model_cuda.pt")
+SCALER_PATH = os.path.join(ROOT, "scaler_asvspoof.pkl")
+NUMPY_MODEL_PATH  = os.environ.get("NUMPY_MODEL_PATH", os.path.join(ROOT, "model_folded.npz"))
+FEATURE_STORE_DIR = os.environ.get("FEATURE_STORE_DIR", os.path.join(ROOT, "feature_store"))
+
+TARGET_SR, N_MFCC = 16000, 13
+MIN_SECONDS, MAX_SECONDS = 0.3, 10.0
+CLASS_NAMES = ("real", "fake_2", "tts")
+
+RESCORE_CHUNK = int(os.environ.get("RESCORE_CHUNK", "50000"))          # chunk 당 행 수 (= 트랜잭션 크기)
+RESCORE_DECODE_BATCH = int(os.environ.get("RESCORE_DECODE_BATCH", "64"))  # 디코딩 작업 1개당 파일 수
+RESCORE_FORWARD_BATCH = int(os.environ.get("RESCORE_FORWARD_BATCH", "2048"))  # forward 1회 행 수 (캐시에 맞게)
+PROB_EPS = 1e-6                                                         # 이보다 작은 변화는 쓰지 않음
+
+
+# ======================
+# 모델
+# ======================
+def load_scorer(engine: str = "torch", precision: str = "fp32"):
+    """→ ((B, 13) 원시 MFCC → (B, 3) 확률 함수, 모델 버전 문자열). 서버와 같은 방식으로 로드"""
+    from numpy_engine import source_version
+    version = f"{source_version(MODEL_PATH, SCALER_PATH)}:{engine}:{precision}"
+    if engine == "numpy":
+        from numpy_engine import NumpyClassifier
+        if precision != "fp32":
+            raise ValueError("numpy engine runs fp32 only")
+        clf = NumpyClassifier.load(NUMPY_MODEL_PATH, expect_version=source_version(MODEL_PATH, SCALER_PATH))
+        return clf.predict_proba, version
+    if engine != "torch":
+        raise ValueError(f"Unknown engine: {engine} (torch|numpy)")
+
+    from export_numpy import load_torch
+    from quantize import prepare, predict_proba
+    model, scaler = load_torch()
+    model, used, info = prepare(model, scaler, precision)
+    if used != precision:
+        raise ValueError(f"precision {precision} failed its accuracy gate ({info.get('reason')})")
+
+    def score(x: np.ndarray) -> np.ndarray:
+        return predict_proba(model, used, scaler.transform(x))
+    return score, version
+
+
+# ======================
+# 특징 원천
+# ======================
+class StoreLinks:
+    """feature_store 의 links 를 id 순으로 정렬해 두고 chunk 단위로 한 번에 찾는다 (row_for_result 의 배치판)"""
+
+    def __init__(self, path: str):
+        from feature_store import FeatureStore
+        self.store = FeatureStore(path, dim=N_MFCC, readonly=True)
+        links = np.asarray(self.store.links())
+        # 결과 하나에 링크는 하나 (append 가 중복 링크를 만들지 않음)
+        order = np.argsort(links[:, 0], kind="stable")
+        self.ids, self.rows = links[order, 0], links[order, 1]
+
+    def __len__(self) -> int:
+        return int(self.ids.size)
+
+    def vectors(self, result_ids: np.ndarray):
+        """→ (찾은 위치 bool (n,), 해당 벡터 (찾은 수, 13))"""
+        if not self.ids.size:
+            return np.zeros(result_ids.size, dtype=bool), np.empty((0, N_MFCC), np.float32)
+        pos = np.searchsorted(self.ids, result_ids)
+        pos = np.minimum(pos, self.ids.size - 1)
+        found = self.ids[pos] == result_ids
+        rows = self.rows[pos[found]]
+        # memmap 을 정렬된 행 순서로 읽고(연속 접근) 원래 순서로 되돌림
+        order = np.argsort(rows, kind="stable")
+        out = np.empty((rows.size, N_MFCC), dtype=np.float32)
+        out[order] = self.store.vectors()[rows[order]]
+        return found, out
+
+
+_W = {}     # 디코딩 워커별 추출기 (spawn 으로 import 되므로 server.py 를 import 하지 않는다)
+
+
+def _init_decoder(use_vad: bool):
+    from features import MFCCExtractor
+    import audio_io, vad
+    _W.update(ex=MFCCExtractor(sr=TARGET_SR, n_mfcc=N_MFCC), audio_io=audio_io, vad=vad, use_vad=use_vad)
+
+
+def _decode_files(paths):
+    """파일 경로 목록 → (성공 bool (n,), MFCC (성공 수, 13)). 서버 extract_features 와 같은 계산"""
+    ok, signals = np.zeros(len(paths), dtype=bool), []
+    for i, path in enumerate(paths):
+        try:
+            with open(path, "rb") as f:
+                audio_bytes = f.read()
+            y = _W["audio_io"].decode_audio(audio_bytes, path, target_sr=TARGET_SR,
+                                            min_seconds=MIN_SECONDS, max_seconds=MAX_SECONDS)
+            if _W["use_vad"]:
+                y, _ = _W["vad"].trim(y, TARGET_SR)
+        except Exception:
+            continue
+        ok[i] = True
+        signals.append(y)
+    if not signals:
+        return ok, np.empty((0, N_MFCC), np.float32)
+    return ok, _W["ex"].transform_padded(signals, int(MAX_SECONDS * TARGET_SR))
+
+
+class AudioDecoder:
+    """--audio-dir/<results.filename> 을 프로세스 풀에서 파일 batch 단위로 디코딩 + MFCC"""
+
+    def __init__(self, audio_dir: str, workers: int, use_vad: bool = False, batch: int = RESCORE_DECODE_BATCH):
+        self.audio_dir = audio_dir
+        self.batch = max(1, int(batch))
+        self.executor = ProcessPoolExecutor(max_workers=max(1, int(workers)), mp_context=mp.get_context("spawn"),
+                                            initializer=_init_decoder, initargs=(use_vad,))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True, cancel_futures=True)
+
+    def vectors(self, filenames):
+        """→ (성공 bool (n,), MFCC (성공 수, 13)). 경로 밖으로 나가는 파일명은 실패로"""
+        paths = []
+        for name in filenames:
+            path = os.path.join(self.audio_dir, os.path.basename(name or ""))
+            paths.append(path if name and os.path.isfile(path) else None)
+        todo = [i for i, p in enumerate(paths) if p is not None]
+        ok = np.zeros(len(paths), dtype=bool)
+        tasks = [todo[s:s + self.batch] for s in range(0, len(todo), self.batch)]
+        parts = []
+        for idx, (task_ok, mfcc) in zip(tasks, self.executor.map(_decode_files, [[paths[i] for i in t] for t in tasks])):
+            ok[np.asarray(idx)[task_ok]] = True
+            parts.append(mfcc)
+        return ok, (np.concatenate(parts) if parts else np.empty((0, N_MFCC), np.float32))
+
+
+# ======================
+# 체크포인트
+# ======================
+def load_checkpoint(path: str):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_checkpoint(path: str, ck: dict):
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(ck, f, ensure_ascii=False, indent=1)
+    os.replace(tmp, path)
+
+
+# ======================
+# 1단계: results 재채점
+# ======================
+def _score_batched(score, x: np.ndarray) -> np.ndarray:
+    """chunk 전체를 한 번에 넣으면 중간 활성값이 캐시를 넘쳐 오히려 느림 → RESCORE_FORWARD_BATCH 씩"""
+    fb = max(1, RESCORE_FORWARD_BATCH)
+    return np.concatenate([np.asarray(score(x[s:s + fb]), dtype=np.float64) for s in range(0, x.shape[0], fb)])
+
+def _changed(old_labels: np.ndarray, old_probs: np.ndarray, labels, probs: np.ndarray) -> np.ndarray:
+    """(n,) bool — 예측 라벨이나 확률이 PROB_EPS 넘게 바뀐 행 (NULL 확률은 바뀐 것으로)"""
+    moved = np.abs(np.nan_to_num(old_probs, nan=-1.0) - probs).max(axis=1) > PROB_EPS
+    return moved | (old_labels != labels)
+
+def rescore_results(conn, score, ck: dict, ck_path: str, store=None, decoder=None,
+                    chunk: int = RESCORE_CHUNK, dry_run: bool = False, verbose: bool = True) -> dict:
+    """id > ck['last_id'] 인 results 를 chunk 씩 재채점하고 chunk 마다 커밋 + 체크포인트"""
+    st = ck["stats"]
+    cur = conn.cursor()
+    t0, done0 = time.perf_counter(), st["rows"]
+    while True:
+        rows = cur.execute("""
+            SELECT id, filename, prediction, prob_real, prob_fake2, prob_tts
+              FROM results WHERE id > ? ORDER BY id LIMIT ?
+        """, (ck["last_id"], chunk)).fetchall()
+        if not rows:
+            break
+        ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+        old_labels = np.array([r[2] for r in rows], dtype=object)
+        old_probs = np.array([r[3:6] for r in rows], dtype=np.float64)     # NULL → nan
+
+        x = np.empty((len(rows), N_MFCC), dtype=np.float32)
+        have = np.zeros(len(rows), dtype=bool)
+        if store is not None:
+            found, vecs = store.vectors(ids)
+            x[found], have = vecs, found
+            st["from_store"] += int(found.sum())
+        if decoder is not None and not have.all():
+            missing = np.flatnonzero(~have)
+            ok, vecs = decoder.vectors([rows[i][1] for i in missing])
+            x[missing[ok]] = vecs
+            have[missing[ok]] = True
+            st["from_audio"] += int(ok.sum())
+
+        if have.any():
+            probs = _score_batched(score, x[have])
+            idx = probs.argmax(axis=1)
+            labels = np.asarray(CLASS_NAMES, dtype=object)[idx]
+            conf = probs[np.arange(idx.size), idx]
+            sel = np.flatnonzero(have)
+            changed = _changed(old_labels[sel], old_probs[sel], labels, probs)
+            updates = [(str(labels[j]), float(conf[j]), float(probs[j, 0]), float(probs[j, 1]), float(probs[j, 2]),
+                        int(ids[sel[j]])) for j in np.flatnonzero(changed)]
+            st["changed_label"] += int((old_labels[sel] != labels).sum())
+        else:
+            updates = []
+
+        if updates and not dry_run:
+            cur.execute("BEGIN IMMEDIATE")
+            try:
+                cur.executemany("""
+                    UPDATE results
+                       SET prediction = ?, confidence = ?, prob_real = ?, prob_fake2 = ?, prob_tts = ?
+                     WHERE id = ?
+                """, updates)
+                cur.execute("COMMIT")
+            except Exception:
+                cur.execute("ROLLBACK")
+                raise
+        st["rows"] += len(rows)
+        st["scored"] += int(have.sum())
+        st["updated"] += len(updates)
+        st["skipped"] += int((~have).sum())
+        ck["last_id"] = int(ids[-1])
+        if not dry_run:
+            save_checkpoint(ck_path, ck)
+        if verbose:
+            el = time.perf_counter() - t0
+            print(f"  … id ≤ {ck['last_id']:,}: {st['rows']:,} rows, {st['updated']:,} updated, "
+                  f"{st['skipped']:,} without features ({(st['rows'] - done0) / el:,.0f} rows/s)", file=sys.stderr)
+    return st
+
+
+# ======================
+# 2단계: 번호 위험도 재계산
+# ======================
+def replay_phone_risk(conn, all_phones: bool = False, dry_run: bool = False) -> dict:
+    """
+    results 를 id 순으로 훑어 번호마다 ema_risk 를 다시 접고 phone_reports 에 반영.
+    읽기부터 쓰기까지 트랜잭션 하나 (서버의 새 신고가 그 사이에 끼어 덮이지 않게).
+    """
+    cur = conn.cursor()
+    out = {"phones": 0, "replayed": 0, "updated": 0, "kept": 0}
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        reports = {}        # 정규화 번호 → [(id, report_count, risk, last_conf, alpha)]
+        for row in cur.execute("SELECT id, phone_number, report_count, risk_score, last_confidence, ema_alpha FROM phone_reports"):
+            reports.setdefault(normalize_phone(row[1]) or row[1], []).append(row[:1] + row[2:])
+        out["phones"] = len(reports)
+
+        state, phones = {}, {}      # 번호 → [결과 행 수, risk, alpha, last_conf]
+        cur.execute("""
+            SELECT phone_number, prediction, confidence FROM results
+             WHERE phone_number IS NOT NULL AND phone_number != '' ORDER BY id
+        """)
+        while True:
+            batch = cur.fetchmany(65536)
+            if not batch:
+                break
+            for raw, pred, conf in batch:
+                phone = phones.get(raw)
+                if phone is None:
+                    phone = phones[raw] = normalize_phone(raw) or raw
+                s = state.get(phone)
+                if s is None:
+                    s = state[phone] = [0, None, None, None]
+                s[0] += 1
+                if pred is not None and str(pred).lower() != "real":
+                    c = _clamp(conf)
+                    s[1], s[2] = ema_risk(c, s[1])
+                    s[3] = c
+
+        now, updates = _utcnow_str(), []
+        for phone, rows in reports.items():
+            s = state.get(phone)
+            if s is None or len(rows) != 1 or (not all_phones and (rows[0][1] or 0) != s[0]):
+                out["kept"] += 1
+                continue
+            out["replayed"] += 1
+            rid, _, risk, last_conf, alpha = rows[0]
+            # 'real' 만 남은 번호: 위험도/마지막 신뢰도는 NULL, α 는 init_db 기본값 0.3
+            new = (s[1], s[3], 0.3 if s[2] is None else s[2])
+            if any((a is None) != (b is None) or (a is not None and abs(a - b) > PROB_EPS)
+                   for a, b in zip(new, (risk, last_conf, alpha))):
+                updates.append(new + (now, rid))
+        out["updated"] = len(updates)
+        if not dry_run:
+            cur.executemany("""
+                UPDATE phone_reports
+                   SET risk_score = ?, last_confidence = ?, ema_alpha = ?, updated_at = ?
+                 WHERE id = ?
+            """, updates)
+        cur.execute("ROLLBACK" if dry_run else "COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    return out
+
+
+# ======================
+# 실행부
+# ======================
+def main():
+    ap = argparse.ArgumentParser(description="Re-score stored results and phone risk with the current model")
+    ap.add_argument("--engine", choices=("torch", "numpy"), default=os.environ.get("INFERENCE_ENGINE", "torch").lower())
+    ap.add_argument("--precision", default="fp32", help="torch engine: fp32|int8|bf16|fp16 (must pass quantize gate)")
+    ap.add_argument("--feature-store", default=FEATURE_STORE_DIR, help='feature_store directory ("" = do not use)')
+    ap.add_argument("--audio-dir", default=None, help="re-decode <audio-dir>/<filename> when features are missing")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="decode processes for --audio-dir")
+    ap.add_argument("--vad", action="store_true", help="VAD-trim re-decoded audio (same as vad=1 uploads)")
+    ap.add_argument("--chunk", type=int, default=RESCORE_CHUNK, help="rows per batch / transaction")
+    ap.add_argument("--checkpoint", default=None, help="default: <DB_PATH>.rescore.json")
+    ap.add_argument("--resume", action="store_true", help="continue from the checkpoint")
+    ap.add_argument("--all-phones", action="store_true",
+                    help="also replay numbers whose report history is not fully in results")
+    ap.add_argument("--dry-run", action="store_true", help="score and count changes without writing")
+    ap.add_argument("--quiet", action="store_true")
+    args = ap.parse_args()
+
+    ck_path = args.checkpoint or db.DB_PATH + ".rescore.json"
+    try:
+        score, version = load_scorer(args.engine, args.precision.lower())
+    except (OSError, ValueError) as e:
+        print(f"❌ 모델 로드 실패: {e}")
+        sys.exit(1)
+
+    ck = load_checkpoint(ck_path) if args.resume else None
+    if ck is not None:
+        if ck.get("db") != os.path.abspath(db.DB_PATH) or ck.get("model") != version:
+            print(f"❌ 체크포인트가 다른 DB/모델용입니다 ({ck.get('db')}, {ck.get('model')}) → --resume 없이 다시 시작하세요")
+            sys.exit(1)
+        if ck["phase"] == "done":
+            print(f"✅ 이미 완료된 재채점입니다 ({ck_path})")
+            return
+        print(f"🔁 {ck_path} 에서 이어서: id > {ck['last_id']:,}, 단계 {ck['phase']}")
+    else:
+        ck = {"db": os.path.abspath(db.DB_PATH), "model": version, "phase": "results", "last_id": 0,
+              "started_at": _utcnow_str(),
+              "stats": dict.fromkeys(("rows", "scored", "updated", "skipped", "changed_label",
+                                      "from_store", "from_audio"), 0)}
+
+    store = None
+    if args.feature_store and os.path.exists(os.path.join(args.feature_store, "header.json")):
+        store = StoreLinks(args.feature_store)
+    if store is None and not args.audio_dir:
+        print("❌ 특징 원천이 없습니다 (feature_store 없음, --audio-dir 미지정)")
+        sys.exit(1)
+    if args.audio_dir and not os.path.isdir(args.audio_dir):
+        print(f"❌ 디렉터리를 찾을 수 없습니다: {args.audio_dir}")
+        sys.exit(1)
+
+    init_db()
+    conn = db._conn()
+    conn.execute("PRAGMA cache_size=-65536")     # 64 MiB
+    t0, rows0 = time.perf_counter(), ck["stats"]["rows"]
+    decoder = AudioDecoder(args.audio_dir, args.workers, args.vad) if args.audio_dir else None
+    try:
+        if ck["phase"] == "results":
+            if not args.quiet:
+                src = [f"feature_store {len(store):,} links" if store else "", f"audio {args.audio_dir}" if decoder else ""]
+                print(f"🔎 {db.DB_PATH}  model {version}  ({', '.join(s for s in src if s)})")
+            rescore_results(conn, score, ck, ck_path, store, decoder, max(1, args.chunk), args.dry_run, not args.quiet)
+            ck["phase"] = "phones"
+            if not args.dry_run:
+                save_checkpoint(ck_path, ck)
+    finally:
+        if decoder is not None:
+            decoder.shutdown()
+    t_results = time.perf_counter() - t0
+
+    phones = replay_phone_risk(conn, args.all_phones, args.dry_run)
+    if not args.dry_run:
+        rollups = db.rebuild_rollups()
+        ck.update(phase="done", phones=phones, finished_at=_utcnow_str())
+        save_checkpoint(ck_path, ck)
+    conn.close()
+
+    st, el = ck["stats"], time.perf_counter() - t0
+    note = " (dry-run: 쓰지 않음)" if args.dry_run else ""
+    print(f"✅ results {st['rows']:,}행 재채점{note}: 변경 {st['updated']:,} (라벨 변경 {st['changed_label']:,}), "
+          f"특징 없음 {st['skipped']:,} (store {st['from_store']:,} / audio {st['from_audio']:,})")
+    print(f"   번호 {phones['phones']:,}개 중 {phones['replayed']:,}개 위험도 재계산, {phones['updated']:,}개 변경, "
+          f"{phones['kept']:,}개 유지 (results 밖 신고 이력)")
+    if not args.dry_run:
+        print(f"   롤업 {rollups:,}건 재구성 → {db.DB_PATH}")
+    print(f"   {el:.2f}s, results {(st['rows'] - rows0) / max(t_results, 1e-9):,.0f} rows/s (이번 실행)")
+    if st["skipped"]:
+        print("⚠️ 특징/원본을 찾지 못한 행은 이전 값 그대로입니다")
+
+
+if __name__ == "__main__":
+    main()
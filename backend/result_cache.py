@@ -0,0 +1,147 @@
+# result_cache.py
+import hashlib, json, sqlite3, threading, time
+from collections import OrderedDict
+
+
+# ======================
+# 판별 결과 캐시 (메모리 LRU + SQLite)
+# ======================
+def content_key(audio_bytes: bytes, extra: str = "") -> str:
+    """업로드 바이트의 sha256 (+ 요청 옵션) → 캐시 키"""
+    h = hashlib.sha256(audio_bytes)
+    if extra:
+        h.update(b"\0" + extra.encode("utf-8"))
+    return h.hexdigest()
+
+
+class ResultCache:
+    """
+    같은 오디오 바이트 → 같은 판별 결과를 재사용.
+      - 1단계: 프로세스 메모리 LRU (max_entries)
+      - 2단계: SQLite 파일 (max_disk_entries, 재시작 후에도 유지)
+    version 은 호출자가 로드한 모델/스케일러의 버전 (고정). 디스크 항목은 버전과 함께 저장되고,
+    다른 버전으로 계산된 항목은 시작할 때 지운다 — 파일이 바뀌어도 메모리의 모델이 그대로면 버전도 그대로.
+    """
+
+    def __init__(self, db_path: str, version: str, max_entries: int = 4096, max_disk_entries: int = 100_000):
+        self.db_path = db_path
+        self.version = str(version)
+        self.max_entries = max(0, int(max_entries))
+        self.max_disk_entries = max(0, int(max_disk_entries))
+
+        self._lock = threading.Lock()
+        self._lru: "OrderedDict[str, dict]" = OrderedDict()
+        self._local = threading.local()
+        self._puts_since_trim = 0
+        self.counters = {
+            "hits_memory": 0,
+            "hits_disk": 0,
+            "misses": 0,
+            "puts": 0,
+            "evictions_memory": 0,
+            "evictions_disk": 0,
+        }
+
+        if self.max_disk_entries:
+            self._init_db()
+            # 다른 버전으로 계산된 영구 항목 정리
+            self._db().execute("DELETE FROM result_cache WHERE version != ?", (self.version,))
+
+    # ---------- SQLite ----------
+    def _db(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=NORMAL;")
+            conn.execute("PRAGMA busy_timeout=10000;")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        self._db().execute("""
+        CREATE TABLE IF NOT EXISTS result_cache (
+            key        TEXT PRIMARY KEY,
+            version    TEXT NOT NULL,
+            payload    TEXT NOT NULL,
+            last_used  REAL NOT NULL
+        )
+        """)
+        self._db().execute("CREATE INDEX IF NOT EXISTS idx_result_cache_last_used ON result_cache(last_used)")
+
+    def _trim_disk(self):
+        conn = self._db()
+        n = conn.execute("SELECT COUNT(*) FROM result_cache").fetchone()[0]
+        over = n - self.max_disk_entries
+        if over > 0:
+            conn.execute("""
+                DELETE FROM result_cache WHERE key IN (
+                    SELECT key FROM result_cache ORDER BY last_used LIMIT ?
+                )
+            """, (over,))
+            with self._lock:
+                self.counters["evictions_disk"] += over
+
+    # ---------- 공개 API ----------
+    def get(self, key: str):
+        """캐시된 결과 dict 또는 None"""
+        if not (self.max_entries or self.max_disk_entries):
+            return None
+        with self._lock:
+            hit = self._lru.get(key)
+            if hit is not None:
+                self._lru.move_to_end(key)
+                self.counters["hits_memory"] += 1
+                return hit
+        if self.max_disk_entries:
+            row = self._db().execute(
+                "SELECT payload FROM result_cache WHERE key = ? AND version = ?", (key, self.version)
+            ).fetchone()
+            if row:
+                value = json.loads(row[0])
+                self._db().execute("UPDATE result_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+                with self._lock:
+                    self.counters["hits_disk"] += 1
+                self._put_memory(key, value)
+                return value
+        with self._lock:
+            self.counters["misses"] += 1
+        return None
+
+    def put(self, key: str, value: dict):
+        if not (self.max_entries or self.max_disk_entries):
+            return
+        self._put_memory(key, value)
+        with self._lock:
+            self.counters["puts"] += 1
+        if self.max_disk_entries:
+            self._db().execute("""
+                INSERT INTO result_cache (key, version, payload, last_used) VALUES (?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    version = excluded.version, payload = excluded.payload, last_used = excluded.last_used
+            """, (key, self.version, json.dumps(value), time.time()))
+            self._puts_since_trim += 1
+            if self._puts_since_trim >= 256:
+                self._puts_since_trim = 0
+                self._trim_disk()
+
+    def _put_memory(self, key: str, value: dict):
+        if not self.max_entries:
+            return
+        with self._lock:
+            self._lru[key] = value
+            self._lru.move_to_end(key)
+            while len(self._lru) > self.max_entries:
+                self._lru.popitem(last=False)
+                self.counters["evictions_memory"] += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            s = dict(self.counters)
+            s["memory_entries"] = len(self._lru)
+            s["max_entries"] = self.max_entries
+            s["max_disk_entries"] = self.max_disk_entries
+            s["version"] = self.version
+        lookups = s["hits_memory"] + s["hits_disk"] + s["misses"]
+        s["hit_ratio"] = (s["hits_memory"] + s["hits_disk"]) / lookups if lookups else 0.0
+        return s
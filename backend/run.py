@@ -1,13 +1,20 @@
 #!/usr/bin/env python3
 """
-서버 실행 스크립트
+서버 실행 스크립트 (ASGI: app/main.py)
+  HOST / PORT / WEB_CONCURRENCY(워커 프로세스 수) / RELOAD=1(개발용)
 """
+import os
+
 import uvicorn
 
 if __name__ == "__main__":
     uvicorn.run(
         "app.main:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True
+        app_dir=os.path.dirname(os.path.abspath(__file__)),
+        host=os.environ.get("HOST", "0.0.0.0"),
+        port=int(os.environ.get("PORT", "8000")),
+        workers=int(os.environ.get("WEB_CONCURRENCY", "1")),
+        reload=os.environ.get("RELOAD") == "1",
+        backlog=int(os.environ.get("BACKLOG", "4096")),
+        timeout_keep_alive=int(os.environ.get("KEEP_ALIVE_S", "30")),
     )
@@ -1,338 +1,562 @@
 # server.py
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import torch, joblib, numpy as np, io, os, traceback, json, sqlite3
-import soundfile as sf
-import librosa
-from datetime import datetime, timezone
+from werkzeug.exceptions import RequestEntityTooLarge
+import numpy as np, io, os, re, traceback, json, zipfile, tarfile, functools
+from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+
+import metrics, vad, jobs
+from admission import Admission, Overloaded
+from feature_store import FeatureStore, FeatureWriter
+from batcher import MicroBatcher
+from db import DB_PATH, init_db, get_writer, save_confirmed_result, save_results_batch, get_stats, top_numbers, TOP_ORDER
+from db import ROLLUP_BUCKETS, detection_series, detections_by_phone
+from streaming import StreamSessions, run_stream_session
+from result_cache import ResultCache, content_key
+from phone_pool import PhonePool
+from phone_index import PhoneIndex
+from features import MFCCExtractor
+from extract_pool import ExtractPool, ExtractQueueFull
+from audio_io import ALLOWED_EXT, read_upload_prefix, decode_audio as _decode_audio
+
+try:
+    from flask_sock import Sock        # 선택: 실시간 스트리밍(WebSocket)
+    from simple_websocket import ConnectionClosed
+except ImportError:
+    Sock = None
+    ConnectionClosed = None
 
 # ======================
 # 설정
 # ====================== 
-ALLOWED_EXT = {".wav", ".mp3"}
 TARGET_SR = 16000
 N_MFCC = 13
+MIN_SECONDS = 0.3    # 이보다 짧으면 거부
+MAX_SECONDS = 10.0   # 모델 입력 길이 (초과분은 자르고, 부족분은 0-패딩으로 간주)
+
+# 업로드 크기 상한 (수신 중에 검사, 초과 시 413). 실제로는 앞 MAX_SECONDS 분량만 읽는다
+MAX_UPLOAD_BYTES      = int(os.environ.get("MAX_UPLOAD_BYTES", str(200 * 1024 * 1024)))
+BULK_MAX_UPLOAD_BYTES = int(os.environ.get("BULK_MAX_UPLOAD_BYTES", str(2 * 1024 * 1024 * 1024)))
+
+# 추론 엔진: "torch" (기본) | "numpy" (export_numpy.py 로 만든 .npz, torch 불필요)
+INFERENCE_ENGINE = os.environ.get("INFERENCE_ENGINE", "torch").lower()
+MODEL_PRECISION  = os.environ.get("MODEL_PRECISION", "fp32").lower()   # torch 엔진: fp32|int8|bf16|fp16
+
+# 마이크로 배칭 (동시 요청을 모아 1회 forward)
+BATCH_MAX_SIZE   = int(os.environ.get("BATCH_MAX_SIZE", "32"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "2"))
+
+# 디코딩 + MFCC 프로세스 풀 (0 = 요청 스레드에서 직접 실행)
+EXTRACT_WORKERS         = int(os.environ.get("EXTRACT_WORKERS", "0"))
+EXTRACT_QUEUE_DEPTH     = int(os.environ.get("EXTRACT_QUEUE_DEPTH", "0"))      # 진행 중 작업 상한 (0 = 4 × workers)
+EXTRACT_QUEUE_TIMEOUT_S = float(os.environ.get("EXTRACT_QUEUE_TIMEOUT_S", "5"))
+
+# MFCC 전 무음/잡음 구간 제거 (vad.py). 요청별 vad=0/1 이 우선, 없으면 이 기본값
+VAD_DEFAULT = os.environ.get("VAD_DEFAULT", "0") == "1"
+
+# /predict/batch (다건 업로드)
+BULK_MAX_FILES      = int(os.environ.get("BULK_MAX_FILES", "512"))
+BULK_DECODE_WORKERS = int(os.environ.get("BULK_DECODE_WORKERS", str(os.cpu_count() or 4)))
+ARCHIVE_EXT = (".zip", ".tar", ".tar.gz", ".tgz")
+
+# /stream (WebSocket, 16kHz PCM16 mono 청크)
+STREAM_EMIT_MS      = float(os.environ.get("STREAM_EMIT_MS", "500"))
+STREAM_MAX_SESSIONS = int(os.environ.get("STREAM_MAX_SESSIONS", "256"))
 
 app = Flask(__name__)
+app.config["MAX_CONTENT_LENGTH"] = MAX_UPLOAD_BYTES
 CORS(app)
+sock = Sock(app) if Sock else None
 
-device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-3
 # ======================
 # 경로
 # ======================
 ROOT = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH  = os.path.join(ROOT, "best_asvspoof_model_cuda.pt")
 SCALER_PATH = os.path.join(ROOT, "scaler_asvspoof.pkl")
-DB_PATH     = os.path.join(ROOT, "deepfake.db")
+NUMPY_MODEL_PATH = os.environ.get("NUMPY_MODEL_PATH", os.path.join(ROOT, "model_folded.npz"))
+
+# 판별 결과 캐시 (업로드 바이트 해시 → 결과)
+RESULT_CACHE_PATH      = os.environ.get("RESULT_CACHE_PATH", os.path.join(ROOT, "result_cache.db"))
+RESULT_CACHE_SIZE      = int(os.environ.get("RESULT_CACHE_SIZE", "4096"))      # 메모리 LRU 항목 수 (0=끔)
+RESULT_CACHE_DISK_SIZE = int(os.environ.get("RESULT_CACHE_DISK_SIZE", "100000"))  # SQLite 항목 수 (0=끔)
 
 # 시연용 번호 풀(순환)
 PHONE_POOL_PATH   = os.path.join(ROOT, "data.json")
-PHONE_CURSOR_PATH = os.path.join(ROOT, "phone_cursor.txt")
+PHONE_CURSOR_PATH = os.path.join(ROOT, "phone_cursor.txt")   # 이전 커서 파일 (최초 이관용)
+PHONE_POOL_BLOCK  = int(os.environ.get("PHONE_POOL_BLOCK", "16"))  # 프로세스별 예약 단위
 
-# ======================
-# 모델 정의
-# ======================
-class SEBlock(torch.nn.Module):
-    def __init__(self, channels, reduction=8):
-        super().__init__()
-        self.fc1 = torch.nn.Linear(channels, channels // reduction)
-        self.fc2 = torch.nn.Linear(channels // reduction, channels)
-    def forward(self, x):
-        y = torch.relu(self.fc1(x))
-        y = torch.sigmoid(self.fc2(y))
-        return x * y
-
-class AttentionAudioClassifier(torch.nn.Module):
-    def __init__(self, input_dim, num_classes=3):
-        super().__init__()
-        self.fc1 = torch.nn.Sequential(
-            torch.nn.Linear(input_dim, 512),
-            torch.nn.BatchNorm1d(512),
-            torch.nn.ReLU(),
-            torch.nn.Dropout(0.4),
-        )
-        self.se1 = SEBlock(512)
-        self.fc2 = torch.nn.Sequential(
-            torch.nn.Linear(512, 384),
-            torch.nn.BatchNorm1d(384),
-            torch.nn.ReLU(),
-            torch.nn.Dropout(0.35),
-        )
-        self.se2 = SEBlock(384)
-        self.fc3 = torch.nn.Sequential(
-            torch.nn.Linear(384, 256),
-            torch.nn.BatchNorm1d(256),
-            torch.nn.ReLU(),
-            torch.nn.Dropout(0.3),
-        )
-        self.se3 = SEBlock(256)
-        self.classifier = torch.nn.Sequential(
-            torch.nn.Linear(256, 128),
-            torch.nn.BatchNorm1d(128),
-            torch.nn.ReLU(),
-            torch.nn.Dropout(0.3),
-            torch.nn.Linear(128, num_classes),
-        )
-    def forward(self, x):
-        x = self.fc1(x); x = self.se1(x)
-        x = self.fc2(x); x = self.se2(x)
-        x = self.fc3(x); x = self.se3(x)
-        return self.classifier(x)
+# 번호 위험도 조회 (메모리 인덱스)
+PHONE_LOOKUP_MAX       = int(os.environ.get("PHONE_LOOKUP_MAX", "10000"))    # POST /phone/lookup 1회 최대 번호 수
+PHONE_INDEX_REFRESH_S  = float(os.environ.get("PHONE_INDEX_REFRESH_S", "5"))  # 다른 프로세스 쓰기 반영 주기 (0=끔)
+STATS_TOP_MAX          = int(os.environ.get("STATS_TOP_MAX", "100"))          # GET /stats?top= 최대
+DETECTIONS_MAX_DAYS    = int(os.environ.get("DETECTIONS_MAX_DAYS", "366"))    # GET /detections 조회 범위 최대
+
+# 처리한 업로드의 MFCC 저장소 (feature_store.py) — 빈 문자열이면 끔, FRAMES=1 이면 프레임별 MFCC 도 (백그라운드 재디코딩)
+FEATURE_STORE_DIR    = os.environ.get("FEATURE_STORE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "feature_store"))
+FEATURE_STORE_FRAMES = os.environ.get("FEATURE_STORE_FRAMES", "0") == "1"
+FEATURE_STORE_QUEUE  = int(os.environ.get("FEATURE_STORE_QUEUE", "1024"))
+
+# 비동기 작업 큐 (jobs.py) — 이 프로세스에서 돌릴 워커 스레드 수 (0 = 별도 `python jobs.py worker` 만 사용)
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "1"))
 
 # ======================
 # 모델/스케일러 로드
 # ======================
-model = AttentionAudioClassifier(input_dim=N_MFCC, num_classes=3).to(device)
-model.load_state_dict(torch.load(MODEL_PATH, map_location=device))
-model.eval()
-scaler = joblib.load(SCALER_PATH)
 class_names = ["real", "fake_2", "tts"]
 
-# ======================
-# DB 유틸/마이그레이션
-# ======================
-def _utcnow_str():
-    return datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
-
-def _clamp(v: float, lo: float = 0.0, hi: float = 1.0) -> float:
-    try:
-        v = float(v)
-    except Exception:
-        v = lo
-    return max(lo, min(hi, v))
-
-def _conn():
-    # WAL + busy_timeout으로 "database is locked" 완화
-    conn = sqlite3.connect(DB_PATH, timeout=10, isolation_level=None)  # autocommit
-    cur = conn.cursor()
-    cur.execute("PRAGMA journal_mode=WAL;")
-    cur.execute("PRAGMA synchronous=NORMAL;")
-    cur.execute("PRAGMA busy_timeout=10000;")
-    cur.execute("PRAGMA foreign_keys=ON;")
-    return conn
-
-def _table_columns(cur, table):
-    cur.execute(f"PRAGMA table_info({table})")
-    return [r[1] for r in cur.fetchall()]
-
-def init_db():
-    """테이블 생성 + 스키마 자동 업그레이드"""
-    conn = _conn()
-    cur = conn.cursor()
-
-    # results: 파일별 최신 판별 + 연결된 전화번호(선택)
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS results (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp    TEXT NOT NULL,
-        filename     TEXT,
-        prediction   TEXT,
-        confidence   REAL,
-        prob_real    REAL,
-        prob_fake2   REAL,
-        prob_tts     REAL,
-        phone_number TEXT
-    )
-    """)
-    cols = _table_columns(cur, "results")
-    if "phone_number" not in cols:
-        cur.execute("ALTER TABLE results ADD COLUMN phone_number TEXT")
-    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_results_filename ON results(filename)")
-
-    # phone_reports: 번호별 누적
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS phone_reports (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        phone_number    TEXT UNIQUE,
-        report_count    INTEGER DEFAULT 0,
-        last_confidence REAL,
-        risk_score      REAL,
-        ema_alpha       REAL,
-        updated_at      TEXT,
-        created_at      TEXT
-    )
-    """)
-    cols = _table_columns(cur, "phone_reports")
-    if "report_count" not in cols:
-        cur.execute("ALTER TABLE phone_reports ADD COLUMN report_count INTEGER DEFAULT 0")
-    if "last_confidence" not in cols:
-        cur.execute("ALTER TABLE phone_reports ADD COLUMN last_confidence REAL")
-    if "risk_score" not in cols:
-        cur.execute("ALTER TABLE phone_reports ADD COLUMN risk_score REAL")
-    if "ema_alpha" not in cols:
-        cur.execute("ALTER TABLE phone_reports ADD COLUMN ema_alpha REAL")
-    if "updated_at" not in cols:
-        cur.execute("ALTER TABLE phone_reports ADD COLUMN updated_at TEXT")
-    if "created_at" not in cols:
-        cur.execute("ALTER TABLE phone_reports ADD COLUMN created_at TEXT")
-
-    now = _utcnow_str()
-    cur.execute("UPDATE phone_reports SET report_count = COALESCE(report_count, 0)")
-    cur.execute("UPDATE phone_reports SET ema_alpha   = COALESCE(ema_alpha, 0.3)")
-    cur.execute("UPDATE phone_reports SET updated_at  = COALESCE(updated_at, ?)", (now,))
-    cur.execute("UPDATE phone_reports SET created_at  = COALESCE(created_at, ?)", (now,))
-
-    conn.commit()
-    conn.close()
-
-def save_result(filename: str, pred_label: str, conf: float, probs_np, phone_number: str | None):
-    """results에 upsert(파일당 1행)하고 row id 반환"""
-    ts = _utcnow_str()
-    prob_real, prob_fake2, prob_tts = float(probs_np[0]), float(probs_np[1]), float(probs_np[2])
-
-    conn = _conn()
-    cur = conn.cursor()
-    cur.execute("""
-        INSERT INTO results (timestamp, filename, prediction, confidence, prob_real, prob_fake2, prob_tts, phone_number)
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ON CONFLICT(filename) DO UPDATE SET
-            timestamp    = excluded.timestamp,
-            prediction   = excluded.prediction,
-            confidence   = excluded.confidence,
-            prob_real    = excluded.prob_real,
-            prob_fake2   = excluded.prob_fake2,
-            prob_tts     = excluded.prob_tts,
-            phone_number = excluded.phone_number
-    """, (ts, filename, pred_label, conf, prob_real, prob_fake2, prob_tts, phone_number))
-    cur.execute("SELECT id FROM results WHERE filename = ?", (filename,))
-    row = cur.fetchone()
-    rowid = row[0] if row else None
-    conn.commit()
-    conn.close()
-    return rowid
-
-def upsert_phone_report(phone_number: str, confidence: float):
-    """
-    EMA + 동적 α 로 위험도 갱신:
-      alpha = 0.3 + 0.7*(confidence - 0.5)  → 0~1로 클램프
-      old_risk 없으면 conf로 초기화
-      risk_new = alpha*conf + (1-alpha)*old_risk
-    """
-    now = _utcnow_str()
-    conf = _clamp(confidence)
-
-    conn = _conn()
-    cur  = conn.cursor()
-    cur.execute("""
-        SELECT id, report_count, risk_score
-          FROM phone_reports
-         WHERE phone_number = ?
-    """, (phone_number,))
-    row = cur.fetchone()
-
-    # 동적 alpha (신뢰도 높을수록 더 빠르게 반영)
-    alpha = _clamp(0.3 + 0.7 * (conf - 0.5))
-
-    if row:
-        _id, count, old_risk = row[0], (row[1] or 0), row[2]
-        base = conf if old_risk is None else float(old_risk)
-        new_risk = _clamp(alpha * conf + (1.0 - alpha) * base)
-        cur.execute("""
-            UPDATE phone_reports
-               SET report_count    = ?,
-                   last_confidence = ?,
-                   risk_score      = ?,
-                   ema_alpha       = ?,
-                   updated_at      = ?
-             WHERE id = ?
-        """, (count + 1, conf, new_risk, alpha, now, _id))
-    else:
-        # 최초 행: risk = conf 시작
-        new_risk = conf
-        cur.execute("""
-            INSERT INTO phone_reports
-                (phone_number, report_count, last_confidence, risk_score, ema_alpha, updated_at, created_at)
-            VALUES
-                (?,            1,           ?,               ?,          ?,         ?,          ?)
-        """, (phone_number, conf, new_risk, alpha, now, now))
-
-    conn.commit()
-    conn.close()
+if INFERENCE_ENGINE == "numpy":
+    # 스케일러/BatchNorm 이 접힌 가중치로 NumPy matmul 만 수행 (torch/sklearn import 없음)
+    from numpy_engine import NumpyClassifier, source_version
+    engine = NumpyClassifier.load(NUMPY_MODEL_PATH, expect_version=source_version(MODEL_PATH, SCALER_PATH))
+    model_version = engine.version      # 로드한 npz 가 접힌 원본의 버전
+    model_precision = "fp32"
+    precision_report = {"requested": MODEL_PRECISION, "enabled": MODEL_PRECISION == "fp32",
+                        "reason": "numpy engine runs fp32 only"}
+    if MODEL_PRECISION != "fp32":
+        print(f"⚠️ MODEL_PRECISION={MODEL_PRECISION} 는 torch 엔진 전용 → fp32")
+
+    def _forward_batch(mfcc_batch: np.ndarray) -> np.ndarray:
+        """(B, N_MFCC) MFCC → (B, 3) softmax 확률 (스케일러 포함)"""
+        with metrics.stage("forward"):
+            return engine.predict_proba(mfcc_batch)
+
+elif INFERENCE_ENGINE == "torch":
+    import torch, joblib
+    from model import AttentionAudioClassifier
+    from numpy_engine import bytes_version
+
+    # 파일은 한 번만 읽고, 로드한 바이트로 버전을 매긴다 (실행 중 파일이 바뀌어도 캐시 버전 = 메모리의 모델)
+    with open(MODEL_PATH, "rb") as f:
+        model_bytes = f.read()
+    with open(SCALER_PATH, "rb") as f:
+        scaler_bytes = f.read()
+    model_version = bytes_version(model_bytes, scaler_bytes)
+
+    device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+    model = AttentionAudioClassifier(input_dim=N_MFCC, num_classes=3).to(device)
+    model.load_state_dict(torch.load(io.BytesIO(model_bytes), map_location=device))
+    model.eval()
+    scaler = joblib.load(io.BytesIO(scaler_bytes))
+    del model_bytes, scaler_bytes
+
+    # MODEL_PRECISION=int8|bf16|fp16: fp32 대비 정확도 게이트를 통과해야 사용 (quantize.py)
+    from quantize import prepare as prepare_precision, input_dtype
+    model, model_precision, precision_report = prepare_precision(model, scaler, MODEL_PRECISION, device=device)
+    if model_precision != MODEL_PRECISION:
+        print(f"⚠️ MODEL_PRECISION={MODEL_PRECISION} 사용 안 함 → fp32 ({precision_report.get('reason')})")
+    x_dtype = input_dtype(model_precision)
+
+    def _forward_batch(mfcc_batch: np.ndarray) -> np.ndarray:
+        """(B, N_MFCC) MFCC → (B, 3) softmax 확률. 스케일링도 배치 단위로 1회"""
+        with metrics.stage("scaler"):
+            x = torch.from_numpy(scaler.transform(mfcc_batch)).to(device=device, dtype=x_dtype)
+        with metrics.stage("forward"), torch.no_grad():
+            probs = torch.softmax(model(x).float(), dim=1)
+            return probs.cpu().numpy()
+
+else:
+    raise ValueError(f"Unknown INFERENCE_ENGINE: {INFERENCE_ENGINE} (torch|numpy)")
+
+batcher = MicroBatcher(_forward_batch, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+
+# 캐시 버전 = 이 프로세스가 로드한 모델/스케일러 (파일을 바꾸면 재시작 후 새 버전, 이전 항목은 정리됨)
+result_cache = ResultCache(
+    RESULT_CACHE_PATH, model_version,
+    max_entries=RESULT_CACHE_SIZE, max_disk_entries=RESULT_CACHE_DISK_SIZE,
+)
 
 # ======================
 # 번호 풀 (data.json) 순환 – 시연용
 # ======================
-def _load_phone_pool():
-    try:
-        with open(PHONE_POOL_PATH, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        pool = []
-        for item in data:
-            if isinstance(item, str):
-                pool.append(item.strip())
-            elif isinstance(item, dict) and "phone_number" in item:
-                pool.append(str(item["phone_number"]).strip())
-        return [p for p in pool if p]
-    except Exception:
-        return []
-
-def _read_cursor(max_len: int) -> int:
-    try:
-        with open(PHONE_CURSOR_PATH, "r", encoding="utf-8") as f:
-            v = int(f.read().strip())
-            return v if 0 <= v < max_len else 0
-    except Exception:
-        return 0
-
-def _write_cursor(v: int):
-    try:
-        with open(PHONE_CURSOR_PATH, "w", encoding="utf-8") as f:
-            f.write(str(v))
-    except Exception:
-        pass
+phone_pool = PhonePool(PHONE_POOL_PATH, legacy_cursor_path=PHONE_CURSOR_PATH, block=PHONE_POOL_BLOCK)
 
 def get_next_phone_number():
-    pool = _load_phone_pool()
-    if not pool:
-        return None
-    idx = _read_cursor(len(pool))
-    number = pool[idx]
-    _write_cursor((idx + 1) % len(pool))
-    return number
+    return phone_pool.next()
+
+# 조회는 메모리에서만, 쓰기는 커밋 직후 write-through (phone_index.py)
+phone_index = PhoneIndex(refresh_s=PHONE_INDEX_REFRESH_S)
 
 # ======================
 # 오디오 유틸
 # ======================
+def decode_audio(audio_bytes: bytes, filename: str, target_sr=TARGET_SR) -> np.ndarray:
+    """디코딩 + 모노 + 리샘플 + 10초 자르기 (0-패딩은 하지 않음, audio_io.decode_audio)"""
+    return _decode_audio(audio_bytes, filename, target_sr=target_sr,
+                         min_seconds=MIN_SECONDS, max_seconds=MAX_SECONDS)
+
 def load_audio_wav_or_mp3(audio_bytes: bytes, filename: str, target_sr=TARGET_SR) -> np.ndarray:
-    ext = os.path.splitext(filename.lower())[1]
-    if ext not in ALLOWED_EXT:
-        raise ValueError(f"Only WAV/MP3 allowed, got: {ext}")
+    y = decode_audio(audio_bytes, filename, target_sr=target_sr)
+    max_len = int(MAX_SECONDS * target_sr)
+    return np.pad(y, (0, max_len - y.size))
+
+# 창/mel 필터뱅크/DCT 행렬은 한 번만 생성 (librosa.feature.mfcc 와 수치 동일, features.py 참고)
+mfcc_extractor = MFCCExtractor(sr=TARGET_SR, n_mfcc=N_MFCC)
+
+def vad_trim(y: np.ndarray, sr=TARGET_SR):
+    """무음/잡음 프레임 제거 → (파형, 잘라낸 비율)"""
+    with metrics.stage("vad"):
+        return vad.trim(y, sr)
+
+def extract_features(audio_bytes: bytes, filename: str, use_vad: bool = False, sr=TARGET_SR, n_mfcc=N_MFCC):
+    """
+    10초 0-패딩 파형의 프레임 평균 MFCC → (MFCC, VAD 로 잘라낸 비율 또는 None).
+    패딩 구간은 STFT 하지 않고 해석적으로 더한다 (MFCCExtractor.transform_padded).
+    use_vad 면 음성 프레임만 남긴 뒤 계산하므로 STFT 할 프레임도 그만큼 준다.
+    """
+    y = decode_audio(audio_bytes, filename, target_sr=sr)
+    trimmed = None
+    if use_vad:
+        y, trimmed = vad_trim(y, sr)
+    ex = mfcc_extractor if (sr, n_mfcc) == (mfcc_extractor.sr, mfcc_extractor.n_mfcc) else MFCCExtractor(sr=sr, n_mfcc=n_mfcc)
+    with metrics.stage("mfcc"):
+        return ex.transform_padded([y], int(MAX_SECONDS * sr))[0], trimmed
+
+def extract_mfcc_from_bytes(audio_bytes: bytes, filename: str, sr=TARGET_SR, n_mfcc=N_MFCC) -> np.ndarray:
+    return extract_features(audio_bytes, filename, sr=sr, n_mfcc=n_mfcc)[0]
+
+def _feature_frames(audio_bytes: bytes, filename: str, use_vad: bool) -> np.ndarray:
+    """특징 저장소용 프레임별 MFCC (T, n_mfcc) — feature-writer 스레드에서 다시 디코딩"""
+    y = decode_audio(audio_bytes, filename)
+    if use_vad:
+        y, _ = vad.trim(y, TARGET_SR)
+    return mfcc_extractor.frames_mfcc(y).T
+
+feature_writer = FeatureWriter(
+    FeatureStore(FEATURE_STORE_DIR, dim=N_MFCC), max_queue=FEATURE_STORE_QUEUE,
+    frames_fn=_feature_frames if FEATURE_STORE_FRAMES else None,
+) if FEATURE_STORE_DIR else None
+
+def record_features(feature_key: str, mfcc=None, result_id=None, source=None):
+    """새로 계산한 MFCC 저장 / 확정 저장된 results.id 연결 (큐에만 넣음, 가득 차면 버림)"""
+    if feature_writer is not None and (mfcc is not None or result_id is not None):
+        feature_writer.submit(feature_key, mfcc, result_id, source)
+
+# 워커는 __main__ 에서 부팅 시 예열, 그 외(WSGI 등)에는 첫 요청에서 시작
+extract_pool = ExtractPool(
+    EXTRACT_WORKERS, extract_features, sr=TARGET_SR, n_mfcc=N_MFCC,
+    min_seconds=MIN_SECONDS, max_seconds=MAX_SECONDS,
+    queue_depth=EXTRACT_QUEUE_DEPTH, queue_timeout=EXTRACT_QUEUE_TIMEOUT_S,
+)
+
+def _unpack_archive(archive_bytes: bytes, filename: str):
+    """
+    zip/tar 아카이브 → [(member_name, bytes), ...] (디렉터리 제외, 아카이브 순서 유지)
+    각 멤버도 디코딩에 필요한 앞부분만 읽는다.
+    """
+    out = []
+    if filename.lower().endswith(".zip"):
+        with zipfile.ZipFile(io.BytesIO(archive_bytes)) as zf:
+            for info in zf.infolist():
+                if info.is_dir():
+                    continue
+                if len(out) >= BULK_MAX_FILES:
+                    raise ValueError(f"Too many files in archive (max {BULK_MAX_FILES})")
+                with zf.open(info) as member:
+                    out.append((info.filename, read_upload_prefix(member, info.filename, MAX_SECONDS)))
+    else:
+        with tarfile.open(fileobj=io.BytesIO(archive_bytes), mode="r:*") as tf:
+            for member in tf:
+                if not member.isfile():
+                    continue
+                if len(out) >= BULK_MAX_FILES:
+                    raise ValueError(f"Too many files in archive (max {BULK_MAX_FILES})")
+                out.append((member.name, read_upload_prefix(tf.extractfile(member), member.name, MAX_SECONDS)))
+    return out
+
+def _decode_one(item, use_vad: bool = False):
+    """(filename, bytes) → ((파형(패딩 전), VAD 비율), None) 또는 (None, (status, message))"""
+    filename, audio_bytes = item
+    if not audio_bytes:
+        return None, (400, "Empty file")
     try:
-        if ext == ".wav":
-            y, sr = sf.read(io.BytesIO(audio_bytes), always_2d=False)
-        else:
-            y, sr = librosa.load(io.BytesIO(audio_bytes), sr=None, mono=False)
+        y = decode_audio(audio_bytes, filename)
+        return (vad_trim(y) if use_vad else (y, None)), None
     except Exception as e:
-        raise RuntimeError(f"Audio decode failed: {e}")
-    if isinstance(y, np.ndarray) and y.ndim == 2:
-        y = y.mean(axis=1)
-    y = y.astype(np.float32)
-    if sr != target_sr:
-        y = librosa.resample(y=y, orig_sr=sr, target_sr=target_sr)
-    min_len = int(0.3 * target_sr)
-    max_len = int(10.0 * target_sr)
-    if y.size < min_len:
-        raise ValueError("Audio too short (<0.3s)")
-    if y.size > max_len:
-        y = y[:max_len]
-    else:
-        y = np.pad(y, (0, max_len - y.size))
-    return y
+        status = 415 if "Only WAV/MP3 allowed" in str(e) else 422
+        return None, (status, str(e))
+
+def _extract_one(item, use_vad: bool = False):
+    """(filename, bytes) → ((MFCC, VAD 비율), None) 또는 (None, (status, message)) — 프로세스 풀 경로"""
+    filename, audio_bytes = item
+    if not audio_bytes:
+        return None, (400, "Empty file")
+    try:
+        return extract_pool.extract(audio_bytes, filename, use_vad=use_vad), None
+    except ExtractQueueFull as e:
+        return None, (503, str(e))
+    except Exception as e:
+        status = 415 if "Only WAV/MP3 allowed" in str(e) else 422
+        return None, (status, str(e))
 
-def extract_mfcc_from_bytes(audio_bytes: bytes, filename: str, sr=TARGET_SR, n_mfcc=N_MFCC) -> np.ndarray:
-    y = load_audio_wav_or_mp3(audio_bytes, filename, target_sr=sr)
-    mfcc = librosa.feature.mfcc(y=y, sr=sr, n_mfcc=n_mfcc)
-    return np.mean(mfcc, axis=1).astype(np.float32)
+# 동시 디코딩 수 / 처리 중 업로드 바이트 상한, 넘치면 503 + Retry-After (admission.py, ADMIT_* 환경변수)
+admission = Admission()
+
+_bulk_pool = ThreadPoolExecutor(max_workers=max(1, BULK_DECODE_WORKERS), thread_name_prefix="bulk-decode")
+
+# ======================
+# 지표 (/metrics, Server-Timing)
+# ======================
+metrics.gauge("dvd_batcher_queue_depth", "Rows waiting in the micro-batcher", fn=lambda: batcher.stats()["queue_depth"])
+metrics.gauge("dvd_extract_in_flight", "Uploads in the feature-extraction pool", fn=lambda: extract_pool.stats()["in_flight"])
+metrics.gauge("dvd_admission_active", "Requests holding an admission slot", fn=lambda: admission.stats()["active"])
+metrics.gauge("dvd_admission_active_bytes", "Upload bytes held by admitted requests", fn=lambda: admission.stats()["active_bytes"])
+metrics.gauge("dvd_admission_waiting", "Requests waiting for an admission slot", fn=lambda: sum(admission.stats()["waiting"].values()))
+metrics.gauge("dvd_admission_max_concurrent", "Admission concurrency limit", fn=lambda: admission.max_concurrent)
+metrics.gauge("dvd_db_writer_queue_depth", "Jobs waiting for the SQLite writer", fn=lambda: get_writer().stats()["queue_depth"])
+
+def ext_label(filename) -> str:
+    """지표 label 용 확장자: ALLOWED_EXT 중 하나, 없으면 "", 그 밖은 "other" (파일명으로 시계열이 늘지 않게)"""
+    ext = os.path.splitext((filename or "").lower())[1]
+    return ext if ext in ALLOWED_EXT or not ext else "other"
+
+def _upload_ext() -> str:
+    try:
+        f = request.files.get("audio")
+    except Exception:       # 413 등으로 본문을 읽지 못한 경우
+        return ""
+    return ext_label(f.filename) if f else ""
+
+def _instrumented(endpoint: str):
+    """요청 지표(in-flight, 지연, 상태/확장자 카운터, 업로드 크기) + Server-Timing 헤더(SERVER_TIMING=1 또는 ?timing=1)"""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with metrics.request_scope(endpoint) as scope:
+                resp = app.make_response(fn(*args, **kwargs))
+                scope.status = resp.status_code
+                scope.ext = _upload_ext()
+                if request.content_length:
+                    metrics.UPLOAD_BYTES.labels(scope.ext or "none").observe(request.content_length)
+                if metrics.SERVER_TIMING or request.args.get("timing") == "1":
+                    resp.headers["Server-Timing"] = scope.server_timing()
+            return resp
+        return wrapper
+    return deco
 
 # ======================
 # 엔드포인트
 # ======================
+def _is_confirmed() -> bool:
+    confirm_flag = (request.form.get("confirm") or request.args.get("confirm") or "0")
+    return str(confirm_flag).lower() in ("1", "true", "yes")
+
+def admission_priority(args, headers) -> bool:
+    """
+    수락 우선순위(확정 여부): 본문을 파싱하지 않고 읽을 수 있는 ?confirm= 또는 X-Confirm 헤더만 본다.
+    헤더/쿼리가 없으면 dry-run 우선순위로 수락한다 (폼의 confirm 과 다르면 confirm_mismatch 가 400).
+    """
+    flag = args.get("confirm") or headers.get("X-Confirm") or "0"
+    return str(flag).lower() in ("1", "true", "yes")
+
+def confirm_mismatch(form_flag, high: bool) -> str | None:
+    """
+    수락된 뒤 폼의 confirm 이 수락 우선순위와 다르면 400 메시지, 같거나 폼에 없으면 None.
+    dry-run 으로 수락(대기/차단)된 요청이 확정 저장되거나, 확정 전용 슬롯을 dry-run 이 쓰지 않게 한다.
+    """
+    if form_flag is None or (str(form_flag).lower() in ("1", "true", "yes")) == high:
+        return None
+    return "confirm in the form must match ?confirm= or the X-Confirm header"
+
+def _admitted(max_content_length=None):
+    """
+    수락 제어: 자리가 없으면 본문을 받기 전에 503 + Retry-After.
+    폼을 파싱하면 업로드 전체를 임시 파일로 받아야 하므로, 우선순위(admission_priority)와
+    Content-Length 만으로 결정하고 본문은 수락된 뒤에 읽는다 (폼의 confirm 은 우선순위와 같아야 함).
+    """
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if max_content_length is not None:
+                try:
+                    request.max_content_length = max_content_length   # Flask >= 3.1
+                except AttributeError:
+                    pass
+            nbytes = request.content_length or 0
+            limit = request.max_content_length
+            if limit is not None and nbytes > limit:
+                return jsonify({"error": "Upload too large"}), 413
+            high = admission_priority(request.args, request.headers)
+            try:
+                admitted_at = admission.acquire(nbytes, high)
+            except Overloaded as e:
+                return jsonify({"error": str(e)}), 503, {"Retry-After": str(e.retry_after)}
+            try:
+                try:
+                    mismatch = confirm_mismatch(request.form.get("confirm"), high)
+                except RequestEntityTooLarge:
+                    return jsonify({"error": "Upload too large"}), 413
+                if mismatch:
+                    return jsonify({"error": mismatch}), 400
+                return fn(*args, **kwargs)
+            finally:
+                admission.release(nbytes, admitted_at)
+        return wrapper
+    return deco
+
+def _use_vad() -> bool:
+    flag = request.form.get("vad") or request.args.get("vad")
+    return VAD_DEFAULT if flag is None or flag == "" else str(flag).lower() in ("1", "true", "yes")
+
+def vad_fields(use_vad: bool, trimmed) -> dict:
+    """응답에 붙는 VAD 정보 (끈 요청은 비율 null)"""
+    return {"vad": bool(use_vad), "vad_trimmed_fraction": (round(float(trimmed), 4) if use_vad and trimmed is not None else None)}
+
+def _result_payload(saved_id, saved, pred_label, conf_f, probs_np, phone_number) -> dict:
+    return {
+        "id": saved_id,
+        "saved": saved,
+        "prediction": pred_label,
+        "confidence": conf_f,
+        "probabilities": {
+            "real":  float(probs_np[0]),
+            "fake_2":float(probs_np[1]),
+            "tts":   float(probs_np[2]),
+        },
+        "phone_number": phone_number
+    }
+
+def _cache_value(probs_np, trimmed=None) -> dict:
+    idx = int(np.argmax(probs_np))
+    return {"prediction": class_names[idx], "probabilities": [float(p) for p in probs_np], "vad_trimmed_fraction": trimmed}
+
+def upload_rejection(filename: str):
+    """
+    캐시 조회 전에 적용할 확장자 거부 (비캐시 경로의 decode_audio 와 같은 415) → 오류 메시지 또는 None.
+    그 밖의 디코딩 거부(너무 짧음/디코딩 실패)는 (바이트, 확장자) 로 정해지므로 키에 확장자를 넣어 맞춘다.
+    """
+    ext = os.path.splitext((filename or "").lower())[1]
+    return None if ext in ALLOWED_EXT else f"Only WAV/MP3 allowed, got: {ext}"
+
+def feature_key_for(audio_bytes: bytes, use_vad: bool, filename: str = "") -> str:
+    """MFCC 를 정하는 키 (바이트 + 디코더(확장자) + VAD 여부). 특징 저장소 키이자 fp32 캐시 키"""
+    ext = os.path.splitext((filename or "").lower())[1]
+    return content_key(audio_bytes, ("vad" if use_vad else "") + ext)
+
+def cache_key_for(audio_bytes: bytes, use_vad: bool, feature_key: str | None = None, filename: str = "") -> str:
+    """VAD 를 켠 결과는 MFCC 가 달라지므로 다른 키. 저정밀 모델의 확률도 fp32 와 섞지 않는다"""
+    if model_precision == "fp32":
+        return feature_key or feature_key_for(audio_bytes, use_vad, filename)
+    ext = os.path.splitext((filename or "").lower())[1]
+    return content_key(audio_bytes, ("vad" if use_vad else "") + ext + f"@{model_precision}")
+
+def health_stats() -> dict:
+    """/health 응답 본문 (ASGI 앱 app/main.py 와 공용)"""
+    return {
+        "status": "ok",
+        "model": {"engine": INFERENCE_ENGINE, "precision": model_precision, "precision_gate": precision_report},
+        "batcher": batcher.stats(),
+        "stream": stream_sessions.stats(),
+        "cache": result_cache.stats(),
+        "db_writer": get_writer().stats(),
+        "phone_pool": phone_pool.stats(),
+        "extract": extract_pool.stats(),
+        "phone_index": phone_index.stats(),
+        "admission": admission.stats(),
+        "feature_store": feature_writer.stats() if feature_writer is not None else {"enabled": False},
+        "jobs": job_workers.stats(),
+    }
+
 @app.get("/health")
 def health():
-    return jsonify({"status": "ok"})
+    return jsonify(health_stats())
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return metrics.render(), 200, {"Content-Type": metrics.CONTENT_TYPE}
+
+def phone_lookup_many(numbers):
+    """번호 목록 검증 → (status, 본문). Flask/ASGI 공용"""
+    if not isinstance(numbers, list):
+        return 400, {"error": 'Body must be {"numbers": [...]} or a JSON array'}
+    if len(numbers) > PHONE_LOOKUP_MAX:
+        return 413, {"error": f"Too many numbers (max {PHONE_LOOKUP_MAX})"}
+    results = phone_index.get_many(numbers)
+    return 200, {"count": len(results), "found": sum(r["found"] for r in results), "results": results}
+
+def stats_summary(top, by) -> tuple:
+    """요약 테이블 통계 + 상위 번호 → (status, 본문). Flask/ASGI 공용"""
+    try:
+        top = int(top if top not in (None, "") else 10)
+    except (TypeError, ValueError):
+        return 400, {"error": "top must be an integer"}
+    by = by or "risk"
+    if by not in TOP_ORDER:
+        return 400, {"error": f"by must be one of {sorted(TOP_ORDER)}"}
+    out = get_stats()
+    out["top"] = {"by": by, "numbers": top_numbers(min(max(0, top), STATS_TOP_MAX), by)}
+    return 200, out
+
+_BUCKET_TIME = re.compile(r"^\d{4}-\d{2}-\d{2}(T\d{2}(:\d{2}(:\d{2})?)?)?$")
+
+def detections_query(args) -> tuple:
+    """
+    탐지 롤업 범위 조회 → (status, 본문). Flask/ASGI 공용 (args: 쿼리 파라미터 Mapping)
+      bucket=hour|day|phone, days=30 또는 from=/to= (YYYY-MM-DD[THH]), prediction=fake_2,tts, phone=, limit=
+    """
+    bucket = args.get("bucket") or "day"
+    if bucket not in (*ROLLUP_BUCKETS, "phone"):
+        return 400, {"error": f"bucket must be one of {sorted((*ROLLUP_BUCKETS, 'phone'))}"}
+    try:
+        days = float(args.get("days") or 30)
+        limit = int(args.get("limit") or 50)
+    except ValueError:
+        return 400, {"error": "days and limit must be numbers"}
+    now = datetime.now(timezone.utc)
+    until = args.get("to") or now.strftime("%Y-%m-%dT%H:%M:%S")
+    since = args.get("from") or (now - timedelta(days=min(max(0.0, days), DETECTIONS_MAX_DAYS))).strftime("%Y-%m-%dT%H:%M:%S")
+    if not (_BUCKET_TIME.match(since) and _BUCKET_TIME.match(until)):
+        return 400, {"error": "from/to must look like YYYY-MM-DD or YYYY-MM-DDTHH"}
+    preds = [p for p in (args.get("prediction") or "").split(",") if p] or None
+    phone = args.get("phone")
+
+    out = {"bucket": bucket, "from": since, "to": until, "prediction": preds}
+    if bucket == "phone":
+        out["numbers"] = detections_by_phone(since, until, preds, min(max(0, limit), STATS_TOP_MAX))
+    elif phone and bucket != "day":
+        return 400, {"error": "per-phone series are daily (bucket=day)"}
+    else:
+        if phone:
+            out["phone_number"] = phone
+        out["series"] = detection_series(bucket, since, until, preds, phone)
+        out["total"] = sum(r["total"] for r in out["series"])
+    return 200, out
+
+@app.get("/detections")
+@_instrumented("/detections")
+def detections():
+    """시간/일/번호별 탐지 건수 (롤업 테이블만 읽음)"""
+    status, out = detections_query(request.args)
+    return jsonify(out), status
+
+@app.get("/stats")
+@_instrumented("/stats")
+def stats():
+    """?top=10&by=risk|reports — 요약 테이블 + 인덱스 상위 K 만 읽으므로 테이블 크기와 무관"""
+    status, out = stats_summary(request.args.get("top"), request.args.get("by"))
+    return jsonify(out), status
+
+@app.get("/phone/<path:number>")
+@_instrumented("/phone")
+def phone_lookup(number):
+    """번호 1개 위험도: 있으면 200, 없으면 404 (형식 오류 400)"""
+    out = phone_index.get(number)
+    status = 200 if out["found"] else (404 if out["valid"] else 400)
+    return jsonify(out), status
+
+@app.post("/phone/lookup")
+@_instrumented("/phone/lookup")
+def phone_lookup_bulk():
+    """{"numbers": ["010-...", ...]} 또는 ["...", ...] → 입력 순서대로 결과"""
+    body = request.get_json(silent=True)
+    numbers = body.get("numbers") if isinstance(body, dict) else body
+    status, out = phone_lookup_many(numbers)
+    return jsonify(out), status
 
 @app.post("/predict")
+@_instrumented("/predict")
+@_admitted()
 def predict():
     try:
         file = request.files.get("audio")
@@ -340,27 +564,37 @@ def predict():
             return jsonify({"error": 'No audio (field "audio" required)'}), 400
 
         filename = file.filename or "unknown"
-        audio_bytes = file.read()
+        rejected = upload_rejection(filename)     # 캐시 적중이어도 같은 거부
+        if rejected:
+            return jsonify({"error": rejected}), 415
+        # 디코딩에 필요한 앞부분만 읽음 (긴 녹음도 메모리/시간 일정)
+        with metrics.stage("read"):
+            audio_bytes = read_upload_prefix(file.stream, filename, MAX_SECONDS)
         if not audio_bytes:
             return jsonify({"error": "Empty file"}), 400
 
-        # 1) 추론
-        mfcc = extract_mfcc_from_bytes(audio_bytes, filename)
-        mfcc_scaled = scaler.transform(mfcc.reshape(1, -1))
-        x = torch.from_numpy(mfcc_scaled).float().to(device)
-
-        with torch.no_grad():
-            logits = model(x)
-            probs = torch.softmax(logits, dim=1)[0]
-            conf, idx = torch.max(probs, dim=0)
+        # 1) 추론: 같은 바이트는 캐시에서, 아니면 동시 요청과 묶어서 1회 forward
+        use_vad = _use_vad()
+        feature_key = feature_key_for(audio_bytes, use_vad, filename)
+        cache_key = cache_key_for(audio_bytes, use_vad, feature_key, filename)
+        mfcc = None
+        with metrics.stage("cache"):
+            cached = result_cache.get(cache_key)
+        if cached is not None:
+            probs_np = np.asarray(cached["probabilities"], dtype=np.float32)
+            trimmed = cached.get("vad_trimmed_fraction")
+        else:
+            mfcc, trimmed = extract_pool.extract(audio_bytes, filename, use_vad=use_vad)
+            with metrics.stage("infer"):      # 배처 대기 + forward
+                probs_np = batcher.predict(mfcc)
+            result_cache.put(cache_key, _cache_value(probs_np, trimmed))
+        idx = int(np.argmax(probs_np))
 
-        pred_label = class_names[int(idx)]
-        conf_f     = float(conf)
-        probs_np   = probs.detach().cpu().numpy()
+        pred_label = class_names[idx]
+        conf_f     = float(probs_np[idx])
 
         # 2) 저장 여부(사용자 확인 기반 2단계)
-        confirm_flag = (request.form.get("confirm") or request.args.get("confirm") or "0")
-        is_confirmed = str(confirm_flag).lower() in ("1", "true", "yes")
+        is_confirmed = _is_confirmed()
 
         saved_id = None
         phone_number = None
@@ -371,40 +605,313 @@ def predict():
             if not phone_number:
                 phone_number = get_next_phone_number()
 
-            saved_id = save_result(filename, pred_label, conf_f, probs_np, phone_number)
-
-            # 번호 누적(EMA 위험도 포함)
-            if phone_number:
-                upsert_phone_report(phone_number, conf_f)
+            # 결과 저장 + 번호 누적(EMA 위험도 포함)을 한 트랜잭션으로
+            saved_id = save_confirmed_result(filename, pred_label, conf_f, probs_np, phone_number)
 
             saved = True
         else:
             # 미확정(dry-run): 저장하지 않음
             saved = False
+        record_features(feature_key, mfcc, saved_id, (audio_bytes, filename, use_vad))
+
+        payload = _result_payload(saved_id, saved, pred_label, conf_f, probs_np, phone_number)
+        payload["cached"] = cached is not None
+        payload.update(vad_fields(use_vad, trimmed))
+        return jsonify(payload), 200
+
+    except RequestEntityTooLarge:
+        return jsonify({"error": f"Upload too large (max {MAX_UPLOAD_BYTES} bytes)"}), 413
+    except ExtractQueueFull as e:
+        return jsonify({"error": str(e)}), 503
+    except Exception as e:
+        print("=== /predict ERROR ===")
+        print(traceback.format_exc())
+        status = 415 if "Only WAV/MP3 allowed" in str(e) else 500
+        return jsonify({"error": str(e)}), status
+
+@app.post("/predict/batch")
+@_instrumented("/predict/batch")
+@_admitted(max_content_length=BULK_MAX_UPLOAD_BYTES)
+def predict_batch():
+    """
+    다건 판별: audio 파트 여러 개 또는 zip/tar 아카이브 1개.
+    디코딩/MFCC는 병렬, 스케일러+모델은 한 행렬로 1회 실행.
+    결과는 입력 순서대로, 실패는 항목별로 보고.
+    """
+    try:
+        files = request.files.getlist("audio")
+        if not files:
+            return jsonify({"error": 'No audio (field "audio" required)'}), 400
+
+        # 1) 입력 펼치기 (아카이브 1개면 압축 해제)
+        if len(files) == 1 and (files[0].filename or "").lower().endswith(ARCHIVE_EXT):
+            try:
+                items = _unpack_archive(files[0].read(), files[0].filename)   # 아카이브 자체는 전체 필요
+            except (zipfile.BadZipFile, tarfile.TarError) as e:
+                return jsonify({"error": f"Archive read failed: {e}"}), 400
+        else:
+            if len(files) > BULK_MAX_FILES:
+                return jsonify({"error": f"Too many files (max {BULK_MAX_FILES})"}), 413
+            items = []
+            for i, f in enumerate(files):
+                name = f.filename or f"unknown_{i}"
+                items.append((name, read_upload_prefix(f.stream, name, MAX_SECONDS)))
+        if not items:
+            return jsonify({"error": "No audio files in request"}), 400
+
+        # 2) 캐시 조회 → 미스만 디코딩(병렬) + MFCC(클립을 쌓아 STFT 1회씩)
+        use_vad = _use_vad()
+        # 빈 파일/허용 안 된 확장자는 캐시를 보지 않고 디코딩 경로에서 항목별 400/415
+        fkeys = [feature_key_for(b, use_vad, name) if b and not upload_rejection(name) else None for name, b in items]
+        keys = [cache_key_for(b, use_vad, fk, name) if fk else None for (name, b), fk in zip(items, fkeys)]
+        probs_all, trimmed_all = {}, {}
+        for i, key in enumerate(keys):
+            cached = result_cache.get(key) if key else None
+            if cached is not None:
+                probs_all[i] = np.asarray(cached["probabilities"], dtype=np.float32)
+                trimmed_all[i] = cached.get("vad_trimmed_fraction")
+        todo = [i for i in range(len(items)) if i not in probs_all]
+        extracted = [(None, None)] * len(items)
+        # 프로세스 풀이 있으면 디코딩+MFCC 를 워커에서, 없으면 디코딩만 스레드에서
+        per_item = functools.partial(_extract_one if extract_pool.enabled else _decode_one, use_vad=use_vad)
+        for i, (res, err) in zip(todo, _bulk_pool.map(per_item, [items[i] for i in todo])):
+            if res is not None:
+                res, trimmed_all[i] = res
+            extracted[i] = (res, err)
+        new_idx = [i for i in todo if extracted[i][0] is not None]
+        ok_idx = sorted(list(probs_all) + new_idx)
+
+        # 3) MFCC(길이순으로 묶어 STFT) → 스케일러 + 모델: 한 행렬로 1회
+        if new_idx and extract_pool.enabled:
+            mfcc_mat = np.stack([extracted[i][0] for i in new_idx])
+        elif new_idx:
+            step = mfcc_extractor.max_batch
+            total_len = int(MAX_SECONDS * TARGET_SR)
+            by_len = sorted(new_idx, key=lambda i: extracted[i][0].size)
+            chunks = [[extracted[i][0] for i in by_len[k:k + step]] for k in range(0, len(by_len), step)]
+            mfcc_rows = np.concatenate(list(_bulk_pool.map(lambda c: mfcc_extractor.transform_padded(c, total_len), chunks)))
+            mfcc_mat = np.empty_like(mfcc_rows)
+            mfcc_mat[[new_idx.index(i) for i in by_len]] = mfcc_rows
+        if new_idx:
+            probs_mat = _forward_batch(mfcc_mat)
+            for k, i in enumerate(new_idx):
+                probs_all[i] = probs_mat[k]
+                result_cache.put(keys[i], _cache_value(probs_mat[k], trimmed_all.get(i)))
+
+        # 4) 확정 저장 (단일 트랜잭션)
+        is_confirmed = _is_confirmed()
+        phone_list = request.form.getlist("phone_number") or request.args.getlist("phone_number")
+        per_item_phone = len(phone_list) == len(items)
+
+        results = [None] * len(items)
+        to_save = []  # (index, save tuple)
+        for i, (filename, _) in enumerate(items):
+            _, err = extracted[i]
+            if err is not None:
+                status, message = err
+                results[i] = {"index": i, "filename": filename, "status": status, "error": message}
+                continue
+            probs_np = probs_all[i]
+            idx = int(np.argmax(probs_np))
+            pred_label, conf_f = class_names[idx], float(probs_np[idx])
+            phone_number = None
+            if is_confirmed and pred_label.lower() != "real":
+                if per_item_phone:
+                    phone_number = phone_list[i] or None
+                elif phone_list:
+                    phone_number = phone_list[0] or None
+                if not phone_number:
+                    phone_number = get_next_phone_number()
+                to_save.append((i, (filename, pred_label, conf_f, probs_np, phone_number)))
+            results[i] = {"index": i, "filename": filename, "status": 200,
+                          **_result_payload(None, False, pred_label, conf_f, probs_np, phone_number),
+                          "cached": i not in new_idx, **vad_fields(use_vad, trimmed_all.get(i))}
+
+        if to_save:
+            ids = save_results_batch([t for _, t in to_save])
+            for (i, _), rowid in zip(to_save, ids):
+                results[i]["id"] = rowid
+                results[i]["saved"] = True
+        new_pos = {i: k for k, i in enumerate(new_idx)}
+        for i in ok_idx:
+            record_features(fkeys[i], mfcc_mat[new_pos[i]] if i in new_pos else None, results[i]["id"],
+                            (items[i][0], items[i][1], use_vad))
 
         return jsonify({
-            "id": saved_id,
-            "saved": saved,
-            "prediction": pred_label,
-            "confidence": conf_f,
-            "probabilities": {
-                "real":  float(probs_np[0]),
-                "fake_2":float(probs_np[1]),
-                "tts":   float(probs_np[2]),
-            },
-            "phone_number": phone_number
+            "count": len(results),
+            "succeeded": len(ok_idx),
+            "failed": len(results) - len(ok_idx),
+            "saved": len(to_save),
+            "results": results,
         }), 200
 
+    except RequestEntityTooLarge:
+        return jsonify({"error": "Upload too large"}), 413
     except Exception as e:
-        print("=== /predict ERROR ===")
+        print("=== /predict/batch ERROR ===")
+        print(traceback.format_exc())
+        status = 413 if "Too many files" in str(e) else 500
+        return jsonify({"error": str(e)}), status
+
+# ======================
+# 비동기 작업 (긴 녹음: POST /jobs → GET /jobs/<id>)
+# ======================
+def process_jobs(batch):
+    """
+    JobWorkers 가 claim 한 작업 묶음 → [(status, payload 또는 {"error": ...}, 확정 저장 인자 또는 None), ...] (입력 순서).
+    /predict/batch 와 같은 경로: 캐시 → 추출(병렬) → forward 1회. 확정 저장은 JobWorkers 가 리스 확인과 같은
+    트랜잭션에서 하므로 (jobs._finish_cur), 리스를 잃고 재시도된 작업이 두 번 저장되지 않는다.
+    """
+    n = len(batch)
+    out = [None] * n
+    fkeys = [feature_key_for(j["audio_bytes"], j["vad"], j["filename"])
+             if j["audio_bytes"] and not upload_rejection(j["filename"]) else None for j in batch]
+    keys = [cache_key_for(j["audio_bytes"], j["vad"], fk, j["filename"]) if fk else None
+            for j, fk in zip(batch, fkeys)]
+    probs_all, trimmed_all = {}, {}
+    for i, key in enumerate(keys):
+        cached = result_cache.get(key) if key else None
+        if cached is not None:
+            probs_all[i] = np.asarray(cached["probabilities"], dtype=np.float32)
+            trimmed_all[i] = cached.get("vad_trimmed_fraction")
+    todo = [i for i in range(n) if i not in probs_all]
+    cached_idx = set(probs_all)
+
+    per_item = _extract_one if extract_pool.enabled else _decode_one
+    extracted = list(_bulk_pool.map(lambda i: per_item((batch[i]["filename"], batch[i]["audio_bytes"]),
+                                                       use_vad=batch[i]["vad"]), todo))
+    new_idx, feats = [], []
+    for i, (res, err) in zip(todo, extracted):
+        if err is not None:
+            status, message = err
+            out[i] = (status, {"error": message})
+            continue
+        feat, trimmed_all[i] = res
+        new_idx.append(i)
+        feats.append(feat)
+    if new_idx:
+        if not extract_pool.enabled:
+            with metrics.stage("mfcc"):
+                feats = mfcc_extractor.transform_padded(feats, int(MAX_SECONDS * TARGET_SR))
+        feats = np.stack(feats)
+        probs_mat = _forward_batch(feats)
+        for k, i in enumerate(new_idx):
+            probs_all[i] = probs_mat[k]
+            result_cache.put(keys[i], _cache_value(probs_mat[k], trimmed_all.get(i)))
+
+    for i, probs_np in probs_all.items():
+        job = batch[i]
+        idx = int(np.argmax(probs_np))
+        pred_label, conf_f = class_names[idx], float(probs_np[idx])
+        phone_number, save = None, None
+        if job["confirm"] and pred_label.lower() != "real":
+            phone_number = job["phone_number"] or get_next_phone_number()
+            save = (job["filename"], pred_label, conf_f, probs_np, phone_number)
+        payload = _result_payload(None, False, pred_label, conf_f, probs_np, phone_number)
+        payload["cached"] = i in cached_idx
+        payload.update(vad_fields(job["vad"], trimmed_all.get(i)))
+        out[i] = (200, payload, save)
+    new_pos = {i: k for k, i in enumerate(new_idx)}
+    for i in new_idx:
+        job = batch[i]
+        record_features(fkeys[i], feats[new_pos[i]], None, (job["audio_bytes"], job["filename"], job["vad"]))
+    return out
+
+def job_saved(job, result_id: int):
+    """확정 저장이 커밋된 작업 → 특징 저장소의 행과 results.id 연결"""
+    record_features(feature_key_for(job["audio_bytes"], job["vad"], job["filename"]), None, result_id)
+
+job_workers = jobs.JobWorkers(process_jobs, threads=JOB_WORKERS, on_saved=job_saved)
+
+@app.post("/jobs")
+@_instrumented("/jobs")
+@_admitted()
+def submit_job():
+    """긴 녹음 비동기 판별: 바로 202 + job id, 결과는 GET /jobs/<id> 로 조회"""
+    try:
+        file = request.files.get("audio")
+        if not file:
+            return jsonify({"error": 'No audio (field "audio" required)'}), 400
+        filename = file.filename or "unknown"
+        rejected = upload_rejection(filename)
+        if rejected:
+            return jsonify({"error": rejected}), 415
+        with metrics.stage("read"):
+            audio_bytes = read_upload_prefix(file.stream, filename, MAX_SECONDS)
+        if not audio_bytes:
+            return jsonify({"error": "Empty file"}), 400
+        phone_number = request.form.get("phone_number") or request.args.get("phone_number") or None
+        job_id = jobs.submit(filename, audio_bytes, _is_confirmed(), phone_number, _use_vad())
+        job_workers.start().notify()
+        return jsonify({"job_id": job_id, "status": "queued", "poll": f"/jobs/{job_id}"}), 202
+    except RequestEntityTooLarge:
+        return jsonify({"error": f"Upload too large (max {MAX_UPLOAD_BYTES} bytes)"}), 413
+    except Exception as e:
+        print("=== /jobs ERROR ===")
         print(traceback.format_exc())
         status = 415 if "Only WAV/MP3 allowed" in str(e) else 500
         return jsonify({"error": str(e)}), status
 
+@app.get("/jobs/<job_id>")
+@_instrumented("/jobs/<id>")
+def job_status(job_id):
+    body = jobs.get(job_id)
+    if body is None:
+        return jsonify({"error": "Unknown job"}), 404
+    return jsonify(body), 200
+
+stream_sessions = StreamSessions(max_sessions=STREAM_MAX_SESSIONS)
+
+def stream(ws):
+    """
+    실시간 판별: 바이너리 메시지 = 16kHz PCM16 LE mono 청크, 텍스트 "end" = 종료.
+    emit_ms(기본 STREAM_EMIT_MS)마다 {"type": "prediction", ...} 를 push.
+    """
+    if not stream_sessions.open():
+        ws.send(json.dumps({"type": "error", "error": "Too many concurrent streams"}))
+        ws.close()
+        return
+    def _receive():
+        try:
+            return ws.receive()
+        except ConnectionClosed:
+            return None
+
+    try:
+        emit_ms = float(request.args.get("emit_ms") or STREAM_EMIT_MS)
+        run_stream_session(
+            receive=_receive,
+            send=lambda m: ws.send(json.dumps(m)),
+            predict_fn=batcher.predict,
+            class_names=class_names,
+            emit_ms=max(100.0, emit_ms),
+            sr=TARGET_SR, n_mfcc=N_MFCC,
+        )
+    except Exception as e:
+        print("=== /stream ERROR ===")
+        print(traceback.format_exc())
+        try:
+            ws.send(json.dumps({"type": "error", "error": str(e)}))
+        except Exception:
+            pass
+    finally:
+        stream_sessions.close()
+
+if sock is not None:
+    sock.route("/stream")(stream)
+
 # ======================
 # 실행
 # ======================
 if __name__ == "__main__":
     print(f"✅ Using DB: {DB_PATH}")
     init_db()
-    app.run(host="0.0.0.0", port=5000, debug=False)
+    phone_index.start()
+    print(f"✅ Phone index: {phone_index.stats()['entries']} numbers")
+    if extract_pool.enabled:
+        extract_pool.start()
+        print(f"✅ Extract workers: {extract_pool.stats()['warm_workers']}")
+    if job_workers.enabled:
+        job_workers.start()
+        print(f"✅ Job workers: {job_workers.threads}")
+    app.run(host="0.0.0.0", port=int(os.environ.get("PORT", "5000")), debug=False)
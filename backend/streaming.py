@@ -0,0 +1,203 @@
+# streaming.py
+import threading, time, json
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from features import N_FFT, HOP, AMIN, TOP_DB, mfcc_bases
+
+WINDOW_SECONDS = 10.0   # /predict 와 같은 10초 창 (짧은 구간은 0-패딩으로 간주)
+
+
+# ======================
+# 세션 단위 증분 MFCC
+# ======================
+class StreamingMFCC:
+    """
+    16kHz PCM16 청크를 받아 MFCC 프레임을 증분 계산한다.
+      - 이전 청크와 겹치는 STFT 구간(n_fft - hop 샘플)만 보관 → 세션 메모리 O(n_fft)
+      - 프레임 MFCC는 누적 합/개수만 유지 (running mean)
+      - center=True(상수 패딩)와 같도록 시작 시 n_fft//2 개의 0을 앞에 둔다
+    top_db 클리핑은 전체 구간 최대값 대신 지금까지의 최대값 기준(스트리밍 근사).
+    """
+
+    def __init__(self, sr: int = 16000, n_mfcc: int = 13):
+        self.sr = sr
+        self.n_mfcc = n_mfcc
+        self._window, self._mel_t, self._dct_t = mfcc_bases(sr, n_mfcc)
+        self._buf = np.zeros(N_FFT // 2, dtype=np.float32)  # 앞쪽 center 패딩
+        self._carry = b""            # 홀수 바이트 청크 보관
+        self._sum = np.zeros(n_mfcc, dtype=np.float64)
+        self._max_db = -np.inf
+        self.n_frames = 0
+        self.n_samples = 0
+        self.finished = False
+
+    # ---------- 입력 ----------
+    def push_pcm16(self, chunk: bytes) -> int:
+        """PCM16 LE 바이트 추가, 새로 계산된 프레임 수 반환"""
+        data = self._carry + chunk
+        usable = len(data) - (len(data) % 2)
+        self._carry = data[usable:]
+        if not usable:
+            return 0
+        y = np.frombuffer(data[:usable], dtype="<i2").astype(np.float32) / 32768.0
+        return self.push(y)
+
+    def push(self, y: np.ndarray) -> int:
+        if self.finished:
+            raise RuntimeError("stream already finished")
+        self.n_samples += y.size
+        self._buf = np.concatenate([self._buf, y.astype(np.float32, copy=False)])
+        return self._consume()
+
+    def finish(self) -> int:
+        """
+        뒤에 0을 붙여 실제 샘플이 걸친 마지막 프레임까지 계산.
+        10초 미만 구간은 /predict 의 0-패딩 결과와 같은 프레임 집합이 된다.
+        """
+        if self.finished:
+            return 0
+        target = -(-(self.n_samples + N_FFT // 2) // HOP)   # ceil
+        self._buf = np.concatenate([self._buf, np.zeros(N_FFT, dtype=np.float32)])
+        added = self._consume(limit=target - self.n_frames)
+        self.finished = True
+        self._buf = self._buf[:0]
+        return added
+
+    # ---------- 특징 ----------
+    def _consume(self, limit: int | None = None) -> int:
+        if self._buf.size < N_FFT:
+            return 0
+        n = 1 + (self._buf.size - N_FFT) // HOP
+        if limit is not None:
+            n = max(0, min(n, limit))
+        if n == 0:
+            return 0
+        frames = sliding_window_view(self._buf, N_FFT)[::HOP][:n] * self._window
+        power = np.abs(np.fft.rfft(frames, axis=1)) ** 2          # (n, 1025)
+        mel_db = 10.0 * np.log10(np.maximum(AMIN, power @ self._mel_t))
+        self._max_db = max(self._max_db, float(mel_db.max()))
+        mel_db = np.maximum(mel_db, self._max_db - TOP_DB)
+        self._sum += (mel_db @ self._dct_t).sum(axis=0)
+        self.n_frames += n
+        # 다음 프레임 시작점 이후만 남긴다 (겹치는 n_fft - hop 구간 재사용)
+        self._buf = self._buf[n * HOP:].copy()
+        return n
+
+    def _zero_frame_mfcc(self) -> np.ndarray:
+        """0-패딩 프레임의 MFCC (log-mel이 모든 밴드에서 하한값)"""
+        floor = max(10.0 * np.log10(AMIN), self._max_db - TOP_DB)
+        return self._dct_t.sum(axis=0) * floor
+
+    def mean(self) -> np.ndarray:
+        """
+        프레임 평균 MFCC.
+        10초 미만이면 /predict 처럼 나머지를 0-패딩 프레임으로 보고 평균한다.
+        """
+        window_frames = 1 + int(WINDOW_SECONDS * self.sr) // HOP
+        if self.n_frames >= window_frames:
+            return (self._sum / self.n_frames).astype(np.float32)
+        pad = window_frames - self.n_frames
+        total = self._sum + pad * self._zero_frame_mfcc()
+        return (total / window_frames).astype(np.float32)
+
+    @property
+    def seconds(self) -> float:
+        return self.n_samples / float(self.sr)
+
+
+# ======================
+# 세션 관리 (워커당 동시 세션 수 제한)
+# ======================
+class StreamSessions:
+    def __init__(self, max_sessions: int = 256):
+        self.max_sessions = max_sessions
+        self._lock = threading.Lock()
+        self._active = 0
+        self.opened = 0
+        self.rejected = 0
+
+    def open(self) -> bool:
+        with self._lock:
+            if self._active >= self.max_sessions:
+                self.rejected += 1
+                return False
+            self._active += 1
+            self.opened += 1
+            return True
+
+    def close(self):
+        with self._lock:
+            self._active = max(0, self._active - 1)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "active": self._active,
+                "max_sessions": self.max_sessions,
+                "opened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+def run_stream_session(receive, send, predict_fn, class_names, emit_ms: float = 500.0,
+                       sr: int = 16000, n_mfcc: int = 13, min_seconds: float = 0.3,
+                       max_chunk_bytes: int = 256 * 1024):
+    """
+    전송 계층과 무관한 세션 루프.
+      receive(): bytes(PCM16 청크) | str(제어 메시지) | None(연결 종료)
+      send(dict): JSON 직렬화 가능한 메시지 전송
+      predict_fn(mfcc_13) → 확률 3개
+    emit_ms 분량의 새 오디오가 쌓일 때마다 판별 결과를 push 한다.
+    """
+    st = StreamingMFCC(sr=sr, n_mfcc=n_mfcc)
+    emit_samples = max(HOP, int(sr * emit_ms / 1000.0))
+    min_samples = int(min_seconds * sr)
+    last_emit = 0
+
+    def _emit(final: bool):
+        t0 = time.perf_counter()
+        probs = np.asarray(predict_fn(st.mean()))
+        idx = int(np.argmax(probs))
+        send({
+            "type": "final" if final else "prediction",
+            "prediction": class_names[idx],
+            "confidence": float(probs[idx]),
+            "probabilities": {
+                "real":  float(probs[0]),
+                "fake_2":float(probs[1]),
+                "tts":   float(probs[2]),
+            },
+            "seconds": round(st.seconds, 3),
+            "frames": st.n_frames,
+            "latency_ms": round((time.perf_counter() - t0) * 1000.0, 3),
+        })
+
+    send({"type": "ready", "sample_rate": sr, "format": "pcm_s16le", "emit_ms": emit_ms})
+    while True:
+        msg = receive()
+        if msg is None:
+            break
+        if isinstance(msg, str):
+            # 제어 메시지: "end" 또는 {"type": "end"}
+            try:
+                ctrl = json.loads(msg)
+            except ValueError:
+                ctrl = {"type": msg.strip().lower()}
+            if isinstance(ctrl, dict) and ctrl.get("type") == "end":
+                break
+            continue
+        if len(msg) > max_chunk_bytes:
+            send({"type": "error", "error": f"Chunk too large (max {max_chunk_bytes} bytes)"})
+            return
+        st.push_pcm16(msg)
+        if st.n_samples >= min_samples and st.n_samples - last_emit >= emit_samples:
+            last_emit = st.n_samples
+            _emit(final=False)
+
+    st.finish()
+    if st.n_samples >= min_samples:
+        _emit(final=True)
+    else:
+        send({"type": "error", "error": "Audio too short (<0.3s)"})
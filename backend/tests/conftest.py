@@ -0,0 +1,43 @@
+# tests/conftest.py
+"""server 를 import 하기 전에 임시 DB/캐시 경로를 잡는다 (backend/ 의 실제 파일을 건드리지 않게)"""
+import io, os, sys, tempfile
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+_TMP = tempfile.mkdtemp(prefix="dvd-test-")
+os.environ.update({
+    "DB_PATH": os.path.join(_TMP, "test.db"),
+    "RESULT_CACHE_PATH": os.path.join(_TMP, "result_cache.db"),
+    "RESULT_CACHE_SIZE": "64",
+    "RESULT_CACHE_DISK_SIZE": "64",
+    "FEATURE_STORE_DIR": "",
+    "JOB_WORKERS": "0",
+    "EXTRACT_WORKERS": "0",
+})
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def wav_bytes(seconds: float = 1.0, sr: int = 16000, freq: float = 440.0) -> bytes:
+    t = np.arange(int(seconds * sr)) / sr
+    buf = io.BytesIO()
+    sf.write(buf, (0.2 * np.sin(2 * np.pi * freq * t)).astype(np.float32), sr, format="WAV", subtype="PCM_16")
+    return buf.getvalue()
+
+
+@pytest.fixture(scope="session")
+def server_module():
+    import server
+    from db import init_db
+    init_db()
+    return server
+
+
+@pytest.fixture
+def client(server_module):
+    return server_module.app.test_client()
+
+
+def post_audio(client, path, name, data):
+    return client.post(path, data={"audio": (io.BytesIO(data), name)}, content_type="multipart/form-data")
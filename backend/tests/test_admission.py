@@ -0,0 +1,87 @@
+# tests/test_admission.py
+"""
+수락 제어는 본문을 파싱하기 전에 결정해야 한다 (/predict, /jobs 모두), 우선순위는 ?confirm= / X-Confirm.
+실행: cd backend && python -m pytest -q tests
+"""
+import io
+
+import pytest
+
+from admission import Admission
+from conftest import wav_bytes as _wav_bytes
+
+
+@pytest.fixture
+def saturated(server_module, monkeypatch):
+    """슬롯 2개 중 1개는 확정 전용, 나머지 1개는 dry-run 이 점유 중 → dry-run 은 바로 503"""
+    adm = Admission(max_concurrent=2, high_reserve=1, queue_depth=0)
+    held = adm.acquire(0, False)
+    monkeypatch.setattr(server_module, "admission", adm)
+
+    def no_body(*a, **kw):
+        raise AssertionError("admission must not parse the request body")
+    monkeypatch.setattr(server_module, "_is_confirmed", no_body)
+    yield adm
+    adm.release(0, held)
+
+
+@pytest.mark.parametrize("path", ["/predict", "/jobs"])
+def test_shed_before_body_is_parsed(client, saturated, path):
+    resp = client.post(path, data={"audio": (io.BytesIO(_wav_bytes()), "a.wav"), "confirm": "1"},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 503
+    assert "Retry-After" in resp.headers
+
+
+def test_confirm_header_uses_reserved_slot(client, saturated):
+    resp = client.post("/predict", data={"audio": (io.BytesIO(_wav_bytes()), "b.wav")},
+                       content_type="multipart/form-data", headers={"X-Confirm": "1"})
+    # 수락된 뒤에는 본문(폼) 을 읽는다 — 여기서는 _is_confirmed 를 막아 두었으므로 500 이면 수락된 것
+    assert resp.status_code != 503
+    assert saturated.admitted["confirmed"] == 1
+
+
+@pytest.mark.parametrize("path", ["/predict", "/jobs"])
+@pytest.mark.parametrize("header, form", [("1", "0"), (None, "1")])
+def test_confirm_header_and_form_must_agree(client, server_module, path, header, form):
+    """X-Confirm: 1 + 폼 confirm=0 (확정 슬롯을 쓰는 dry-run), 헤더 없이 폼 confirm=1 (dry-run 으로 수락된 확정) → 400"""
+    headers = {"X-Confirm": header} if header else {}
+    resp = client.post(path, data={"audio": (io.BytesIO(_wav_bytes()), "m.wav"), "confirm": form},
+                       content_type="multipart/form-data", headers=headers)
+    assert resp.status_code == 400
+    assert "X-Confirm" in resp.get_json()["error"]
+    assert server_module.admission.stats()["active"] == 0
+
+
+def test_confirm_header_and_form_agree(client):
+    resp = client.post("/predict", data={"audio": (io.BytesIO(_wav_bytes(freq=880.0)), "n.wav"), "confirm": "1"},
+                       content_type="multipart/form-data", headers={"X-Confirm": "1"})
+    assert resp.status_code == 200
+
+
+def test_asgi_confirm_mismatch(server_module):
+    import asyncio, httpx
+    from app.main import app
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as asgi:
+            return [await asgi.post(path, files={"audio": ("o.wav", _wav_bytes())}, data={"confirm": "0"},
+                                    headers={"X-Confirm": "1"}) for path in ("/predict", "/jobs")]
+
+    assert [r.status_code for r in asyncio.run(run())] == [400, 400]
+
+
+def test_asgi_jobs_shed(saturated):
+    import asyncio, httpx
+    from app.main import app
+
+    async def run():
+        # 거부는 본문/모델을 쓰기 전에 끝나므로 lifespan 없이 (lifespan 종료는 cpu_pool 을 닫는다)
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as asgi:
+            return (await asgi.post("/jobs", files={"audio": ("c.wav", _wav_bytes())}),
+                    await asgi.post("/predict", files={"audio": ("c.wav", _wav_bytes())}))
+
+    jobs_resp, predict_resp = asyncio.run(run())
+    assert jobs_resp.status_code == 503 and predict_resp.status_code == 503
@@ -0,0 +1,58 @@
+# tests/test_asgi_errors.py
+"""
+ASGI 앱도 Flask 와 같은 상태 코드: 본문 크기 초과 413, 깨진 본문 400 (500/예외 누출 없이).
+실행: cd backend && python -m pytest -q tests
+"""
+import asyncio
+
+import httpx
+import pytest
+
+MULTIPART_HEAD = (b'--zz\r\nContent-Disposition: form-data; name="audio"; filename="a.wav"\r\n'
+                  b'Content-Type: audio/wav\r\n\r\n')
+
+
+def _post(app, path, body, content_type):
+    async def chunks():
+        # Content-Length 없이 흘려 보내 BodyLimitMiddleware 가 받는 중에 끊게 한다
+        for i in range(0, len(body), 4096):
+            yield body[i:i + 4096]
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as asgi:
+            return await asgi.post(path, content=chunks(), headers={"content-type": content_type})
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def small_app(server_module):
+    from app.main import app, BodyLimitMiddleware
+    return BodyLimitMiddleware(app, max_bytes=16 * 1024)
+
+
+@pytest.mark.parametrize("path, body, content_type", [
+    ("/jobs", MULTIPART_HEAD + b"x" * 64 * 1024, "multipart/form-data; boundary=zz"),
+    ("/predict", MULTIPART_HEAD + b"x" * 64 * 1024, "multipart/form-data; boundary=zz"),
+    ("/phone/lookup", b'["' + b"1" * 64 * 1024 + b'"]', "application/json"),
+])
+def test_oversized_body_is_413(small_app, path, body, content_type):
+    resp = _post(small_app, path, body, content_type)
+    assert resp.status_code == 413
+    assert "Upload too large" in resp.json()["error"]
+
+
+@pytest.mark.parametrize("path", ["/jobs", "/predict"])
+def test_malformed_multipart_is_400(server_module, path):
+    from app.main import app
+    resp = _post(app, path, b"garbage", "multipart/form-data; boundary=zz")
+    assert resp.status_code == 400
+    assert "error" in resp.json()
+
+
+@pytest.mark.parametrize("body", [b"{bad", b"\xff\xfe", b'{"numbers": 5}'])
+def test_malformed_phone_lookup_is_400(server_module, body):
+    from app.main import app
+    resp = _post(app, "/phone/lookup", body, "application/json")
+    assert resp.status_code == 400
+    assert "error" in resp.json()
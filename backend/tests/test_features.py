@@ -0,0 +1,48 @@
+# tests/test_features.py
+"""
+MFCCExtractor 가 librosa.feature.mfcc 프레임 평균과 일치하는지 (배치 / 0-패딩 인식 경로 모두).
+실행: cd backend && python -m pytest -q tests
+"""
+import numpy as np
+import pytest
+
+from features import MFCCExtractor
+
+librosa = pytest.importorskip("librosa")
+
+SR = 16000
+SEED = 0
+REL_TOL = 1e-3
+
+
+def _rel_err(ref, got):
+    return float((np.abs(ref - got) / (np.abs(ref) + 1.0)).max())
+
+
+def test_transform_batch_matches_librosa():
+    rng = np.random.default_rng(SEED)
+    ex = MFCCExtractor(sr=SR)
+    Y = []
+    for _ in range(8):
+        n = 10 * SR
+        t = np.arange(n) / SR
+        y = 0.1 * rng.standard_normal(n) + 0.3 * np.sin(2 * np.pi * rng.uniform(80, 4000) * t)
+        y[: int(rng.uniform(0, 0.5) * n)] *= rng.uniform(0, 1)
+        Y.append(y.astype(np.float32))
+    got = ex.transform_batch(np.stack(Y))
+    for y, g in zip(Y, got):
+        ref = np.mean(librosa.feature.mfcc(y=y, sr=SR, n_mfcc=ex.n_mfcc), axis=1)
+        assert _rel_err(ref, g) < REL_TOL
+
+
+def test_transform_padded_matches_np_pad():
+    """길이가 섞인 배치: 0-패딩을 붙이지 않고 계산한 값 == np.pad 후 librosa (10초보다 긴 입력은 잘림)"""
+    rng = np.random.default_rng(SEED)
+    ex = MFCCExtractor(sr=SR)
+    total = 10 * SR
+    ys = [(0.1 * rng.standard_normal(int(s * SR))).astype(np.float32) for s in (0.3, 1.0, 2.5, 7.0, 10.0, 12.0)]
+    got = ex.transform_padded(ys, total)
+    for y, g in zip(ys, got):
+        yp = np.pad(y[:total], (0, max(0, total - y.size)))
+        ref = np.mean(librosa.feature.mfcc(y=yp, sr=SR, n_mfcc=ex.n_mfcc), axis=1)
+        assert _rel_err(ref, g) < REL_TOL
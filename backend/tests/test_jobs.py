@@ -0,0 +1,37 @@
+# tests/test_jobs.py
+"""
+리스를 잃은 워커의 결과는 반영되지 않아야 한다 (결과 덮어쓰기 / 확정 저장 중복 모두).
+실행: cd backend && python -m pytest -q tests
+"""
+import db
+import jobs
+
+
+def test_stale_worker_does_not_overwrite_or_save_twice(server_module):
+    phone = "010-7777-0001"
+    job_id = jobs.submit("stale.wav", b"RIFF", confirm=True, phone_number=phone)
+    save = ("stale.wav", "fake", 0.9, [0.05, 0.9, 0.05], phone)
+
+    def fresh(batch):
+        return [(200, {"who": "fresh"}, save) for _ in batch]
+
+    fresh_workers = jobs.JobWorkers(fresh, threads=0, lease_s=60)
+
+    def stale(batch):
+        # 처리 도중 리스가 만료돼 다른 워커가 다시 가져가 먼저 끝낸 상황
+        assert fresh_workers.run_once("worker-b") == 1
+        return [(200, {"who": "stale"}, save) for _ in batch]
+
+    stale_workers = jobs.JobWorkers(stale, threads=0, lease_s=-1)
+    assert stale_workers.run_once("worker-a") == 1
+
+    job = jobs.get(job_id)
+    assert job["status"] == "done" and job["attempts"] == 2
+    assert job["result"]["who"] == "fresh" and job["result"]["saved"] is True
+    assert stale_workers.stats()["stale"] == 1
+    reports = db.reader().execute("SELECT report_count FROM phone_reports WHERE phone_number = ?",
+                                  ("01077770001",)).fetchall()
+    assert reports == [(1,)]
+    n = db.reader().execute("SELECT SUM(count) FROM detections_phone_day WHERE phone_number = ?",
+                            ("01077770001",)).fetchone()[0]
+    assert n == 1
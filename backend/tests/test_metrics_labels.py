@@ -0,0 +1,19 @@
+# tests/test_metrics_labels.py
+"""요청 지표의 ext label 은 클라이언트 파일명과 무관하게 정해진 값만 가진다"""
+import metrics
+from conftest import post_audio, wav_bytes
+
+
+def test_ext_label_is_bounded(server_module):
+    assert server_module.ext_label("a.WAV") == ".wav"
+    assert server_module.ext_label("a.mp3") == ".mp3"
+    assert server_module.ext_label("noext") == ""
+    assert server_module.ext_label("a.x7f3k9") == "other"
+
+
+def test_unknown_extensions_share_one_series(client):
+    for i in range(5):
+        assert post_audio(client, "/predict", f"a.rand{i}", wav_bytes()).status_code == 415
+    text = metrics.render()
+    assert ".rand" not in text
+    assert 'endpoint="/predict",status="415",ext="other"' in text
@@ -0,0 +1,32 @@
+# tests/test_numpy_engine.py
+"""
+접힌 NumPy 엔진이 torch 모델과 같은 확률을 내는지 (export_numpy.check_parity),
+parity 가 실패하면 기존 npz 를 바꾸지 않는지.
+실행: cd backend && python -m pytest -q tests
+"""
+import os
+
+import pytest
+
+pytest.importorskip("torch")
+
+import export_numpy
+from numpy_engine import NumpyClassifier
+
+
+def test_numpy_engine_matches_torch():
+    model, scaler = export_numpy.load_torch()
+    engine = export_numpy.fold(model, scaler)
+    assert export_numpy.check_parity(model, scaler, engine, samples=256, atol=1e-4, seed=1)
+
+
+def test_export_replaces_only_after_parity(tmp_path):
+    out = str(tmp_path / "model_folded.npz")
+    ok, engine = export_numpy.export(out, samples=256)
+    assert ok and NumpyClassifier.load(out).version == engine.version
+    before = os.path.getmtime(out)
+
+    ok, _ = export_numpy.export(out, samples=256, atol=-1.0)     # 반드시 실패하는 허용 오차
+    assert not ok
+    assert os.path.getmtime(out) == before
+    assert sorted(os.listdir(tmp_path)) == ["model_folded.npz"]
@@ -0,0 +1,39 @@
+# tests/test_phone_index.py
+"""
+PhoneIndex 카운터는 조회 스레드와 write-through / 갱신이 동시에 돌아도 정확해야 한다 (/stats).
+실행: cd backend && python -m pytest -q tests
+"""
+import sys, threading
+
+from phone_index import PhoneIndex
+
+
+def test_stats_counters_are_consistent_under_concurrency(server_module):
+    old = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)     # 스레드 전환을 잦게 해서 경합을 드러낸다
+    try:
+        index = PhoneIndex().rebuild()
+        index.apply("010-5555-0001", 0.5, 1, "2026-01-01T00:00:00")
+        n_threads, n_iter = 8, 2000
+
+        def hammer(k):
+            for i in range(n_iter):
+                if i % 2:
+                    index.get("010-5555-0001")
+                else:
+                    index.get_many(["010-5555-0001", "010-5555-0002"])
+                if k == 0 and i % 100 == 0:
+                    index.apply("010-5555-0003", 0.1, 1, "2026-01-01T00:00:01")
+
+        threads = [threading.Thread(target=hammer, args=(k,)) for k in range(n_threads)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    finally:
+        sys.setswitchinterval(old)
+
+    st = index.stats()
+    assert st["lookups"] == n_threads * (n_iter // 2 * 1 + n_iter // 2 * 2)
+    assert st["hits"] == n_threads * n_iter
+    assert st["writes"] == 1 + n_iter // 100
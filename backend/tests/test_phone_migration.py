@@ -0,0 +1,44 @@
+# tests/test_phone_migration.py
+"""번호 정규화 이전 DB → init_db 1회 이관 후 정규화 표기로 조회된다"""
+import sqlite3
+
+import db
+
+
+def _old_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE results (id INTEGER PRIMARY KEY AUTOINCREMENT, timestamp TEXT NOT NULL, filename TEXT,
+            prediction TEXT, confidence REAL, prob_real REAL, prob_fake2 REAL, prob_tts REAL, phone_number TEXT);
+        CREATE TABLE phone_reports (id INTEGER PRIMARY KEY AUTOINCREMENT, phone_number TEXT UNIQUE,
+            report_count INTEGER DEFAULT 0, last_confidence REAL, risk_score REAL, ema_alpha REAL,
+            updated_at TEXT, created_at TEXT);
+        INSERT INTO results (timestamp, filename, prediction, confidence, phone_number)
+        VALUES ('2026-01-01T00:00:00', 'a.wav', 'tts', 0.9, '010-1234-5678'),
+               ('2026-01-02T00:00:00', 'b.wav', 'tts', 0.8, 'not a number');
+        INSERT INTO phone_reports (phone_number, report_count, last_confidence, risk_score, ema_alpha, updated_at, created_at)
+        VALUES ('010-1234-5678',    2, 0.9, 0.70, 0.58, '2026-01-02T00:00:00', '2026-01-01T00:00:00'),
+               ('+82 10 1234 5678', 1, 0.6, 0.60, 0.37, '2026-01-03T00:00:00', '2026-01-02T00:00:00'),
+               ('01012345678',      3, 0.8, 0.80, 0.51, '2026-01-01T00:00:00', '2025-12-31T00:00:00'),
+               ('02-555-0100',      1, 0.7, 0.70, 0.44, '2026-01-01T00:00:00', '2026-01-01T00:00:00');
+    """)
+    conn.close()
+
+
+def test_init_db_merges_legacy_phone_formats(tmp_path, monkeypatch):
+    path = str(tmp_path / "old.db")
+    _old_db(path)
+    monkeypatch.setattr(db, "DB_PATH", path)
+    db.init_db()
+    db.init_db()        # 두 번째는 아무것도 하지 않음
+
+    conn = sqlite3.connect(path)
+    rows = {r[0]: r[1:] for r in conn.execute(
+        "SELECT phone_number, report_count, last_confidence, risk_score, ema_alpha, created_at FROM phone_reports")}
+    assert set(rows) == {"01012345678", "025550100"}
+    # 신고 수는 합, 위험도는 가장 최근 updated_at 행, created_at 은 가장 이른 값
+    assert rows["01012345678"] == (6, 0.6, 0.60, 0.37, "2025-12-31T00:00:00")
+    assert conn.execute("SELECT phone_number FROM results ORDER BY id").fetchall() == [("01012345678",), ("not a number",)]
+    assert conn.execute("SELECT numbers, reports FROM phone_stats").fetchone() == (2, 7)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 1
+    conn.close()
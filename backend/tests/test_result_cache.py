@@ -0,0 +1,42 @@
+# tests/test_result_cache.py
+"""
+결과 캐시 버전은 로드된 모델의 것 — 디스크 파일이 바뀌어도 실행 중인 프로세스의 버전은 그대로,
+다른 버전으로 시작하면 이전 항목은 쓰지 않고 정리한다.
+실행: cd backend && python -m pytest -q tests
+"""
+import shutil
+
+from result_cache import ResultCache
+
+
+def test_version_is_fixed_and_other_versions_are_dropped(tmp_path):
+    path = str(tmp_path / "cache.db")
+    old = ResultCache(path, "v1", max_entries=0, max_disk_entries=16)
+    old.put("k", {"p": 1})
+    assert old.get("k") == {"p": 1}
+
+    new = ResultCache(path, "v2", max_entries=0, max_disk_entries=16)
+    assert new.get("k") is None
+    n = new._db().execute("SELECT COUNT(*) FROM result_cache WHERE version = 'v1'").fetchone()[0]
+    assert n == 0
+
+
+def test_server_cache_version_is_loaded_model(server_module, tmp_path):
+    from numpy_engine import source_version
+    assert server_module.result_cache.version == server_module.model_version
+    assert server_module.model_version == source_version(server_module.MODEL_PATH, server_module.SCALER_PATH)
+
+    # 실행 중 파일이 바뀌어도 메모리의 모델과 캐시 버전은 그대로 (재시작 전까지)
+    before = server_module.result_cache.version
+    backup = str(tmp_path / "scaler.bak")
+    shutil.copy2(server_module.SCALER_PATH, backup)
+    try:
+        with open(server_module.SCALER_PATH, "ab") as f:
+            f.write(b"\0")
+        server_module.result_cache.put("k-after-swap", {"p": 1})
+        assert server_module.result_cache.version == before
+        row = server_module.result_cache._db().execute(
+            "SELECT version FROM result_cache WHERE key = 'k-after-swap'").fetchone()
+        assert row == (before,)
+    finally:
+        shutil.copy2(backup, server_module.SCALER_PATH)
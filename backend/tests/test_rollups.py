@@ -0,0 +1,31 @@
+# tests/test_rollups.py
+"""확정 저장 시 실시간 롤업 == results 로 다시 만든 롤업 (시간 경계에서도)"""
+import sqlite3
+
+import numpy as np
+
+import db
+
+
+def _rollups(path):
+    conn = sqlite3.connect(path)
+    out = {name: sorted(conn.execute(f"SELECT * FROM detections_{name}").fetchall())
+           for name in ("hour", "day", "phone_day")}
+    conn.close()
+    return out
+
+
+def test_live_rollup_matches_rebuild_across_hour_boundary(tmp_path, monkeypatch):
+    path = str(tmp_path / "rollup.db")
+    monkeypatch.setattr(db, "DB_PATH", path)
+    db.init_db()
+    # 저장마다 첫 시각만 23:59:59, 그 뒤 호출은 다음 날 — 저장 도중 시간/날짜 경계를 넘는 경우
+    clock = iter(())
+    monkeypatch.setattr(db, "_utcnow_str", lambda: next(clock, "2026-03-02T00:00:00"))
+    for i in range(4):
+        clock = iter(["2026-03-01T23:59:59"])
+        db.save_confirmed_result(f"f{i}.wav", "tts", 0.9, np.array([0.05, 0.05, 0.9]), "010-1234-5678")
+
+    live = _rollups(path)
+    db.rebuild_rollups()
+    assert live == _rollups(path)
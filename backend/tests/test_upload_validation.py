@@ -0,0 +1,57 @@
+# tests/test_upload_validation.py
+"""
+캐시에 있는 바이트라도 비캐시 경로와 같은 거부를 받아야 한다 (확장자 415).
+실행: cd backend && python -m pytest -q tests
+"""
+import io
+
+from conftest import post_audio as _post, wav_bytes as _wav_bytes
+
+
+def test_cached_body_with_disallowed_extension_is_415(client):
+    body = _wav_bytes(freq=330.0)
+    first = _post(client, "/predict", "a.wav", body)
+    assert first.status_code == 200
+    again = _post(client, "/predict", "b.wav", body)
+    assert again.status_code == 200 and again.get_json()["cached"] is True
+
+    resp = _post(client, "/predict", "a.flac", body)
+    assert resp.status_code == 415
+    assert "Only WAV/MP3 allowed" in resp.get_json()["error"]
+
+
+def test_cache_is_keyed_by_decoder(client):
+    """같은 바이트라도 .mp3 는 다른 디코더를 타므로 .wav 의 캐시 결과를 쓰지 않는다"""
+    body = _wav_bytes(freq=550.0)
+    assert _post(client, "/predict", "c.wav", body).status_code == 200
+    resp = _post(client, "/predict", "c.mp3", body)
+    assert resp.status_code != 200 or resp.get_json()["cached"] is False
+
+
+def test_batch_cached_item_with_disallowed_extension_is_415(client):
+    body = _wav_bytes(freq=660.0)
+    assert _post(client, "/predict", "d.wav", body).status_code == 200
+    resp = client.post("/predict/batch", data={"audio": [(io.BytesIO(body), "d.wav"), (io.BytesIO(body), "d.flac")]},
+                       content_type="multipart/form-data")
+    assert resp.status_code == 200
+    ok, bad = resp.get_json()["results"]
+    assert ok["status"] == 200 and ok["cached"] is True
+    assert bad["status"] == 415
+
+
+def test_asgi_cached_body_with_disallowed_extension_is_415():
+    import asyncio, httpx
+    from app.main import app, lifespan
+    body = _wav_bytes(freq=770.0)
+
+    async def run():
+        async with lifespan(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://test") as asgi:
+                first = await asgi.post("/predict", files={"audio": ("e.wav", body)})
+                resp = await asgi.post("/predict", files={"audio": ("e.flac", body)})
+        return first, resp
+
+    first, resp = asyncio.run(run())
+    assert first.status_code == 200
+    assert resp.status_code == 415
@@ -1,99 +1,224 @@
 # upload_json.py
-import sys, json, sqlite3, os
-from datetime import datetime, timezone
+"""
+파트너 차단 목록 등 번호 신고 피드를 phone_reports 에 일괄 반영
+  - JSON 배열/객체, JSONL, CSV 를 스트리밍으로 읽음 (전체를 메모리에 올리지 않음)
+  - 서버 upsert_phone_report 와 같은 동적 α EMA (db.ema_risk) + 번호 정규화 (db.normalize_phone)
+  - batch 행씩 번호별로 EMA 를 합쳐(A·r + B) 번호당 1행 executemany upsert, 트랜잭션도 batch 단위
+
+사용법:
+  python upload_json.py upload data.json
+  python upload_json.py upload feed.jsonl --batch 200000
+  python upload_json.py upload blocklist.csv --format csv
+"""
+import argparse, csv, json, os, sys, time
+
+import db
+from db import init_db, ema_risk, normalize_phone, _clamp, _utcnow_str
+
+BATCH_ROWS = int(os.environ.get("IMPORT_BATCH_ROWS", "100000"))
+READ_CHUNK = 1 << 20
 
-# ======================
-# 경로 설정: server.py와 같은 폴더의 deepfake.db 사용
-# ======================
-ROOT = os.path.dirname(os.path.abspath(__file__))
-DB_PATH = os.path.join(ROOT, "deepfake.db")  # server.py와 동일
 
 # ======================
-# 테이블 자동 생성 (server.py와 동일한 구조로)
+# 스트리밍 파서 (dict 를 하나씩 yield)
 # ======================
-def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    cur = conn.cursor()
-    # 기존 server.py results 테이블 유지
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS results (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        timestamp TEXT NOT NULL,
-        filename TEXT,
-        prediction TEXT,
-        confidence REAL,
-        prob_real REAL,
-        prob_fake2 REAL,
-        prob_tts REAL
-    )
-    """)
-    # 전화번호용 새 테이블 추가
-    cur.execute("""
-    CREATE TABLE IF NOT EXISTS phone_reports (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        created_at TEXT NOT NULL,
-        phone_number TEXT NOT NULL,
-        confidence REAL NOT NULL
-    )
-    """)
-    conn.commit()
-    conn.close()
+def iter_jsonl(f):
+    for line in f:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+def iter_json(f):
+    """
+    최상위 JSON 배열(또는 객체 1개)을 원소 단위로 디코딩.
+    청크를 읽어 raw_decode 로 원소를 하나씩 꺼내므로 메모리는 원소 1개 + 청크 크기.
+    """
+    dec = json.JSONDecoder()
+    buf, pos, started, eof = "", 0, False, False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = f.read(READ_CHUNK)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(buf):
+            if eof:
+                return
+            fill()
+            continue
+        if not started:
+            started = True
+            if buf[pos] == "[":
+                pos += 1
+                continue
+            if buf[pos] == "{":      # 단일 객체
+                while not eof:
+                    fill()
+                yield dec.raw_decode(buf, pos)[0]
+                return
+            raise ValueError("JSON 형식이 잘못되었습니다. 리스트 또는 객체를 넣어주세요.")
+        if buf[pos] == "]":
+            return
+        try:
+            obj, end = dec.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()                   # 원소가 청크 경계에 걸림 → 더 읽고 재시도
+            continue
+        nxt = end
+        while nxt < len(buf) and buf[nxt] in " \t\r\n":
+            nxt += 1
+        if not eof and (nxt == len(buf) or buf[nxt] not in ",]"):
+            fill()                   # 뒤에 , 나 ] 가 안 보이면 숫자 등이 잘렸을 수 있음 → 더 읽고 다시 디코딩
+            continue
+        pos = end
+        yield obj
+
+def iter_csv(f):
+    yield from csv.DictReader(f)
+
+PARSERS = {"json": iter_json, "jsonl": iter_jsonl, "csv": iter_csv}
+
+def detect_format(path: str) -> str:
+    ext = os.path.splitext(path.lower())[1]
+    return {".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv"}.get(ext, "json")
+
 
 # ======================
-# 업로드 함수
+# 배치 적용 (set 기반)
 # ======================
-def upload_from_json(path):
-    if not os.path.exists(path):
-        print(f"❌ 파일을 찾을 수 없습니다: {path}")
-        return
+def _apply_batch(cur, rows, now: str) -> int:
+    """
+    rows: [(정규화 번호, conf), ...] (피드 순서)
+    EMA 한 단계 r' = α·c + (1-α)·r 는 r 에 대한 1차식이라, 번호별 연속 신고는 r' = A·r + B 로 합쳐진다.
+      - 신규 번호: 첫 신고로 시작해 순서대로 ema_risk 적용한 값 (서버에서 한 건씩 넣은 결과와 동일)
+      - 기존 번호: 저장된 risk 에 A·r + B 를 upsert 안에서 적용 → 기존 상태를 미리 읽지 않는다
+    번호당 1행씩, 정렬된 키 순서로 executemany (B-tree 삽입이 순차적)
+    """
+    state = {}      # phone → [건수, 마지막 conf, 마지막 α, A, B, 신규일 때 risk]
+    for phone, conf in rows:
+        st = state.get(phone)
+        if st is None:
+            risk, alpha = ema_risk(conf, None)
+            state[phone] = [1, conf, alpha, 1.0 - alpha, alpha * conf, risk]
+            continue
+        st[5], alpha = ema_risk(conf, st[5])
+        st[0] += 1
+        st[1] = conf
+        st[2] = alpha
+        st[3] *= 1.0 - alpha
+        st[4] = alpha * conf + (1.0 - alpha) * st[4]
 
-    # JSON 로드
-    try:
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
-    except Exception as e:
-        print(f"❌ JSON 파싱 오류: {e}")
-        return
-
-    # 리스트/단일 객체 모두 허용
-    if isinstance(data, dict):
-        data = [data]
-    elif not isinstance(data, list):
-        print("❌ JSON 형식이 잘못되었습니다. 리스트 또는 객체를 넣어주세요.")
-        return
-
-    conn = sqlite3.connect(DB_PATH)
+    cur.executemany("""
+        INSERT INTO phone_reports
+            (phone_number, report_count, last_confidence, risk_score, ema_alpha, updated_at, created_at)
+        VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?6)
+        ON CONFLICT(phone_number) DO UPDATE SET
+            report_count    = COALESCE(report_count, 0) + excluded.report_count,
+            last_confidence = excluded.last_confidence,
+            risk_score      = CASE WHEN risk_score IS NULL THEN excluded.risk_score
+                                   ELSE MIN(1.0, MAX(0.0, ?7 * risk_score + ?8)) END,
+            ema_alpha       = excluded.ema_alpha,
+            updated_at      = excluded.updated_at
+    """, ((p, st[0], st[1], st[5], st[2], now, st[3], st[4]) for p, st in sorted(state.items())))
+    return len(state)
+
+def import_feed(path: str, fmt: str | None = None, batch_rows: int = BATCH_ROWS, verbose: bool = True) -> dict:
+    """피드 파일 → phone_reports. 반환: 통계 dict"""
+    fmt = fmt or detect_format(path)
+    parse = PARSERS[fmt]
+    conn = db._conn()
     cur = conn.cursor()
-    now = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
-    count = 0
-
-    for item in data:
-        phone = str(item.get("phone_number", "")).strip()
-        conf = item.get("confidence", None)
-        if not phone or conf is None:
-            print(f"⚠️ 스킵됨 (phone_number/confidence 누락): {item}")
-            continue
+    cur.execute("PRAGMA cache_size=-65536")     # 64 MiB
+
+    stats = {"rows": 0, "applied": 0, "skipped": 0, "numbers": 0, "batches": 0}
+    warned = 0
+    t0 = time.perf_counter()
+    batch = []
+    phones = {}      # 원문 → 정규화 번호 (피드에는 같은 번호가 반복됨)
+
+    def flush():
+        if not batch:
+            return
+        now = _utcnow_str()
+        cur.execute("BEGIN IMMEDIATE")
         try:
-            cur.execute(
-                "INSERT INTO phone_reports (created_at, phone_number, confidence) VALUES (?, ?, ?)",
-                (now, phone, float(conf))
-            )
-            count += 1
-        except Exception as e:
-            print(f"⚠️ DB 삽입 오류: {e}")
-
-    conn.commit()
+            stats["numbers"] += _apply_batch(cur, batch, now)
+            cur.execute("COMMIT")
+        except Exception:
+            cur.execute("ROLLBACK")
+            raise
+        stats["applied"] += len(batch)
+        stats["batches"] += 1
+        batch.clear()
+        if verbose:
+            el = time.perf_counter() - t0
+            print(f"  … {stats['applied']:,} rows ({stats['applied'] / el:,.0f} rows/s)", file=sys.stderr)
+
+    with open(path, "r", encoding="utf-8", newline="" if fmt == "csv" else None) as f:
+        for item in parse(f):
+            stats["rows"] += 1
+            rec = item if isinstance(item, dict) else {}
+            raw = rec.get("phone_number")
+            phone = phones.get(raw) if isinstance(raw, str) else None
+            if phone is None:
+                phone = normalize_phone(raw)
+                if phone is not None and isinstance(raw, str) and len(phones) < 1_000_000:
+                    phones[raw] = phone
+            conf = rec.get("confidence")
+            try:
+                conf = _clamp(float(conf)) if conf not in (None, "") else None
+            except (TypeError, ValueError):
+                conf = None
+            if phone is None or conf is None:
+                stats["skipped"] += 1
+                if verbose and warned < 10:
+                    print(f"⚠️ 스킵됨 (phone_number/confidence 누락 또는 형식 오류): {item}", file=sys.stderr)
+                    warned += 1
+                continue
+            batch.append((phone, conf))
+            if len(batch) >= batch_rows:
+                flush()
+        flush()
+
     conn.close()
-    print(f"✅ {count}개의 데이터가 {DB_PATH} 에 저장되었습니다.")
+    stats["seconds"] = time.perf_counter() - t0
+    stats["rows_per_s"] = stats["rows"] / stats["seconds"] if stats["seconds"] > 0 else 0.0
+    return stats
+
 
 # ======================
 # 실행부
 # ======================
-if __name__ == "__main__":
-    if len(sys.argv) < 3 or sys.argv[1] != "upload":
-        print("사용법: python upload_json.py upload data.json")
-        sys.exit(1)
+def main():
+    ap = argparse.ArgumentParser(description="Bulk import phone reports (JSON / JSONL / CSV)")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("upload")
+    p.add_argument("path")
+    p.add_argument("--format", choices=sorted(PARSERS), default=None, help="default: by file extension")
+    p.add_argument("--batch", type=int, default=BATCH_ROWS, help="rows per transaction")
+    p.add_argument("--quiet", action="store_true")
+    args = ap.parse_args()
 
-    json_path = sys.argv[2]
+    if not os.path.exists(args.path):
+        print(f"❌ 파일을 찾을 수 없습니다: {args.path}")
+        sys.exit(1)
     init_db()
-    upload_from_json(json_path)
+    try:
+        st = import_feed(args.path, args.format, max(1, args.batch), verbose=not args.quiet)
+    except (ValueError, csv.Error) as e:
+        print(f"❌ 파싱 오류: {e}")
+        sys.exit(1)
+    print(f"✅ {st['applied']:,}건 반영 ({st['numbers']:,}개 번호 갱신, 스킵 {st['skipped']:,}) → {db.DB_PATH}")
+    print(f"   {st['seconds']:.2f}s, {st['rows_per_s']:,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
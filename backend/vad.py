@@ -0,0 +1,59 @@
+# vad.py
+import os
+
+import numpy as np
+
+# ======================
+# 설정 (에너지 + 영교차율 기반 음성 구간 검출)
+# ======================
+FRAME_MS     = float(os.environ.get("VAD_FRAME_MS", "20"))       # 판정 단위 프레임 (겹침 없음)
+FLOOR_DBFS   = float(os.environ.get("VAD_FLOOR_DBFS", "-55"))    # 이보다 조용하면 항상 무음
+MARGIN_DB    = float(os.environ.get("VAD_MARGIN_DB", "12"))      # 잡음 바닥(하위 10%) + margin 이상이면 음성 후보
+RANGE_DB     = float(os.environ.get("VAD_RANGE_DB", "30"))       # 최대 에너지 - range 이상이면 음성 후보 (말이 꽉 찬 녹음 보호)
+ZCR_MAX      = float(os.environ.get("VAD_ZCR_MAX", "0.35"))      # ZCR 이 이보다 높고 에너지가 낮으면 잡음(치찰/히스)으로 봄
+HANGOVER_MS  = float(os.environ.get("VAD_HANGOVER_MS", "150"))   # 음성 프레임 앞뒤로 남기는 여유
+MIN_SPEECH_S = float(os.environ.get("VAD_MIN_SPEECH_S", "0.3"))  # 남는 음성이 이보다 짧으면 자르지 않음
+
+
+def speech_mask(y: np.ndarray, sr: int):
+    """
+    프레임별 음성 여부 (n_frames,) bool 과 프레임 길이(샘플).
+    프레임을 (n, frame) 행렬로 보고 에너지/ZCR 을 한 번에 계산한다 (파이썬 루프 없음).
+    """
+    flen = max(2, int(sr * FRAME_MS / 1000.0))
+    n = y.size // flen
+    if n == 0:
+        return np.ones(0, dtype=bool), flen
+    fr = y[:n * flen].reshape(n, flen)
+    energy_db = 10.0 * np.log10(np.einsum("ij,ij->i", fr, fr) / flen + 1e-12)
+    zcr = np.count_nonzero(np.diff(np.signbit(fr), axis=1), axis=1) / (flen - 1)
+
+    noise_db = float(np.percentile(energy_db, 10))
+    thr = max(FLOOR_DBFS, min(noise_db + MARGIN_DB, float(energy_db.max()) - RANGE_DB))
+    speech = energy_db > thr
+    speech &= ~((zcr > ZCR_MAX) & (energy_db < thr + MARGIN_DB))
+
+    hang = int(HANGOVER_MS / FRAME_MS)
+    if hang > 0 and speech.any():
+        speech = np.convolve(speech, np.ones(2 * hang + 1), mode="same") > 0.5
+    return speech, flen
+
+
+def trim(y: np.ndarray, sr: int):
+    """
+    무음/잡음 프레임을 빼고 음성 프레임만 이어 붙인다 → (파형, 잘라낸 비율 0~1).
+    남는 음성이 MIN_SPEECH_S 보다 짧으면(무음 위주/판정 실패) 원본 그대로, 비율 0.
+    """
+    y = np.asarray(y, dtype=np.float32)
+    speech, flen = speech_mask(y, sr)
+    n = speech.size
+    if n == 0 or speech.all():
+        return y, 0.0
+    kept = int(speech.sum()) * flen
+    if kept < MIN_SPEECH_S * sr:
+        return y, 0.0
+    parts = [y[:n * flen].reshape(n, flen)[speech].ravel()]
+    if speech[-1] and y.size > n * flen:
+        parts.append(y[n * flen:])          # 끝 자투리는 마지막 프레임을 따른다
+    out = np.concatenate(parts)
+    return out, 1.0 - out.size / y.size